@@ -7,11 +7,21 @@ import sys
 from setproctitle import setproctitle
 from dotenv import load_dotenv
 
-from src.niimbot.niimbot_printer import NiimbotPrint
+from src.niimbot.async_niimbot_printer import AsyncNiimbotPrint
+from src.niimbot.serial_transport import detect_ports
+from src.supa_db.laundry_feed import LaundryFeed
+from src.supa_db.result_writer import ResultWriter
 from src.supa_db.supa_db import SupaDB
+from src.supa_realtime.catch_up import CatchUpSync
+from src.supa_realtime.cluster import ClusterNode
+from src.supa_realtime.fair_queue import FairScheduler
+from src.supa_realtime.job_journal import JobJournal
+from src.supa_realtime.label_pipeline import LabelPipeline
+from src.supa_realtime.lease_store import PostgrestLeaseStore, SqliteLeaseStore
 from src.supa_realtime.realtime_service import RealtimeService
+from src.supa_realtime.station_routing import RoutingTable, StationFilter
 from src.utils.logger import setup_logger
-from src.utils.print_test_page import print_test_page
+from src.utils.print_test_page import print_test_page_async
 
 # User configurations
 SERIAL_PORT = "/dev/ttyACM0"
@@ -21,7 +31,60 @@ SERVICE_NAME = "printer-service"
 
 def parse_arguments():
     parser = argparse.ArgumentParser(description='Printer Service')
-    parser.add_argument('--port', default=SERIAL_PORT, help='Serial port for printer connection')
+    parser.add_argument('--port',
+                        nargs='+',
+                        default=[SERIAL_PORT],
+                        help="Serial port(s) for printer connections, one printer per port ('all' to use every port)")
+    parser.add_argument('--compress-rows',
+                        action='store_true',
+                        help='Send blank/indexed/repeated rows as compressed packets')
+    parser.add_argument('--journal',
+                        default='print_journal.db',
+                        help='SQLite file recording print jobs for crash recovery')
+    parser.add_argument('--render-lookahead',
+                        type=int,
+                        default=4,
+                        help='Number of labels rendered ahead of the printer')
+    parser.add_argument('--max-batch',
+                        type=int,
+                        default=20,
+                        help='Most orders printed together in one print session')
+    parser.add_argument('--batch-window',
+                        type=float,
+                        default=0.0,
+                        help='Seconds an idle printer waits to batch orders arriving together '
+                             '(delays a lone order by as much)')
+    parser.add_argument('--fair',
+                        action='store_true',
+                        help='Interleave the labels of different requesters instead of printing orders whole')
+    parser.add_argument('--fair-quantum',
+                        type=int,
+                        default=1,
+                        help='Labels per requester per round in fair mode')
+    parser.add_argument('--user-quota',
+                        type=int,
+                        help='Labels per requester per quota window before others go first (fair mode)')
+    parser.add_argument('--quota-window',
+                        type=float,
+                        default=3600.0,
+                        help='Seconds of the per-requester quota window')
+    parser.add_argument('--results-table',
+                        help='Table receiving per-label print results (see README); off when not given')
+    parser.add_argument('--cluster-leases',
+                        help="Where cluster leases are kept, enabling cluster mode: 'postgrest' for the "
+                             "print_leases functions of the database (nodes on several hosts, see README) "
+                             "or a SQLite file shared by the service processes of this host")
+    parser.add_argument('--node-id',
+                        help='Name of this node in cluster mode (default: hostname-pid)')
+    parser.add_argument('--lease-ttl',
+                        type=float,
+                        default=30.0,
+                        help='Seconds before a crashed node\'s orders are taken over')
+    parser.add_argument('--station',
+                        type=StationFilter.parse,
+                        help="Only receive orders of these stations, e.g. 'station=gangnam,seocho'")
+    parser.add_argument('--routes',
+                        help='JSON file mapping order attributes to printer groups')
     parser.add_argument('--log-level',
                         default='INFO',
                         choices=['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'],
@@ -32,6 +95,25 @@ def parse_arguments():
     return parser.parse_args()
 
 
+async def connect_printer(port, compress_rows):
+    printer = AsyncNiimbotPrint(port=port, compress_rows=compress_rows)
+    try:
+        return await printer.connect()
+    except Exception:
+        printer.close()
+        raise
+
+
+async def warm_profile_cache(supa_api: SupaDB, journal: JobJournal):
+    """Load the names of recent and unfinished orders' users before the first print request."""
+    try:
+        user_ids = [record['requested_by'] for record, _, _ in journal.unfinished()]
+        user_ids += await asyncio.to_thread(supa_api.recent_requesters)
+        await supa_api.profiles.prefetch(user_ids)
+    except Exception as e:
+        logging.warning(f"Profile cache warm-up skipped - Error: {str(e)}")
+
+
 async def main():
     try:
         args = parse_arguments()
@@ -46,14 +128,56 @@ async def main():
         if not all([database_url, jwt]):
             raise Exception("Required environment variables are missing")
 
-        logging.info(f"Starting {SERVICE_NAME} with port {args.port}")
-
-        printer = NiimbotPrint(port=args.port)
-        # 첫 출력 공백문제 때문에 테스트 페이지 출력
-        print_test_page(printer)
+        logging.info(f"Starting {SERVICE_NAME} with ports {args.port}")
+
+        detected = args.port == ['all']
+        ports = []
+        printers = []
+        for port in detect_ports() if detected else args.port:
+            try:
+                printer = await connect_printer(port, args.compress_rows)
+            except Exception as e:
+                if not detected:
+                    raise
+                # 프린터가 아닌 장치가 연결된 포트는 건너뜀
+                logging.warning(f"Port skipped - Port: {port}, Error: {str(e)}")
+                continue
+            ports.append(port)
+            printers.append(printer)
+            # 첫 출력 공백문제 때문에 테스트 페이지 출력
+            await print_test_page_async(printer)
+        if not printers:
+            raise RuntimeError("No printer responded on the detected serial ports")
+
+        journal = JobJournal(args.journal)
+        journal.prune()
 
         supa_api = SupaDB(database_url, jwt)
-        service = RealtimeService(database_url, jwt, printer, supa_api)
+        station = args.station
+        feed = LaundryFeed(database_url, jwt, filters={station.column: station.values} if station else None)
+        routes = RoutingTable.load(args.routes) if args.routes else None
+        await warm_profile_cache(supa_api, journal)
+        cluster = None
+        if args.cluster_leases:
+            if args.cluster_leases == 'postgrest':
+                leases = PostgrestLeaseStore(database_url, jwt)
+            else:
+                leases = SqliteLeaseStore(args.cluster_leases)
+            try:
+                await leases.prune()
+            except Exception as e:
+                logging.warning(f"Lease pruning skipped - Error: {str(e)}")
+            cluster = ClusterNode(leases, args.node_id, ttl=args.lease_ttl)
+            logging.info(f"Cluster mode enabled - Node: {cluster.node_id}, Leases: {args.cluster_leases}")
+        service = RealtimeService(database_url, jwt, printers, supa_api, journal=journal,
+                                  pipeline=LabelPipeline(args.render_lookahead),
+                                  results=ResultWriter(database_url, jwt, table=args.results_table)
+                                  if args.results_table else None,
+                                  catch_up=CatchUpSync(feed, journal), printer_names=ports, cluster=cluster,
+                                  station=station, routes=routes,
+                                  max_batch=args.max_batch, batch_window=args.batch_window,
+                                  fair=FairScheduler(args.fair_quantum, args.user_quota, args.quota_window)
+                                  if args.fair else None)
 
         await service.start_listening()
 
@@ -61,6 +185,17 @@ async def main():
         logging.info("Service shutting down gracefully...")
         if 'service' in locals():
             await service.stop_listening()
+        for printer in locals().get('printers', []):
+            printer.close()
+        if 'feed' in locals():
+            await feed.close()
+        if 'journal' in locals():
+            journal.close()
+        if 'leases' in locals():
+            await leases.close()
+        if 'supa_api' in locals():
+            logging.info(f"Profile lookups: {supa_api.profiles.stats()}")
+            await supa_api.close()
     except Exception as e:
         logging.critical(f"Service error: {str(e)}")
         sys.exit(1)
@@ -0,0 +1,65 @@
+import asyncio
+import logging
+
+from src.niimbot.async_serial_transport import AsyncSerialTransport
+from src.niimbot.printer_session import PrinterSession
+from src.niimbot.raster import FLOYD_STEINBERG
+
+
+class AsyncNiimbotPrint(PrinterSession):
+    """Asyncio counterpart of NiimbotPrint; every printer command is an awaitable.
+
+    Received bytes are decoded from the event loop's reader callback, so waiting for a
+    response or for a label to finish never blocks the loop.
+    """
+
+    def __init__(self, density=5, label_type=1, port="auto", compress_rows=False, transport=None,
+                 state_max_age=5.0, rows_per_second=None, raster_mode=FLOYD_STEINBERG):
+        super().__init__(transport or AsyncSerialTransport(port), density, label_type, compress_rows,
+                         state_max_age, rows_per_second, raster_mode)
+
+    async def connect(self):
+        self._transport.open(self._engine.feed)
+        await self.initialize()
+        return self
+
+    def close(self):
+        self._transport.close()
+
+    async def _transceive_many(self, requests, timeout=None):
+        """Pipeline ``(reqcode, data, respoffset)`` requests and return their responses in order."""
+        entries, raw = self._engine.submit(
+            [(reqcode, data, respoffset + reqcode) for reqcode, data, respoffset in requests]
+        )
+        try:
+            await self._transport.write(raw)
+        except Exception:
+            for entry in entries:
+                self._engine.discard(entry)
+            raise
+
+        results = []
+        error = None
+        for entry in entries:
+            try:
+                results.append(await asyncio.wait_for(asyncio.wrap_future(entry.future),
+                                                      self._engine.timeout_for(entry, timeout)))
+            except asyncio.TimeoutError:
+                self._engine.discard(entry)
+                logging.debug(f"No response for command {entry.reqcode} (waiting for {entry.respcode})")
+                results.append(None)
+            except Exception as e:
+                error = error or e
+                results.append(None)
+        if error:
+            raise error
+        return results
+
+    async def _write(self, data):
+        await self._transport.write(data)
+
+    async def _sleep(self, seconds):
+        await asyncio.sleep(seconds)
+
+    async def _reconnect(self):
+        await self._transport.reconnect()
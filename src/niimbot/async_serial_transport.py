@@ -0,0 +1,128 @@
+import asyncio
+import logging
+import os
+
+import serial
+
+from src.niimbot.serial_transport import detect_port
+
+
+class AsyncSerialTransport:
+    """Non-blocking serial transport driven by event-loop reader/writer callbacks on the tty fd.
+
+    Relies on ``loop.add_reader``/``add_writer`` for the port's file descriptor, so it
+    needs a POSIX serial device.
+    """
+
+    def __init__(self, port: str = "auto"):
+        self.port = port if port != "auto" else detect_port()
+        self._serial = None
+        self._loop = None
+        self._on_data = None
+        self._write_buf = bytearray()
+        self._drain_waiters = []
+        self._writing = False
+        self._write_error = None
+
+    @property
+    def is_open(self):
+        return self._serial is not None and self._serial.is_open
+
+    def open(self, on_data):
+        """Open the port and deliver every chunk of received bytes to ``on_data``."""
+        self._loop = asyncio.get_running_loop()
+        self._on_data = on_data
+        self._write_error = None
+        self._serial = serial.Serial(port=self.port, baudrate=115200, timeout=0, write_timeout=0)
+        self._loop.add_reader(self._serial.fileno(), self._on_readable)
+
+    def _on_readable(self):
+        try:
+            data = os.read(self._serial.fileno(), 4096)
+        except BlockingIOError:
+            return
+        except OSError as e:
+            logging.error(f"Serial read failed: {str(e)}")
+            self._loop.remove_reader(self._serial.fileno())
+            return
+        if data:
+            self._on_data(data)
+
+    def _flush(self):
+        try:
+            written = os.write(self._serial.fileno(), self._write_buf)
+            del self._write_buf[:written]
+        except BlockingIOError:
+            pass
+        except OSError as e:
+            self._write_buf.clear()
+            self._stop_writing()
+            if self._drain_waiters:
+                self._wake_writers(e)
+            else:
+                # 기다리는 쓰기가 없으면 다음 write() 에서 오류를 알림
+                self._write_error = e
+            return
+
+        if self._write_buf:
+            if not self._writing:
+                self._writing = True
+                self._loop.add_writer(self._serial.fileno(), self._flush)
+        else:
+            self._stop_writing()
+            self._wake_writers()
+
+    def _stop_writing(self):
+        if self._writing:
+            self._writing = False
+            self._loop.remove_writer(self._serial.fileno())
+
+    def _wake_writers(self, error=None):
+        waiters, self._drain_waiters = self._drain_waiters, []
+        for waiter in waiters:
+            if waiter.done():
+                continue
+            if error:
+                waiter.set_exception(error)
+            else:
+                waiter.set_result(None)
+
+    def _raise_write_error(self):
+        if self._write_error:
+            error, self._write_error = self._write_error, None
+            raise error
+
+    async def write(self, data) -> int:
+        """Queue ``data`` and return once it has been handed to the OS."""
+        if not self.is_open:
+            raise serial.SerialException("Port is not open")
+        self._raise_write_error()
+        self._write_buf += data
+        if not self._writing:
+            self._flush()
+            self._raise_write_error()
+        if self._write_buf:
+            waiter = self._loop.create_future()
+            self._drain_waiters.append(waiter)
+            await waiter
+        return len(data)
+
+    def close(self):
+        if self._serial is None:
+            return
+        if self._serial.is_open:
+            self._stop_writing()
+            self._loop.remove_reader(self._serial.fileno())
+            self._serial.close()
+        self._wake_writers(serial.SerialException("Port closed"))
+        self._write_buf.clear()
+
+    async def reconnect(self):
+        """시리얼 연결을 재시도합니다."""
+        try:
+            self.close()
+            await asyncio.sleep(1)  # 포트가 완전히 닫힐 때까지 대기
+            self.open(self._on_data)
+            return True
+        except Exception as e:
+            raise Exception(f"프린터 재연결 실패: {str(e)}")
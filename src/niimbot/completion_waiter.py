@@ -0,0 +1,98 @@
+# 농도가 높을수록 헤드 가열 시간이 길어져 출력 속도가 느려짐 (203dpi 기준 대략값)
+DENSITY_ROWS_PER_SECOND = {1: 400, 2: 360, 3: 320, 4: 280, 5: 240}
+FEED_OVERHEAD = 0.2  # 라벨 이송/절단 등 높이와 무관한 시간 (초)
+
+
+class PrintTimeEstimator:
+    """Predicts how long one page takes to print and learns from measured pages.
+
+    Until a label size has been measured the estimate comes from the image height and
+    the density; afterwards a moving average of the measured durations is used.
+    """
+
+    def __init__(self, density=5, rows_per_second=None, overhead=FEED_OVERHEAD, smoothing=0.3):
+        self.density = density
+        self.rows_per_second = rows_per_second
+        self.overhead = overhead
+        self.smoothing = smoothing
+        self.durations = {}  # (width, height, density) -> 측정된 장당 출력 시간
+
+    def _key(self, width, height):
+        return width, height, self.density
+
+    def is_measured(self, width, height) -> bool:
+        return self._key(width, height) in self.durations
+
+    def estimate(self, width, height) -> float:
+        measured = self.durations.get(self._key(width, height))
+        if measured is not None:
+            return measured
+        rows_per_second = self.rows_per_second or DENSITY_ROWS_PER_SECOND[self.density]
+        return self.overhead + height / rows_per_second
+
+    def record(self, width, height, seconds):
+        key = self._key(width, height)
+        previous = self.durations.get(key)
+        if previous is None:
+            self.durations[key] = seconds
+        else:
+            self.durations[key] = previous + self.smoothing * (seconds - previous)
+
+
+class CompletionWaiter:
+    """Sleep schedule for waiting on printed pages.
+
+    The first sleep lasts until the printer should be nearly done, then the status is
+    polled with exponential backoff. Counters describe how long waits take and how
+    many polls they need, so the schedule can be tuned.
+    """
+
+    def __init__(self, estimator=None, lead=0.85, cold_lead=0.5, min_poll=0.02, max_poll=0.25, backoff=2.0):
+        self.estimator = estimator or PrintTimeEstimator()
+        self.lead = lead
+        self.cold_lead = cold_lead
+        self.min_poll = min_poll
+        self.max_poll = max_poll
+        self.backoff = backoff
+        self.waits = 0
+        self.polls = 0
+        self.wait_time = 0.0
+        self.last_wait = None
+        self.last_estimate = None
+
+    def delays(self, width, height, pages=1):
+        """Yield the sleeps before each status poll for ``pages`` pages of the given size."""
+        estimate = self.estimator.estimate(width, height) * pages
+        self.last_estimate = estimate
+        lead = self.lead if self.estimator.is_measured(width, height) else self.cold_lead
+        yield estimate * lead
+
+        delay = self.min_poll
+        while True:
+            yield delay
+            delay = min(delay * self.backoff, self.max_poll)
+
+    def finished(self, width, height, pages, elapsed, polls, complete=True):
+        """Record a finished wait; ``complete`` is False when it ended without all pages."""
+        self.waits += 1
+        self.polls += polls
+        self.wait_time += elapsed
+        self.last_wait = elapsed
+        if not complete or pages < 1:
+            return
+        per_page = elapsed / pages
+        if polls <= 1:
+            # 첫 조회에서 이미 끝나 있었다면 실제 시간은 이보다 짧음
+            per_page *= self.cold_lead
+        self.estimator.record(width, height, per_page)
+
+    def stats(self) -> dict:
+        return {
+            "waits": self.waits,
+            "polls": self.polls,
+            "wait_time": self.wait_time,
+            "average_wait": self.wait_time / self.waits if self.waits else 0.0,
+            "polls_per_wait": self.polls / self.waits if self.waits else 0.0,
+            "last_wait": self.last_wait,
+            "last_estimate": self.last_estimate,
+        }
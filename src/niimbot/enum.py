@@ -27,4 +27,7 @@ class RequestCodeEnum(enum.IntEnum):
     ALLOW_PRINT_CLEAR = 32  # 0x20
     SET_DIMENSION = 19  # 0x13
     SET_QUANTITY = 21  # 0x15
-    GET_PRINT_STATUS = 163  # 0xA3
\ No newline at end of file
+    GET_PRINT_STATUS = 163  # 0xA3
+    PRINT_BITMAP_ROW_INDEXED = 131  # 0x83
+    PRINT_EMPTY_ROW = 132  # 0x84
+    PRINT_BITMAP_ROW = 133  # 0x85
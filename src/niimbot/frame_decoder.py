@@ -0,0 +1,95 @@
+from src.niimbot.packet import HEADER, OVERHEAD, NiimbotPacket, xor_checksum
+
+_INCOMPLETE = object()
+_INVALID = object()
+
+
+class FrameDecoder:
+    """Incremental decoder for the 0x55 0x55 ... 0xAA 0xAA packet stream.
+
+    Bytes are consumed through a read cursor and the buffer is compacted only once the
+    consumed prefix outweighs what is left, so decoding stays linear in the input.
+    Anything that is not a well-formed packet is skipped up to the next header.
+    """
+
+    def __init__(self):
+        self._buf = bytearray()
+        self._pos = 0
+        self.packets = 0
+        self.dropped_bytes = 0
+        self.bad_frames = 0
+
+    def __len__(self):
+        return len(self._buf) - self._pos
+
+    def _parse(self, pos, size):
+        buf = self._buf
+        if size - pos < OVERHEAD:
+            return _INCOMPLETE
+        type_ = buf[pos + 2]
+        len_ = buf[pos + 3]
+        end = pos + OVERHEAD + len_
+        if size < end:
+            return _INCOMPLETE
+        if buf[end - 2] != 0xAA or buf[end - 1] != 0xAA:
+            return _INVALID
+        data = bytes(buf[pos + 4:end - 3])
+        if xor_checksum(data, type_ ^ len_) != buf[end - 3]:
+            return _INVALID
+        return NiimbotPacket(type_, data)
+
+    def _next_complete(self, pos):
+        # 길이 바이트가 깨지면 오지 않을 바이트를 기다리게 되므로, 뒤에 완전한 패킷이 있으면 그쪽을 택함
+        nxt = self._buf.find(HEADER, pos + 1)
+        while nxt >= 0:
+            if isinstance(self._parse(nxt, len(self._buf)), NiimbotPacket):
+                return nxt
+            nxt = self._buf.find(HEADER, nxt + 1)
+        return -1
+
+    def feed(self, data) -> list:
+        """Append received bytes and return every packet completed by them."""
+        buf = self._buf
+        buf += data
+        pos = self._pos
+        size = len(buf)
+        packets = []
+
+        while True:
+            start = buf.find(HEADER, pos)
+            if start < 0:
+                # 마지막 0x55 는 다음 헤더의 첫 바이트일 수 있으므로 남김
+                keep = size - 1 if size > pos and buf[-1] == 0x55 else size
+                self.dropped_bytes += keep - pos
+                pos = keep
+                break
+            self.dropped_bytes += start - pos
+            pos = start
+
+            result = self._parse(pos, size)
+            if result is _INVALID:
+                self.bad_frames += 1
+                pos += 1
+                continue
+            if result is _INCOMPLETE:
+                nxt = self._next_complete(pos)
+                if nxt < 0:
+                    break
+                self.bad_frames += 1
+                self.dropped_bytes += nxt - pos
+                pos = nxt
+                continue
+
+            packets.append(result)
+            pos += OVERHEAD + len(result.data)
+
+        if pos * 2 >= size:
+            del buf[:pos]
+            pos = 0
+        self._pos = pos
+        self.packets += len(packets)
+        return packets
+
+    def reset(self):
+        self._buf.clear()
+        self._pos = 0
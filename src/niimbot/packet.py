@@ -1,30 +1,88 @@
+import functools
+import logging
+import operator
+import struct
+
+HEADER = b"\x55\x55"
+TAIL = b"\xaa\xaa"
+OVERHEAD = 7  # header(2) + type(1) + len(1) + checksum(1) + tail(2)
+_PREFIX = struct.Struct(">4B")
+
+
+def xor_checksum(data, seed: int = 0) -> int:
+    """XOR of all bytes in ``data``; long buffers are folded as one big integer instead of byte by byte."""
+    if len(data) < 64:
+        return functools.reduce(operator.xor, data, seed)
+    value = int.from_bytes(data, "little")
+    width = len(data)
+    while width > 1:
+        half = (width + 1) // 2
+        value = (value & ((1 << (half * 8)) - 1)) ^ (value >> (half * 8))
+        width = half
+    return (value ^ seed) & 0xFF
+
+
+def log_buffer(prefix: str, buff: bytes):
+    if not logging.getLogger().isEnabledFor(logging.DEBUG):
+        return
+    msg = ":".join(f"{i:#04x}"[-2:] for i in buff)
+    logging.debug(f"{prefix}: {msg}")
+
+
 class NiimbotPacket:
+    __slots__ = ("type", "data")
+
     def __init__(self, type_, data):
         self.type = type_
         self.data = data
 
     @classmethod
     def from_bytes(cls, pkt):
-        assert pkt[:2] == b"\x55\x55"
-        assert pkt[-2:] == b"\xaa\xaa"
+        assert pkt[:2] == HEADER
+        assert pkt[-2:] == TAIL
         type_ = pkt[2]
         len_ = pkt[3]
-        data = pkt[4 : 4 + len_]
+        data = bytes(pkt[4 : 4 + len_])
 
-        checksum = type_ ^ len_
-        for i in data:
-            checksum ^= i
-        assert checksum == pkt[-3]
+        assert xor_checksum(data, type_ ^ len_) == pkt[-3]
 
         return cls(type_, data)
 
+    @property
+    def size(self):
+        return len(self.data) + OVERHEAD
+
+    def write_into(self, buf, offset=0):
+        """Serialize into ``buf`` at ``offset`` and return the offset past the packet."""
+        len_ = len(self.data)
+        end = offset + 4 + len_
+        _PREFIX.pack_into(buf, offset, 0x55, 0x55, self.type, len_)
+        buf[offset + 4:end] = self.data
+        buf[end] = xor_checksum(self.data, self.type ^ len_)
+        buf[end + 1:end + 3] = TAIL
+        return end + 3
+
     def to_bytes(self):
-        checksum = self.type ^ len(self.data)
-        for i in self.data:
-            checksum ^= i
-        return bytes(
-            (0x55, 0x55, self.type, len(self.data), *self.data, checksum, 0xAA, 0xAA)
-        )
+        buf = bytearray(self.size)
+        self.write_into(buf)
+        return bytes(buf)
 
     def __repr__(self):
         return f"<NiimbotPacket type={self.type} data={self.data}>"
+
+
+class FrameBuffer:
+    """Preallocated buffer that packets are serialized into back to back."""
+
+    __slots__ = ("_buf", "_view", "length")
+
+    def __init__(self, capacity: int):
+        self._buf = bytearray(capacity)
+        self._view = memoryview(self._buf)
+        self.length = 0
+
+    def append(self, packet: NiimbotPacket):
+        self.length = packet.write_into(self._buf, self.length)
+
+    def view(self) -> memoryview:
+        return self._view[:self.length]
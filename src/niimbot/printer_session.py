@@ -0,0 +1,418 @@
+import logging
+import struct
+import time
+
+from PIL import Image
+
+from src.niimbot.completion_waiter import CompletionWaiter, PrintTimeEstimator
+from src.niimbot.enum import RequestCodeEnum
+from src.niimbot.printer_state import PrinterState, PrinterStateCache
+from src.niimbot.protocol import parse_heartbeat, parse_info, parse_print_status, parse_rfid
+from src.niimbot.packet import log_buffer
+from src.niimbot.raster import FLOYD_STEINBERG, PackedImage, as_packed, pack_image
+from src.niimbot.response_engine import ResponseEngine
+from src.niimbot.row_encoder import encode_frame
+
+
+QUANTITY_STALL_TIMEOUT = 2.0  # 수량 무시 판단을 위한 유휴 대기 시간 (초)
+PAGE_TIMEOUT = 30  # 페이지 카운터가 이 시간 동안 그대로면 실패 처리 (초)
+
+
+class PrintJobError(Exception):
+    """Print job failure that records which pages were printed before it stopped."""
+
+    def __init__(self, message, completed_pages=()):
+        super().__init__(message)
+        self.completed_pages = list(completed_pages)
+
+
+class PrinterFault(Exception):
+    """Device condition that keeps a printer from printing: cover open, jam, no response, ...
+
+    ``reason`` names the condition without the surrounding context, so callers such as a
+    printer pool can report it and move the job to another printer. Errors that wrap a
+    fault keep it as their ``__cause__``.
+    """
+
+    def __init__(self, reason, message=None):
+        super().__init__(message or reason)
+        self.reason = reason
+
+
+class PrinterTimeout(PrinterFault, TimeoutError):
+    """The printer did not answer a command."""
+
+
+def find_fault(error):
+    """The PrinterFault behind ``error``, following ``raise ... from`` causes, or None."""
+    while error is not None:
+        if isinstance(error, PrinterFault):
+            return error
+        error = error.__cause__
+    return None
+
+
+def validate_printer_state(state: PrinterState):
+    """Raise if the printer state reports a condition that prevents printing."""
+    if state.heartbeat_at is None:
+        logging.error("Printer error: No heartbeat response")
+        raise PrinterFault("Printer did not respond to heartbeat")
+
+    # Check cover status
+    if state.closingstate != 0:
+        logging.error("Printer error: Cover is open")
+        raise PrinterFault("Printer cover is open")
+
+    # Check battery level
+    if state.powerlevel is not None and state.powerlevel < 1:
+        logging.error(f"Printer error: Low battery (Level: {state.powerlevel})")
+        raise PrinterFault("Printer battery is too low")
+
+    # Check print status for paper jam or other issues
+    if state.is_enabled is False:
+        logging.error("Printer error: Device is disabled (paper jam or other error)")
+        raise PrinterFault("Printer is in an unusable state (paper jam or other error)")
+
+
+async def _enumerate_pages(images):
+    # 비동기 이터러블이면 다음 페이지를 준비하는 동안 이벤트 루프를 막지 않음
+    index = 0
+    if hasattr(images, "__aiter__"):
+        async for image in images:
+            yield index, image
+            index += 1
+    else:
+        for image in images:
+            yield index, image
+            index += 1
+
+
+class PrinterSession:
+    """Print session and command logic shared by NiimbotPrint and AsyncNiimbotPrint.
+
+    Every command is a coroutine that does its I/O through four hooks: ``_transceive_many``,
+    ``_write``, ``_sleep`` and ``_reconnect``. AsyncNiimbotPrint implements them on the event
+    loop; NiimbotPrint implements them as blocking calls, so its coroutines never suspend and
+    run to completion on the calling thread.
+    """
+
+    def __init__(self, transport, density=5, label_type=1, compress_rows=False, state_max_age=5.0,
+                 rows_per_second=None, raster_mode=FLOYD_STEINBERG):
+        assert 1 <= density <= 5, "Density must be between 1 and 5"
+        assert 1 <= label_type <= 3, "Label type must be between 1 and 3"
+
+        self._transport = transport
+        self._engine = ResponseEngine(self._transport)
+        # 응답이 지나갈 때마다 상태를 갱신하므로 최근 상태는 다시 묻지 않음
+        self._state = PrinterStateCache(state_max_age)
+        self._engine.add_listener(self._state.observe)
+        # 출력 완료 대기: 예상 시간만큼 쉰 뒤 점점 간격을 늘리며 상태 조회
+        self.completion = CompletionWaiter(PrintTimeEstimator(density, rows_per_second))
+        self.density = density
+        self.label_type = label_type
+        self.compress_rows = compress_rows
+        self.raster_mode = raster_mode  # 1비트가 아닌 이미지를 변환하는 방식
+        self._quantity_supported = True
+
+    async def _transceive_many(self, requests, timeout=None):
+        """Pipeline ``(reqcode, data, respoffset)`` requests and return their responses in order."""
+        raise NotImplementedError
+
+    async def _write(self, data):
+        raise NotImplementedError
+
+    async def _sleep(self, seconds):
+        raise NotImplementedError
+
+    async def _reconnect(self):
+        raise NotImplementedError
+
+    async def initialize(self):
+        """Send the configured density and label type to the printer."""
+        await self.set_label_density(self.density)
+        await self.set_label_type(self.label_type)
+        logging.info("Printer initialized successfully")
+
+    @property
+    def state(self) -> PrinterState:
+        """Latest printer state seen on the wire, without querying the printer."""
+        return self._state.snapshot()
+
+    async def check_printer_connection(self):
+        """Check printer connection status and attempt reconnection if necessary."""
+        logging.info("Initiating printer connection check")
+
+        if self._state.heartbeat_fresh():
+            logging.debug("Printer connection check: OK (recent heartbeat)")
+            return True
+
+        try:
+            status = await self.heartbeat()
+
+            if status is None:
+                logging.warning("Printer connection lost, attempting reconnection")
+
+                # Attempt reconnection
+                await self._reconnect()
+                self._engine.reset()
+                self._state.invalidate()
+                logging.info("Waiting for printer to initialize after reconnection")
+                await self._sleep(1)
+
+                # Verify reconnection
+                status = await self.heartbeat()
+                if status is None:
+                    logging.error("Printer reconnection failed - No response received")
+                    raise PrinterFault("Printer connection failed after reconnection attempt")
+
+                logging.info("Printer reconnection successful")
+                return True
+
+            logging.debug("Printer connection check: OK")
+            return True
+
+        except Exception as e:
+            error_msg = str(e)
+            logging.error(f"Printer communication error: {error_msg}")
+            fault = find_fault(e)
+            raise PrinterFault(fault.reason if fault else "Printer communication error",
+                               f"Printer communication error: {error_msg}") from e
+
+    async def check_printer_status(self):
+        """Check printer status and raise exceptions for any detected issues."""
+        logging.info("Starting comprehensive printer status check")
+
+        try:
+            if self._state.is_fresh():
+                logging.debug("Using cached printer state")
+            else:
+                logging.debug("Retrieving printer heartbeat and status")
+                heartbeat, _ = await self.heartbeat_and_print_status()
+                if heartbeat is None:
+                    # Reconnect, then query again
+                    logging.debug("Verifying printer connection")
+                    self._state.invalidate()
+                    await self.check_printer_connection()
+                    await self.heartbeat_and_print_status()
+
+            validate_printer_state(self._state.snapshot())
+
+            logging.info("Printer status check completed successfully")
+            return True
+
+        except Exception as e:
+            error_msg = str(e)
+            logging.error(f"Printer status check failed: {error_msg}")
+            raise Exception(f"Printer status error: {error_msg}") from e
+
+    async def print_image(self, image: Image.Image, copies=1, raster_mode=None):
+        """Print the provided image using the thermal printer.
+
+        ``raster_mode`` overrides the printer's default conversion to 1 bit for this image.
+        """
+        await self.print_bitmap(pack_image(image, raster_mode or self.raster_mode), copies=copies)
+
+    async def print_bitmap(self, bitmap, copies=1):
+        """Print a PackedImage or a mode "1" image in printer polarity (1 = burn) without converting it."""
+        await self.print_pages([as_packed(bitmap)], copies=copies)
+
+    async def print_pages(self, images, copies=1, on_page=None, on_copy=None):
+        """Print an iterable of images or PackedImage frames as the pages of a single print session.
+
+        AsyncNiimbotPrint also accepts an async iterable. Each page is printed ``copies``
+        times and tracked through the ``page`` counter of GET_PRINT_STATUS: ``on_copy(index,
+        done)`` is called as copies come out and ``on_page(index)`` once all copies of a page
+        are done. Returns the indexes of the printed pages; on failure raises PrintJobError
+        carrying the indexes printed so far.
+        """
+        logging.info("Starting new print job")
+        completed = []
+
+        try:
+            logging.debug("Performing initial printer status check")
+            await self.check_printer_status()
+
+            logging.debug("Initializing print sequence")
+            await self.start_print()
+            await self.allow_print_clear()
+
+            printed = 0
+            async for index, image in _enumerate_pages(images):
+                logging.debug(f"Sending page {index + 1} x{copies} - Height: {image.height}, Width: {image.width}")
+                printed = await self._print_copies(image, copies, printed,
+                                                   on_copy and (lambda done, index=index: on_copy(index, done)))
+                completed.append(index)
+                if on_page:
+                    on_page(index)
+
+            logging.debug("Completing print job")
+            await self.end_print()
+
+            logging.info(f"Print job completed successfully ({len(completed)} pages)")
+            return completed
+
+        except Exception as e:
+            error_msg = str(e)
+            logging.error(f"Print job failed after {len(completed)} pages: {error_msg}")
+            self._state.invalidate()
+
+            try:
+                logging.debug("Attempting to clean up failed print job")
+                await self.end_print()
+            except Exception as cleanup_error:
+                logging.warning(f"Failed to clean up print job: {str(cleanup_error)}")
+
+            raise PrintJobError(f"Print job failed: {error_msg}", completed) from e
+
+    async def _send_page(self, image, quantity):
+        """Send one page and return the quantity the printer was asked to print."""
+        await self.start_page_print()
+        await self.set_dimension(image.height, image.width)
+        if quantity > 1 and not await self._request_quantity(quantity):
+            quantity = 1
+        await self.receive_image(image)
+        await self.end_page_print()
+        return quantity
+
+    async def _request_quantity(self, quantity):
+        try:
+            if await self.set_quantity(quantity):
+                return True
+        except Exception as e:
+            logging.debug(f"SET_QUANTITY failed: {str(e)}")
+        logging.warning("Printer rejected SET_QUANTITY, sending copies one by one")
+        self._quantity_supported = False
+        return False
+
+    async def _print_copies(self, image, copies, printed, on_copy=None):
+        """Print ``copies`` of one page; ``printed`` is the page counter before it. Returns the new counter."""
+        first = printed
+        while printed - first < copies:
+            quantity = copies - (printed - first) if self._quantity_supported else 1
+            quantity = await self._send_page(image, quantity)
+            status = await self._wait_for_page(
+                printed + quantity, printed, image.size,
+                on_progress=on_copy and (lambda page: on_copy(page - first)),
+                stall_timeout=QUANTITY_STALL_TIMEOUT if quantity > 1 else None,
+            )
+            if status['page'] < printed + quantity:
+                # 수량 명령을 무시하는 모델: 남은 매수는 한 장씩 다시 전송
+                logging.warning("Printer ignored SET_QUANTITY, sending remaining copies one by one")
+                self._quantity_supported = False
+            printed = status['page']
+        return printed
+
+    async def _wait_for_page(self, page, since, size, timeout=None, on_progress=None, stall_timeout=None):
+        """Wait until the GET_PRINT_STATUS page counter goes from ``since`` to ``page``.
+
+        ``size`` is the ``(width, height)`` of the page; the completion waiter sleeps until
+        the pages should be nearly done and then polls with backoff. ``timeout`` (default
+        PAGE_TIMEOUT) limits the time without progress, so the deadline restarts whenever
+        the counter advances and a long run of copies is never cut short. With
+        ``stall_timeout`` it also returns early once the printer has been idle for that long
+        after printing at least one more page, so the caller can detect an ignored quantity.
+        """
+        timeout = PAGE_TIMEOUT if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+        last_page = since
+        idle_since = None
+        polls = 0
+
+        for delay in self.completion.delays(*size, pages=page - since):
+            await self._sleep(max(0.0, min(delay, deadline - time.monotonic())))
+            status = await self.get_print_status()
+            polls += 1
+            if status:
+                if not status['isEnabled']:
+                    logging.error("Printer became disabled during print job")
+                    raise PrinterFault("Printer entered unusable state during printing")
+                if status['page'] != last_page:
+                    last_page = status['page']
+                    idle_since = None
+                    deadline = time.monotonic() + timeout
+                    if on_progress:
+                        on_progress(last_page)
+                if status['page'] >= page:
+                    self.completion.finished(*size, page - since, time.monotonic() - started, polls)
+                    return status
+                if stall_timeout and status['page'] > since and status['progress1'] == 100:
+                    idle_since = idle_since or time.monotonic()
+                    if time.monotonic() - idle_since > stall_timeout:
+                        self.completion.finished(*size, page - since, time.monotonic() - started, polls,
+                                                 complete=False)
+                        return status
+
+            if time.monotonic() > deadline:
+                self.completion.finished(*size, page - since, time.monotonic() - started, polls, complete=False)
+                logging.error(f"Page {page} timed out after {timeout} seconds without progress "
+                              f"(page counter at {last_page})")
+                raise PrinterFault("Print job timeout")
+
+    async def _transceiver(self, reqcode, data, respoffset=1):
+        return (await self._transceive_many([(reqcode, data, respoffset)]))[0]
+
+    async def _command(self, reqcode, data, respoffset=1):
+        packet = await self._transceiver(reqcode, data, respoffset)
+        if packet is None:
+            raise PrinterTimeout("Printer did not respond", f"No response from printer for command {reqcode}")
+        return bool(packet.data[0])
+
+    async def get_info(self, key):
+        return parse_info(key, await self._transceiver(RequestCodeEnum.GET_INFO, bytes((key,)), key))
+
+    async def get_rfid(self):
+        return parse_rfid(await self._transceiver(RequestCodeEnum.GET_RFID, b"\x01"))
+
+    async def heartbeat(self):
+        return parse_heartbeat(await self._transceiver(RequestCodeEnum.HEARTBEAT, b"\x01"))
+
+    async def heartbeat_and_print_status(self):
+        """Send HEARTBEAT and GET_PRINT_STATUS together and return both parsed responses."""
+        heartbeat, status = await self._transceive_many([
+            (RequestCodeEnum.HEARTBEAT, b"\x01", 1),
+            (RequestCodeEnum.GET_PRINT_STATUS, b"\x01", 16),
+        ])
+        return parse_heartbeat(heartbeat), parse_print_status(status)
+
+    async def receive_image(self, image: Image):
+        await self.receive_bitmap(image if isinstance(image, PackedImage) else pack_image(image, self.raster_mode))
+
+    async def receive_bitmap(self, packed: PackedImage):
+        # 모든 행 패킷을 하나의 버퍼로 만들어 한 번에 전송
+        frame = encode_frame(packed, self.compress_rows)
+        log_buffer("send", frame)
+        await self._write(frame)
+
+    async def set_label_type(self, n):
+        assert 1 <= n <= 3
+        return await self._command(RequestCodeEnum.SET_LABEL_TYPE, bytes((n,)), 16)
+
+    async def set_label_density(self, n):
+        assert 1 <= n <= 5  # B21 has 5 levels, not sure for D11
+        self.completion.estimator.density = n
+        return await self._command(RequestCodeEnum.SET_LABEL_DENSITY, bytes((n,)), 16)
+
+    async def start_print(self):
+        return await self._command(RequestCodeEnum.START_PRINT, b"\x01")
+
+    async def end_print(self):
+        return await self._command(RequestCodeEnum.END_PRINT, b"\x01")
+
+    async def start_page_print(self):
+        return await self._command(RequestCodeEnum.START_PAGE_PRINT, b"\x01")
+
+    async def end_page_print(self):
+        return await self._command(RequestCodeEnum.END_PAGE_PRINT, b"\x01")
+
+    async def allow_print_clear(self):
+        return await self._command(RequestCodeEnum.ALLOW_PRINT_CLEAR, b"\x01", 16)
+
+    async def set_dimension(self, h, w):
+        return await self._command(RequestCodeEnum.SET_DIMENSION, struct.pack(">HH", h, w))
+
+    async def set_quantity(self, n):
+        return await self._command(RequestCodeEnum.SET_QUANTITY, struct.pack(">H", n))
+
+    async def get_print_status(self):
+        return parse_print_status(await self._transceiver(RequestCodeEnum.GET_PRINT_STATUS, b"\x01", 16))
@@ -0,0 +1,87 @@
+import threading
+import time
+
+from src.niimbot.enum import RequestCodeEnum
+from src.niimbot.protocol import parse_heartbeat, parse_print_status
+
+HEARTBEAT_RESPONSE = RequestCodeEnum.HEARTBEAT + 1
+PRINT_STATUS_RESPONSE = RequestCodeEnum.GET_PRINT_STATUS + 16
+
+
+class PrinterState:
+    """Snapshot of the last heartbeat and print status reported by the printer."""
+
+    __slots__ = (
+        "closingstate", "powerlevel", "paperstate", "rfidreadstate",
+        "page", "progress1", "progress2", "state1", "state2", "is_enabled",
+        "heartbeat_at", "status_at",
+    )
+
+    def __init__(self):
+        for name in self.__slots__:
+            setattr(self, name, None)
+
+    def copy(self):
+        state = PrinterState()
+        for name in self.__slots__:
+            setattr(state, name, getattr(self, name))
+        return state
+
+    def age(self, now=None) -> float:
+        """Seconds since the older of the two halves was refreshed (inf if either is missing)."""
+        if self.heartbeat_at is None or self.status_at is None:
+            return float("inf")
+        now = time.monotonic() if now is None else now
+        return now - min(self.heartbeat_at, self.status_at)
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)}" for name in self.__slots__)
+        return f"<PrinterState {fields}>"
+
+
+class PrinterStateCache:
+    """Printer state kept up to date from every heartbeat/status response that goes by.
+
+    Nothing is polled here; the cache only listens, so checks can skip a round trip
+    whenever the printer has answered recently enough.
+    """
+
+    def __init__(self, max_age: float = 5.0):
+        self.max_age = max_age
+        self._state = PrinterState()
+        self._lock = threading.Lock()
+
+    def observe(self, packet):
+        if packet.type == HEARTBEAT_RESPONSE:
+            heartbeat = parse_heartbeat(packet)
+            with self._lock:
+                for key, value in heartbeat.items():
+                    setattr(self._state, key, value)
+                self._state.heartbeat_at = time.monotonic()
+        elif packet.type == PRINT_STATUS_RESPONSE:
+            status = parse_print_status(packet)
+            if status is None:
+                return
+            with self._lock:
+                self._state.page = status["page"]
+                self._state.progress1 = status["progress1"]
+                self._state.progress2 = status["progress2"]
+                self._state.state1 = status["state1"]
+                self._state.state2 = status["state2"]
+                self._state.is_enabled = status["isEnabled"]
+                self._state.status_at = time.monotonic()
+
+    def snapshot(self) -> PrinterState:
+        with self._lock:
+            return self._state.copy()
+
+    def heartbeat_fresh(self) -> bool:
+        at = self._state.heartbeat_at
+        return at is not None and time.monotonic() - at <= self.max_age
+
+    def is_fresh(self) -> bool:
+        return self._state.age() <= self.max_age
+
+    def invalidate(self):
+        with self._lock:
+            self._state = PrinterState()
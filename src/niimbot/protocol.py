@@ -0,0 +1,110 @@
+import struct
+
+from src.niimbot.enum import InfoEnum
+
+
+def packet_to_int(x):
+    return int.from_bytes(x.data, "big")
+
+
+def parse_info(key, packet):
+    if packet:
+        match key:
+            case InfoEnum.DEVICESERIAL:
+                return packet.data.hex()
+            case InfoEnum.SOFTVERSION:
+                return packet_to_int(packet) / 100
+            case InfoEnum.HARDVERSION:
+                return packet_to_int(packet) / 100
+            case _:
+                return packet_to_int(packet)
+    else:
+        return None
+
+
+def parse_rfid(packet):
+    data = packet.data
+
+    if len(data) < 1:
+        raise RuntimeError("Invalid RFID data: empty response")
+
+    if data[0] == 0:
+        return None
+    uuid = data[0:8].hex()
+    idx = 8
+
+    barcode_len = data[idx]
+    idx += 1
+    barcode = data[idx: idx + barcode_len].decode()
+
+    idx += barcode_len
+    serial_len = data[idx]
+    idx += 1
+    serial = data[idx: idx + serial_len].decode()
+
+    idx += serial_len
+    total_len, used_len, type_ = struct.unpack(">HHB", data[idx:])
+    return {
+        "uuid": uuid,
+        "barcode": barcode,
+        "serial": serial,
+        "used_len": used_len,
+        "total_len": total_len,
+        "type": type_,
+    }
+
+
+def parse_heartbeat(packet):
+    if packet is None:
+        return None
+
+    closingstate = None
+    powerlevel = None
+    paperstate = None
+    rfidreadstate = None
+
+    match len(packet.data):
+        case 20:
+            paperstate = packet.data[18]
+            rfidreadstate = packet.data[19]
+        case 13:
+            closingstate = packet.data[9]
+            powerlevel = packet.data[10]
+            paperstate = packet.data[11]
+            rfidreadstate = packet.data[12]
+        case 19:
+            closingstate = packet.data[15]
+            powerlevel = packet.data[16]
+            paperstate = packet.data[17]
+            rfidreadstate = packet.data[18]
+        case 10:
+            closingstate = packet.data[8]
+            powerlevel = packet.data[9]
+            rfidreadstate = packet.data[8]
+        case 9:
+            closingstate = packet.data[8]
+
+    return {
+        "closingstate": closingstate,
+        "powerlevel": powerlevel,
+        "paperstate": paperstate,
+        "rfidreadstate": rfidreadstate,
+    }
+
+
+def parse_print_status(packet):
+    try:
+        if packet and len(packet.data) == 10:
+            status = {
+                "page": struct.unpack(">H", packet.data[0:2])[0],
+                "progress1": packet.data[2],
+                "progress2": packet.data[3],
+                "state1": packet.data[4],
+                "state2": packet.data[5],
+                "isEnabled": packet.data[6] == 0,  # 0x00이면 True, 0x01이면 False
+                "reserved": packet.data[7:]
+            }
+            return status
+        return None
+    except (struct.error, IndexError):
+        return None
@@ -0,0 +1,152 @@
+import math
+
+from PIL import Image, ImageChops, ImageOps
+
+THRESHOLD = "threshold"
+OTSU = "otsu"
+BAYER = "bayer"
+FLOYD_STEINBERG = "floyd_steinberg"
+RASTER_MODES = (THRESHOLD, OTSU, BAYER, FLOYD_STEINBERG)
+
+_BAYER_2 = ((0, 2), (3, 1))
+
+
+class PackedImage:
+    """1-bit printer frame, MSB-first, ``row_bytes`` bytes per scanline (1 = burn)."""
+
+    __slots__ = ("width", "height", "row_bytes", "data")
+
+    def __init__(self, width: int, height: int, data: bytes):
+        self.width = width
+        self.height = height
+        self.row_bytes = math.ceil(width / 8)
+        self.data = data
+
+        if len(data) != self.row_bytes * height:
+            raise ValueError(f"Packed data size mismatch: {len(data)} != {self.row_bytes * height}")
+
+    @property
+    def size(self):
+        return self.width, self.height
+
+    def row(self, y: int) -> bytes:
+        start = y * self.row_bytes
+        return self.data[start:start + self.row_bytes]
+
+    def rows(self):
+        for y in range(self.height):
+            yield self.row(y)
+
+    def __repr__(self):
+        return f"<PackedImage {self.width}x{self.height} row_bytes={self.row_bytes}>"
+
+
+def pack_bitmap(bitmap: Image.Image) -> PackedImage:
+    """Pack a mode "1" image whose set pixels are the dots to burn."""
+    if bitmap.mode != "1":
+        raise ValueError(f"Expected a mode '1' image, got '{bitmap.mode}'")
+
+    width, height = bitmap.size
+    row_bytes = math.ceil(width / 8)
+
+    # 프린터는 행 데이터를 오른쪽 정렬로 받으므로 남는 비트는 왼쪽에 채움
+    pad = row_bytes * 8 - width
+    if pad:
+        padded = Image.new("1", (row_bytes * 8, height), 0)
+        padded.paste(bitmap, (pad, 0))
+        bitmap = padded
+
+    return PackedImage(width, height, bitmap.tobytes())
+
+
+def _burn_lut(threshold: int):
+    # 임계값보다 어두운 픽셀을 출력 (1 = burn)
+    return [255 if value < threshold else 0 for value in range(256)]
+
+
+_NONZERO_LUT = [0] + [255] * 255
+
+
+def otsu_threshold(gray: Image.Image) -> int:
+    """Threshold that maximizes the between-class variance of the histogram (Otsu's method)."""
+    histogram = gray.histogram()
+    total = sum(histogram)
+    weighted_total = sum(value * count for value, count in enumerate(histogram))
+
+    best, best_variance = 128, -1.0
+    background = weighted_background = 0
+    for value, count in enumerate(histogram):
+        background += count
+        if background == 0:
+            continue
+        foreground = total - background
+        if foreground == 0:
+            break
+        weighted_background += value * count
+        mean_background = weighted_background / background
+        mean_foreground = (weighted_total - weighted_background) / foreground
+        variance = background * foreground * (mean_background - mean_foreground) ** 2
+        if variance > best_variance:
+            best, best_variance = value + 1, variance
+    return best
+
+
+def _bayer_matrix(order: int):
+    matrix = _BAYER_2
+    while len(matrix) < order:
+        size = len(matrix)
+        matrix = tuple(
+            tuple(4 * matrix[y % size][x % size] + _BAYER_2[y // size][x // size] for x in range(size * 2))
+            for y in range(size * 2)
+        )
+    return matrix
+
+
+_bayer_tiles = {}
+
+
+def _bayer_thresholds(size, order=8) -> Image.Image:
+    """Per-pixel thresholds of an ``order`` x ``order`` Bayer matrix tiled over ``size``."""
+    key = (size, order)
+    tile = _bayer_tiles.get(key)
+    if tile is None:
+        matrix = _bayer_matrix(order)
+        levels = order * order
+        cell = Image.frombytes("L", (order, order), bytes(
+            (2 * value + 1) * 256 // (2 * levels) for row in matrix for value in row
+        ))
+        tile = Image.new("L", size)
+        for y in range(0, size[1], order):
+            for x in range(0, size[0], order):
+                tile.paste(cell, (x, y))
+        _bayer_tiles[key] = tile
+    return tile
+
+
+def binarize(gray: Image.Image, mode: str = THRESHOLD, threshold: int = 128) -> Image.Image:
+    """Convert a black-on-white mode "L" image to a printer-polarity mode "1" image (1 = burn).
+
+    ``threshold`` burns pixels darker than a fixed level, ``otsu`` picks that level from
+    the histogram, ``bayer`` compares each pixel with a tiled 8x8 Bayer matrix and
+    ``floyd_steinberg`` is Pillow's error diffusion (the previous default).
+    """
+    if mode == THRESHOLD:
+        return gray.point(_burn_lut(threshold), "1")
+    if mode == OTSU:
+        return gray.point(_burn_lut(otsu_threshold(gray)), "1")
+    if mode == BAYER:
+        # 임계값 - 밝기 > 0 인 픽셀만 출력
+        return ImageChops.subtract(_bayer_thresholds(gray.size), gray).point(_NONZERO_LUT, "1")
+    if mode == FLOYD_STEINBERG:
+        return ImageOps.invert(gray).convert("1")
+    raise ValueError(f"Unknown raster mode '{mode}', expected one of {', '.join(RASTER_MODES)}")
+
+
+def pack_image(image: Image.Image, mode: str = FLOYD_STEINBERG, threshold: int = 128) -> PackedImage:
+    """Convert an image with black ink on white paper to a packed printer frame."""
+    return pack_bitmap(binarize(image.convert("L"), mode, threshold))
+
+
+def as_packed(bitmap) -> PackedImage:
+    """Return a PackedImage as is, or pack a mode "1" image already in printer polarity."""
+    return bitmap if isinstance(bitmap, PackedImage) else pack_bitmap(bitmap)
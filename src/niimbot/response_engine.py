@@ -0,0 +1,222 @@
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+from src.niimbot.frame_decoder import FrameDecoder
+from src.niimbot.packet import NiimbotPacket, log_buffer
+
+ERROR_RESPONSE = 219  # 0xDB
+NOT_IMPLEMENTED_RESPONSE = 0
+
+
+class RttEstimator:
+    """Smoothed round-trip time and timeout per command (RFC 6298 style).
+
+    The timeout never drops below ``min_timeout`` (1 s, as RFC 6298 recommends), so a
+    printer that answers fast over USB still gets time to respond while feeding paper.
+    """
+
+    __slots__ = ("srtt", "rttvar", "initial", "min_timeout", "max_timeout", "samples")
+
+    def __init__(self, initial=1.0, min_timeout=1.0, max_timeout=3.0):
+        self.srtt = None
+        self.rttvar = None
+        self.initial = initial
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.samples = 0
+
+    def observe(self, rtt: float):
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - rtt)
+            self.srtt = 0.875 * self.srtt + 0.125 * rtt
+        self.samples += 1
+
+    @property
+    def timeout(self) -> float:
+        if self.srtt is None:
+            return self.initial
+        return min(self.max_timeout, max(self.min_timeout, self.srtt + 4 * self.rttvar))
+
+
+class _Pending:
+    __slots__ = ("reqcode", "respcode", "future", "sent_at")
+
+    def __init__(self, reqcode, respcode):
+        self.reqcode = reqcode
+        self.respcode = respcode
+        self.future = Future()
+        self.sent_at = None
+
+
+class ResponseEngine:
+    """Background reader that matches decoded packets to outstanding requests.
+
+    Each request registers a future under its response code before it is written, so a
+    response is delivered as soon as the reader decodes it instead of on the next poll.
+    Several requests can be written in one go and awaited together.
+    """
+
+    def __init__(self, transport, initial_timeout=1.0):
+        self._transport = transport
+        self._decoder = FrameDecoder()
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._order = deque()
+        self._rtt = {}
+        self._listeners = []
+        self._initial_timeout = initial_timeout
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._read_loop, name="niimbot-reader", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def reset(self):
+        """Drop buffered bytes and fail outstanding requests, e.g. after a reconnect."""
+        with self._lock:
+            self._decoder.reset()
+            pending = list(self._order)
+            self._pending.clear()
+            self._order.clear()
+        for entry in pending:
+            if not entry.future.done():
+                entry.future.set_result(None)
+
+    def add_listener(self, callback):
+        """Call ``callback(packet)`` for every decoded packet, before it is matched to a request."""
+        self._listeners.append(callback)
+
+    def rtt(self, reqcode) -> RttEstimator:
+        if reqcode not in self._rtt:
+            self._rtt[reqcode] = RttEstimator(self._initial_timeout)
+        return self._rtt[reqcode]
+
+    def _read_loop(self):
+        while self._running:
+            try:
+                data = self._transport.read_available()
+            except Exception as e:
+                # 재연결 중에는 포트가 닫혀 있을 수 있음
+                logging.debug(f"Printer read failed: {str(e)}")
+                time.sleep(0.1)
+                continue
+            if data:
+                self.feed(data)
+
+    def feed(self, data: bytes):
+        log_buffer("recv", data)
+        with self._lock:
+            packets = self._decoder.feed(data)
+        now = time.monotonic()
+        for packet in packets:
+            for listener in self._listeners:
+                try:
+                    listener(packet)
+                except Exception as e:
+                    logging.warning(f"Packet listener failed: {str(e)}")
+            self._dispatch(packet, now)
+
+    def _dispatch(self, packet: NiimbotPacket, now: float):
+        with self._lock:
+            if packet.type in (ERROR_RESPONSE, NOT_IMPLEMENTED_RESPONSE):
+                # 오류 응답에는 요청 코드가 없으므로 가장 오래된 요청을 실패 처리
+                entry = self._order.popleft() if self._order else None
+                if entry:
+                    self._pending[entry.respcode].remove(entry)
+            else:
+                waiters = self._pending.get(packet.type)
+                entry = waiters.popleft() if waiters else None
+                if entry:
+                    self._order.remove(entry)
+
+        if entry is None:
+            logging.debug(f"Unsolicited packet: {packet}")
+            return
+        if entry.future.done():
+            return
+        if packet.type == ERROR_RESPONSE:
+            entry.future.set_exception(ValueError(f"Printer rejected command {entry.reqcode}"))
+        elif packet.type == NOT_IMPLEMENTED_RESPONSE:
+            entry.future.set_exception(NotImplementedError(f"Printer does not support command {entry.reqcode}"))
+        else:
+            self.rtt(entry.reqcode).observe(now - entry.sent_at)
+            entry.future.set_result(packet)
+
+    def _register(self, reqcode, respcode) -> _Pending:
+        entry = _Pending(reqcode, respcode)
+        with self._lock:
+            self._pending.setdefault(respcode, deque()).append(entry)
+            self._order.append(entry)
+        return entry
+
+    def discard(self, entry: _Pending):
+        with self._lock:
+            waiters = self._pending.get(entry.respcode)
+            if waiters and entry in waiters:
+                waiters.remove(entry)
+                self._order.remove(entry)
+
+    def submit(self, requests):
+        """Register ``(reqcode, data, respcode)`` requests; return their entries and the bytes to write."""
+        entries = [self._register(reqcode, respcode) for reqcode, _, respcode in requests]
+        raw = b"".join(NiimbotPacket(reqcode, data).to_bytes() for reqcode, data, _ in requests)
+        log_buffer("send", raw)
+        sent_at = time.monotonic()
+        for entry in entries:
+            entry.sent_at = sent_at
+        return entries, raw
+
+    def timeout_for(self, entry: _Pending, timeout=None) -> float:
+        return timeout if timeout is not None else self.rtt(entry.reqcode).timeout
+
+    def _wait(self, entry: _Pending, timeout):
+        try:
+            return entry.future.result(self.timeout_for(entry, timeout))
+        except FutureTimeoutError:
+            self.discard(entry)
+            logging.debug(f"No response for command {entry.reqcode} (waiting for {entry.respcode})")
+            return None
+
+    def request_many(self, requests, timeout=None) -> list:
+        """Send ``(reqcode, data, respcode)`` requests in one write and wait for all responses.
+
+        A missing response yields None in its slot, like a single request that times out.
+        """
+        entries, raw = self.submit(requests)
+        try:
+            self._transport.write(raw)
+        except Exception:
+            for entry in entries:
+                self.discard(entry)
+            raise
+
+        results = []
+        error = None
+        for entry in entries:
+            try:
+                results.append(self._wait(entry, timeout))
+            except Exception as e:
+                error = error or e
+                results.append(None)
+        if error:
+            raise error
+        return results
+
+    def request(self, reqcode, data, respcode, timeout=None):
+        return self.request_many([(reqcode, data, respcode)], timeout)[0]
@@ -0,0 +1,112 @@
+import struct
+
+from src.niimbot.enum import RequestCodeEnum
+from src.niimbot.packet import FrameBuffer, NiimbotPacket, OVERHEAD
+from src.niimbot.raster import PackedImage
+
+MAX_REPEAT = 255
+ROW_HEADER = struct.Struct(">H3BB")
+
+
+def count_pixels(row: bytes) -> tuple:
+    """Black-pixel counts for a row header: per-third counts, or the total when a third overflows a byte."""
+    chunk = len(row) // 3
+    if chunk:
+        parts = tuple(int.from_bytes(row[i * chunk:(i + 1) * chunk], "big").bit_count() for i in range(3))
+        parts = (parts[0], parts[1], parts[2] + int.from_bytes(row[3 * chunk:], "big").bit_count())
+        if max(parts) <= 0xFF:
+            return parts
+    total = int.from_bytes(row, "big").bit_count()
+    return (0, *struct.pack(">H", total))
+
+
+def _pixel_indexes(row: bytes) -> list:
+    bits = int.from_bytes(row, "big")
+    width = len(row) * 8
+    indexes = []
+    while bits:
+        low = bits & -bits
+        indexes.append(width - low.bit_length())
+        bits ^= low
+    indexes.reverse()
+    return indexes
+
+
+def encode_row(y: int, row: bytes, repeat: int = 1) -> NiimbotPacket:
+    """Build the cheapest packet for ``repeat`` identical rows starting at ``y``."""
+    if not any(row):
+        return NiimbotPacket(RequestCodeEnum.PRINT_EMPTY_ROW, struct.pack(">HB", y, repeat))
+
+    header = ROW_HEADER.pack(y, *count_pixels(row), repeat)
+    if int.from_bytes(row, "big").bit_count() * 2 < len(row):
+        # 검은 점이 적으면 좌표 목록(점당 2바이트)이 비트맵보다 짧음
+        indexes = _pixel_indexes(row)
+        return NiimbotPacket(RequestCodeEnum.PRINT_BITMAP_ROW_INDEXED,
+                             header + struct.pack(f">{len(indexes)}H", *indexes))
+    return NiimbotPacket(RequestCodeEnum.PRINT_BITMAP_ROW, header + row)
+
+
+def encode_rows(packed: PackedImage, compress: bool = False):
+    """Yield row packets for a packed frame.
+
+    Without ``compress`` every row is a plain bitmap packet with zero counts, as the
+    printer has always received. With ``compress`` identical neighbouring rows are
+    merged and each run is sent as a blank, indexed or bitmap packet.
+    """
+    if not compress:
+        for y, row in enumerate(packed.rows()):
+            header = ROW_HEADER.pack(y, 0, 0, 0, 1)  # It seems like you can always send zeros
+            yield NiimbotPacket(RequestCodeEnum.PRINT_BITMAP_ROW, header + row)
+        return
+
+    y = 0
+    while y < packed.height:
+        row = packed.row(y)
+        repeat = 1
+        while repeat < MAX_REPEAT and y + repeat < packed.height and packed.row(y + repeat) == row:
+            repeat += 1
+        yield encode_row(y, row, repeat)
+        y += repeat
+
+
+def _plain_frame(packed: PackedImage) -> memoryview:
+    # 일반 모드는 모든 행 패킷의 길이가 같으므로 열 단위 슬라이스 대입으로 한 번에 채움
+    height, row_bytes = packed.height, packed.row_bytes
+    len_ = ROW_HEADER.size + row_bytes
+    stride = OVERHEAD + len_
+    frame = bytearray(stride * height)
+
+    ys = struct.pack(f">{height}H", *range(height))
+    fixed = bytes((0x55, 0x55, RequestCodeEnum.PRINT_BITMAP_ROW, len_))
+    for i, value in enumerate(fixed):
+        frame[i::stride] = bytes((value,)) * height
+    frame[4::stride] = ys[0::2]
+    frame[5::stride] = ys[1::2]
+    frame[6::stride] = bytes(height)
+    frame[7::stride] = bytes(height)
+    frame[8::stride] = bytes(height)
+    frame[9::stride] = b"\x01" * height
+
+    checksums = int.from_bytes(bytes((RequestCodeEnum.PRINT_BITMAP_ROW ^ len_ ^ 1,)) * height, "big")
+    checksums ^= int.from_bytes(ys[0::2], "big") ^ int.from_bytes(ys[1::2], "big")
+    for k in range(row_bytes):
+        column = packed.data[k::row_bytes]
+        frame[10 + k::stride] = column
+        checksums ^= int.from_bytes(column, "big")
+
+    frame[stride - 3::stride] = checksums.to_bytes(height, "big")
+    frame[stride - 2::stride] = b"\xaa" * height
+    frame[stride - 1::stride] = b"\xaa" * height
+    return memoryview(frame)
+
+
+def encode_frame(packed: PackedImage, compress: bool = False) -> memoryview:
+    """Serialize every row packet of ``packed`` into one buffer, ready for a single write."""
+    if not compress:
+        return _plain_frame(packed)
+
+    # 압축 패킷은 항상 일반 비트맵 행보다 작으므로 일반 모드 크기로 한 번에 할당
+    frame = FrameBuffer(packed.height * (OVERHEAD + ROW_HEADER.size + packed.row_bytes))
+    for pkt in encode_rows(packed, compress=True):
+        frame.append(pkt)
+    return frame.view()
@@ -4,6 +4,18 @@ import serial
 from serial.tools.list_ports import comports
 
 
+def detect_ports():
+    """USB serial ports on the host, for running one printer per port.
+
+    Printers connect over USB, so on-board UARTs (``ttyAMA0``, ``ttyS*``), which have
+    no USB vendor id, are left out.
+    """
+    ports = [info.device for info in comports() if info.vid is not None]
+    if not ports:
+        raise RuntimeError("No USB serial ports detected")
+    return ports
+
+
 def detect_port():
     all_ports = list(comports())
     if len(all_ports) == 0:
@@ -24,6 +36,10 @@ class SerialTransport:
     def read(self, length: int) -> bytes:
         return self._serial.read(length)
 
+    def read_available(self) -> bytes:
+        """Return whatever has arrived, waiting up to the port timeout for the first byte."""
+        return self._serial.read(self._serial.in_waiting or 1)
+
     def write(self, data: bytes):
         return self._serial.write(data)
 
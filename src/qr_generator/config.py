@@ -3,6 +3,10 @@ class ImageConfig:
     HEIGHT = 240
     QR_RATIO = 0.8
     FONT_SIZE = 36
+    # None 이면 라벨마다 최적 마스크를 계산 (QR 생성 시간의 대부분), 0-7 이면 고정
+    QR_MASK_PATTERN = None
+    # 1비트 라벨의 글자 가장자리 처리 방식 (src.niimbot.raster.RASTER_MODES)
+    RASTER_MODE = "threshold"
 
     @classmethod
     def get_qr_height(cls):
@@ -10,14 +10,33 @@ class ImageLayout:
     def create_qr_image(data: str, text: str) -> Image.Image:
         background = Image.new('RGB', (ImageConfig.WIDTH, ImageConfig.HEIGHT), 'white')
         qr_image = QRDrawer(data).draw()
-        text_image = TextDrawer(text).draw()
+        text_image, (text_x, text_y) = TextDrawer(text).draw_strip()
 
         x = (ImageConfig.WIDTH - qr_image.width) // 2
         background.paste(qr_image, (x, 0))
-        background.paste(text_image, (0, -20), text_image)
+        # 글자 영역만 합성
+        background.paste(text_image, (text_x, text_y - 20), text_image)
 
         return background
 
+    @staticmethod
+    def create_label_bitmap(data: str, text: str, raster_mode=None) -> Image.Image:
+        """Render the label straight into a mode "1" canvas in printer polarity (1 = burn).
+
+        The result can be packed with ``pack_bitmap`` and printed without any conversion.
+        ``raster_mode`` overrides ``ImageConfig.RASTER_MODE`` for the text edges; the QR
+        modules are already 1-bit.
+        """
+        canvas = Image.new('1', (ImageConfig.WIDTH, ImageConfig.HEIGHT), 0)
+        qr_image = QRDrawer(data).draw_bitmap()
+        text_mask, (text_x, text_y) = TextDrawer(text).draw_strip(bitmap=True, raster_mode=raster_mode)
+
+        x = (ImageConfig.WIDTH - qr_image.width) // 2
+        canvas.paste(qr_image, (x, 0))
+        canvas.paste(1, (text_x, text_y - 20), text_mask)
+
+        return canvas
+
     @staticmethod
     def save_qr_image(data: str, username: str, save_path: str):
         image = ImageLayout.create_qr_image(data, username)
@@ -1,3 +1,5 @@
+import threading
+
 import qrcode
 
 from PIL import Image
@@ -5,21 +7,63 @@ from PIL import Image
 from src.qr_generator.config import ImageConfig
 from src.qr_generator.drawable import Drawable
 
+# 라벨마다 QRCode 객체를 새로 만들지 않고 재사용
+_qr = qrcode.QRCode(
+    version=1,
+    error_correction=qrcode.constants.ERROR_CORRECT_L,
+    border=4,
+)
+_qr_lock = threading.Lock()
+
+
+def qr_matrix(data: str, mask_pattern=None):
+    """Return the module matrix for ``data``, quiet zone included (True = dark).
+
+    ``mask_pattern`` defaults to ``ImageConfig.QR_MASK_PATTERN``; with None the mask with
+    the lowest penalty is searched for every code, as the QR specification describes.
+    """
+    if mask_pattern is None:
+        mask_pattern = ImageConfig.QR_MASK_PATTERN
+    with _qr_lock:
+        _qr.clear()
+        # make(fit=True) 는 현재 버전부터 찾으므로 매번 처음 버전으로 되돌림
+        _qr.version = 1
+        _qr.mask_pattern = mask_pattern
+        _qr.add_data(data)
+        _qr.make(fit=True)
+        return _qr.get_matrix()
+
+
+def rasterize_matrix(matrix, size: int, burn=False) -> Image.Image:
+    """Draw a module matrix into a ``size`` x ``size`` 1-bit image at an integer module size.
+
+    Each module becomes a ``box`` x ``box`` block with ``box = size // modules``; the
+    leftover pixels are split evenly around the code as extra white margin. With
+    ``burn`` the image is in printer polarity: dark modules are 1 on a 0 background.
+    """
+    modules = len(matrix)
+    box = size // modules
+    if box < 1:
+        raise ValueError(f"QR code with {modules} modules does not fit in {size}px")
+
+    dark_value, light_value = (255, 0) if burn else (0, 255)
+    cells = bytes(dark_value if dark else light_value for row in matrix for dark in row)
+    code = Image.frombytes('L', (modules, modules), cells).convert('1', dither=Image.Dither.NONE)
+    code = code.resize((modules * box, modules * box), Image.Resampling.NEAREST)
+
+    image = Image.new('1', (size, size), 0 if burn else 1)
+    offset = (size - modules * box) // 2
+    image.paste(code, (offset, offset))
+    return image
+
 
 class QRDrawer(Drawable):
     def __init__(self, data: str):
-        self.qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_L,
-            box_size=10,
-            border=4,
-        )
         self.data = data
 
     def draw(self) -> Image.Image:
-        self.qr.clear()
-        self.qr.add_data(self.data)
-        self.qr.make(fit=True)
-        qr_image = self.qr.make_image(fill_color="black", back_color="white")
-        qr_height = ImageConfig.get_qr_height()
-        return qr_image.resize((qr_height, qr_height), Image.Resampling.LANCZOS)
+        return rasterize_matrix(qr_matrix(self.data), ImageConfig.get_qr_height())
+
+    def draw_bitmap(self) -> Image.Image:
+        """QR code in printer polarity (1 = burn)."""
+        return rasterize_matrix(qr_matrix(self.data), ImageConfig.get_qr_height(), burn=True)
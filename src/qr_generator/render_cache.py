@@ -0,0 +1,119 @@
+import os
+import threading
+from collections import OrderedDict
+
+from PIL import Image, ImageDraw, ImageFont, ImageOps
+
+from src.niimbot.raster import THRESHOLD, binarize
+
+DEFAULT_FONT_PATH = os.path.join(os.path.dirname(__file__), './assets/NanumGothic.ttf')
+
+
+class FontCache:
+    """Loaded fonts keyed by ``(path, size)``; a missing font file falls back to the default font."""
+
+    def __init__(self):
+        self._fonts = {}
+        self._lock = threading.Lock()
+
+    def get(self, path: str, size: int):
+        key = (path, size)
+        font = self._fonts.get(key)
+        if font is None:
+            with self._lock:
+                font = self._fonts.get(key)
+                if font is None:
+                    font = ImageFont.truetype(path, size) if os.path.exists(path) else ImageFont.load_default()
+                    self._fonts[key] = font
+        return font
+
+    def preload(self, path: str, *sizes: int):
+        for size in sizes:
+            self.get(path, size)
+
+
+class TextStrip:
+    """Rendered text cropped to its bounding box.
+
+    ``offset`` is the bounding box position relative to the text origin, and
+    ``width``/``height`` are the size of the full ``textbbox`` used for layout.
+    """
+
+    __slots__ = ("image", "offset", "width", "height", "_bitmaps")
+
+    def __init__(self, image: Image.Image, offset, width, height):
+        self.image = image
+        self.offset = offset
+        self.width = width
+        self.height = height
+        self._bitmaps = {}
+
+    def bitmap(self, mode=THRESHOLD) -> Image.Image:
+        """Mode "1" mask of the dots to burn, made once per cached strip and raster mode.
+
+        With the default ``threshold`` mode an edge pixel is burned when it is at least half covered.
+        """
+        bitmap = self._bitmaps.get(mode)
+        if bitmap is None:
+            # 알파 채널 = 글자 농도이므로 반전하면 흰 바탕의 검은 글자
+            bitmap = self._bitmaps[mode] = binarize(ImageOps.invert(self.image.getchannel('A')), mode)
+        return bitmap
+
+
+class TextStripCache:
+    """LRU of rendered text strips keyed by ``(text, font path, size)``."""
+
+    def __init__(self, fonts: FontCache, maxsize=256):
+        self.fonts = fonts
+        self.maxsize = maxsize
+        self._strips = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, text: str, path: str, size: int) -> TextStrip:
+        key = (text, path, size)
+        with self._lock:
+            strip = self._strips.get(key)
+            if strip is not None:
+                self._strips.move_to_end(key)
+                self.hits += 1
+                return strip
+            self.misses += 1
+
+        strip = self._render(text, self.fonts.get(path, size))
+        with self._lock:
+            self._strips[key] = strip
+            self._strips.move_to_end(key)
+            while len(self._strips) > self.maxsize:
+                self._strips.popitem(last=False)
+                self.evictions += 1
+        return strip
+
+    @staticmethod
+    def _render(text, font) -> TextStrip:
+        left, top, right, bottom = ImageDraw.Draw(Image.new('RGBA', (1, 1))).textbbox((0, 0), text, font=font)
+        # 투명 레이어 전체 대신 글자 영역만 그림
+        image = Image.new('RGBA', (max(1, right - left), max(1, bottom - top)), (255, 255, 255, 0))
+        ImageDraw.Draw(image).text((-left, -top), text, font=font, fill='black')
+        return TextStrip(image, (left, top), right - left, bottom - top)
+
+    def clear(self):
+        with self._lock:
+            self._strips.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._strips),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+fonts = FontCache()
+text_strips = TextStripCache(fonts)
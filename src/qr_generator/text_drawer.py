@@ -1,28 +1,32 @@
-import os
-
-from PIL import Image, ImageFont, ImageDraw
+from PIL import Image
 
 from src.qr_generator.config import ImageConfig
 from src.qr_generator.drawable import Drawable
+from src.qr_generator.render_cache import DEFAULT_FONT_PATH, text_strips
 
 
 class TextDrawer(Drawable):
-    def __init__(self, text: str):
+    def __init__(self, text: str, cache=text_strips):
         self.text = text
-        self.font_path = os.path.join(os.path.dirname(__file__), './assets/NanumGothic.ttf')
+        self.font_path = DEFAULT_FONT_PATH
+        self.cache = cache
 
-    def draw(self) -> Image.Image:
-        text_layer = Image.new('RGBA', (ImageConfig.WIDTH, ImageConfig.HEIGHT), (255, 255, 255, 0))
-        font = ImageFont.truetype(self.font_path, ImageConfig.FONT_SIZE) if os.path.exists(
-            self.font_path) else ImageFont.load_default()
+    def draw_strip(self, bitmap=False, raster_mode=None):
+        """Return the cropped text image and where its top-left corner goes on the label.
 
-        draw = ImageDraw.Draw(text_layer)
-        text_bbox = draw.textbbox((0, 0), self.text, font=font)
-        text_width = text_bbox[2] - text_bbox[0]
-        text_x = (ImageConfig.WIDTH - text_width) // 2
+        With ``bitmap`` the image is a mode "1" mask of the dots to burn instead of RGBA,
+        binarized with ``raster_mode`` (``ImageConfig.RASTER_MODE`` by default).
+        """
+        strip = self.cache.get(self.text, self.font_path, ImageConfig.FONT_SIZE)
+        text_x = (ImageConfig.WIDTH - strip.width) // 2
         text_y = ImageConfig.get_qr_height() + (
-                (ImageConfig.HEIGHT - ImageConfig.get_qr_height() - (text_bbox[3] - text_bbox[1])) // 2
+                (ImageConfig.HEIGHT - ImageConfig.get_qr_height() - strip.height) // 2
         )
+        image = strip.bitmap(raster_mode or ImageConfig.RASTER_MODE) if bitmap else strip.image
+        return image, (text_x + strip.offset[0], text_y + strip.offset[1])
 
-        draw.text((text_x, text_y), self.text, font=font, fill='black')
+    def draw(self) -> Image.Image:
+        text_layer = Image.new('RGBA', (ImageConfig.WIDTH, ImageConfig.HEIGHT), (255, 255, 255, 0))
+        image, position = self.draw_strip()
+        text_layer.paste(image, position)
         return text_layer
@@ -0,0 +1,57 @@
+import httpx
+
+from src.supa_db.postgrest import quote
+
+
+def _condition(values) -> str:
+    values = [values] if isinstance(values, (str, int)) else list(values)
+    if len(values) == 1:
+        return f"eq.{values[0]}"
+    return f"in.({','.join(quote(value) for value in values)})"
+
+
+class LaundryFeed:
+    """Keyset-paginated reads of the ``laundry`` table ordered by ``(created_at, id)``.
+
+    Each page starts strictly after the last row of the previous one, so reading the
+    rows inserted after a mark costs one indexed range scan per page no matter how
+    large the table is. ``filters`` maps columns to the values a row must have (e.g. a
+    node's stations), so only that node's share of the rows is read.
+    """
+
+    def __init__(self, database_url: str, jwt: str, table="laundry", timeout=10.0, transport=None, filters=None):
+        self.table = table
+        self.filters = {column: _condition(values) for column, values in (filters or {}).items()}
+        self.requests = 0
+        self._client = httpx.AsyncClient(
+            base_url=f"{database_url.rstrip('/')}/rest/v1",
+            headers={"apikey": jwt, "Authorization": f"Bearer {jwt}"},
+            timeout=timeout,
+            transport=transport,
+        )
+
+    async def rows_after(self, mark, limit=200) -> list:
+        """Up to ``limit`` rows with ``(created_at, id)`` greater than ``mark``, oldest first."""
+        created_at, row_id = mark
+        params = {
+            "select": "*",
+            "or": f"(created_at.gt.{quote(created_at)},"
+                  f"and(created_at.eq.{quote(created_at)},id.gt.{quote(row_id)}))",
+            "order": "created_at.asc,id.asc",
+            "limit": str(limit),
+        }
+        return await self._get(params)
+
+    async def latest(self):
+        """The newest row, or None if the table is empty."""
+        rows = await self._get({"select": "*", "order": "created_at.desc,id.desc", "limit": "1"})
+        return rows[0] if rows else None
+
+    async def _get(self, params) -> list:
+        self.requests += 1
+        response = await self._client.get(f"/{self.table}", params={**params, **self.filters})
+        response.raise_for_status()
+        return response.json()
+
+    async def close(self):
+        await self._client.aclose()
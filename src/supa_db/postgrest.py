@@ -0,0 +1,7 @@
+def quote(value) -> str:
+    """Quote a value for a PostgREST filter list such as ``in.(...)`` or ``or=(...)``.
+
+    Quoted values may contain ``.``, ``,``, ``:`` and parentheses without breaking the
+    filter syntax; backslashes and double quotes are escaped.
+    """
+    return '"' + str(value).replace('\\', '\\\\').replace('"', '\\"') + '"'
@@ -0,0 +1,155 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+
+import httpx
+
+from src.supa_db.postgrest import quote
+
+UNKNOWN_USER = "Unknown"
+
+
+class ProfileResolver:
+    """Async user name lookups against the PostgREST ``profiles`` table.
+
+    Names are kept in a TTL'd LRU; ids without a profile are cached as ``Unknown`` for
+    ``negative_ttl`` seconds. Concurrent lookups for the same id share one request, and
+    ``prefetch`` loads many ids with a single ``in.(...)`` query per chunk. The HTTP
+    client keeps its connections alive between lookups.
+    """
+
+    def __init__(self, database_url: str, jwt: str, ttl=600.0, negative_ttl=60.0, maxsize=1024, timeout=5.0,
+                 transport=None, clock=time.monotonic):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.maxsize = maxsize
+        self._clock = clock
+        self._client = httpx.AsyncClient(
+            base_url=f"{database_url.rstrip('/')}/rest/v1",
+            headers={"apikey": jwt, "Authorization": f"Bearer {jwt}"},
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=4, max_keepalive_connections=4, keepalive_expiry=60),
+            transport=transport,
+        )
+        self._cache = OrderedDict()  # user_id -> (name, expires_at)
+        self._inflight = {}  # user_id -> 진행 중인 조회 Task
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.requests = 0
+        self.errors = 0
+        self.lookups = 0
+        self.lookup_time = 0.0
+        self.request_time = 0.0
+
+    async def get_user_name(self, user_id: str) -> str:
+        """Name of ``user_id``, or ``Unknown`` if it has no profile or the lookup failed."""
+        start = time.perf_counter()
+        try:
+            name = self._cached(user_id)
+            if name is not None:
+                return name
+
+            task = self._inflight.get(user_id)
+            if task is None:
+                self.misses += 1
+                task = asyncio.create_task(self._fetch_one(user_id))
+                self._inflight[user_id] = task
+                task.add_done_callback(lambda _: self._inflight.pop(user_id, None))
+            else:
+                # 같은 사용자를 조회 중이면 그 결과를 함께 기다림
+                self.coalesced += 1
+            # 기다리던 쪽이 취소되어도 조회는 계속되도록
+            return await asyncio.shield(task)
+        finally:
+            self.lookups += 1
+            self.lookup_time += time.perf_counter() - start
+
+    async def prefetch(self, user_ids, chunk=100) -> int:
+        """Load the names of ``user_ids`` that are not cached yet; returns how many were requested."""
+        missing = list(dict.fromkeys(user_id for user_id in user_ids if self._cached(user_id, count=False) is None))
+        for offset in range(0, len(missing), chunk):
+            ids = missing[offset:offset + chunk]
+            try:
+                rows = await self._query({"select": "id,name", "id": f"in.({','.join(quote(i) for i in ids)})"})
+            except Exception as e:
+                logging.warning(f"Profile prefetch failed - Users: {len(ids)}, Error: {str(e)}")
+                continue
+            names = {str(row["id"]): row["name"] for row in rows}
+            for user_id in ids:
+                self._store(user_id, names.get(str(user_id)))
+        if missing:
+            logging.info(f"Profile cache warmed - Users: {len(missing)}, Cached: {len(self._cache)}")
+        return len(missing)
+
+    async def _fetch_one(self, user_id) -> str:
+        try:
+            rows = await self._query({"select": "name", "id": f"eq.{user_id}"})
+        except Exception as e:
+            # 이름 조회 실패로 라벨 출력을 막지 않음 (캐시하지 않고 다음에 다시 조회)
+            logging.warning(f"Profile lookup failed - User: {user_id}, Error: {str(e)}")
+            return UNKNOWN_USER
+        return self._store(user_id, rows[0]["name"] if rows else None)
+
+    async def _query(self, params) -> list:
+        start = time.perf_counter()
+        self.requests += 1
+        try:
+            response = await self._client.get("/profiles", params=params)
+            response.raise_for_status()
+            return response.json()
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self.request_time += time.perf_counter() - start
+
+    def _cached(self, user_id, count=True):
+        entry = self._cache.get(user_id)
+        if entry is None:
+            return None
+        name, expires_at = entry
+        if expires_at <= self._clock():
+            del self._cache[user_id]
+            return None
+        self._cache.move_to_end(user_id)
+        if count:
+            if name is None:
+                self.negative_hits += 1
+            else:
+                self.hits += 1
+        return UNKNOWN_USER if name is None else name
+
+    def _store(self, user_id, name) -> str:
+        ttl = self.ttl if name is not None else self.negative_ttl
+        self._cache[user_id] = (name, self._clock() + ttl)
+        self._cache.move_to_end(user_id)
+        while len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+        return UNKNOWN_USER if name is None else name
+
+    def invalidate(self, user_id=None):
+        if user_id is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(user_id, None)
+
+    def stats(self) -> dict:
+        cached = self.hits + self.negative_hits
+        return {
+            "size": len(self._cache),
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "requests": self.requests,
+            "errors": self.errors,
+            "hit_rate": cached / self.lookups if self.lookups else 0.0,
+            "lookup_ms": self.lookup_time / self.lookups * 1000 if self.lookups else 0.0,
+            "request_ms": self.request_time / self.requests * 1000 if self.requests else 0.0,
+        }
+
+    async def close(self):
+        await self._client.aclose()
@@ -0,0 +1,152 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+import httpx
+
+PRINTED = "printed"
+FAILED = "failed"
+
+
+class ResultWriter:
+    """Writes per-label print outcomes back to a PostgREST table in batched upserts.
+
+    ``record`` only buffers the result, so the printer worker never waits on the
+    network. Results for the same label are coalesced (the latest wins) and flushed
+    when ``flush_size`` are pending or every ``flush_interval`` seconds. A failed
+    flush keeps the rows and retries with exponential backoff up to ``max_backoff``,
+    so results pile up while offline and go out once the database is reachable again;
+    beyond ``max_pending`` the oldest results are dropped.
+    """
+
+    def __init__(self, database_url: str, jwt: str, table="print_results", flush_size=100, flush_interval=1.0,
+                 max_backoff=60.0, max_pending=10000, timeout=10.0, transport=None):
+        self.table = table
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.max_backoff = max_backoff
+        self.max_pending = max_pending
+        self._client = httpx.AsyncClient(
+            base_url=f"{database_url.rstrip('/')}/rest/v1",
+            headers={"apikey": jwt, "Authorization": f"Bearer {jwt}",
+                     "Prefer": "resolution=merge-duplicates,return=minimal"},
+            timeout=timeout,
+            transport=transport,
+        )
+        self._pending = OrderedDict()  # label_id -> row
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self._backoff = 0.0
+        self.recorded = 0
+        self.coalesced = 0
+        self.flushed = 0
+        self.batches = 0
+        self.failures = 0
+        self.dropped = 0
+        self.flush_time = 0.0
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout=5.0):
+        """Stop the flush loop after one last attempt to write what is pending."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await asyncio.wait_for(self._flush_all(), timeout)
+        except Exception as e:
+            logging.error(f"Print results not written - Pending: {len(self._pending)}, Error: {str(e)}")
+        await self._client.aclose()
+
+    def record(self, label_id: str, laundry_id, number: int, status: str, error: str = None):
+        """Buffer the outcome of one label; never blocks."""
+        if label_id in self._pending:
+            self.coalesced += 1
+            del self._pending[label_id]
+        self._pending[label_id] = {
+            "label_id": label_id,
+            "laundry_id": laundry_id,
+            "number": number,
+            "status": status,
+            "error": error,
+            "updated_at": datetime.now(timezone.utc).isoformat(),
+        }
+        self.recorded += 1
+        while len(self._pending) > self.max_pending:
+            self._pending.popitem(last=False)
+            self.dropped += 1
+        if len(self._pending) >= self.flush_size:
+            self._wakeup.set()
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    async def _run(self):
+        while True:
+            if self._backoff:
+                # 실패 후에는 크기 조건과 상관없이 기다렸다가 재시도
+                await asyncio.sleep(self._backoff)
+            else:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            self._wakeup.clear()
+            try:
+                await self._flush_all()
+                self._backoff = 0.0
+            except Exception as e:
+                self.failures += 1
+                self._backoff = min(self.max_backoff, max(self.flush_interval, self._backoff * 2))
+                logging.warning(f"Print result write-back failed - Pending: {len(self._pending)}, "
+                                f"Retry in: {self._backoff:.2f}s, Error: {str(e)}")
+
+    async def _flush_all(self):
+        while self._pending:
+            await self.flush()
+
+    async def flush(self):
+        """Upsert up to ``flush_size`` pending results; on failure they stay pending."""
+        if not self._pending:
+            return
+        batch = []
+        while self._pending and len(batch) < self.flush_size:
+            batch.append(self._pending.popitem(last=False)[1])
+
+        start = time.perf_counter()
+        try:
+            response = await self._client.post(f"/{self.table}", params={"on_conflict": "label_id"}, json=batch)
+            response.raise_for_status()
+        except BaseException:
+            # 취소된 경우도 포함해 앞쪽에 되돌려 놓되, 그 사이 새로 기록된 결과가 있으면 그쪽을 유지
+            for row in reversed(batch):
+                if row["label_id"] not in self._pending:
+                    self._pending[row["label_id"]] = row
+                    self._pending.move_to_end(row["label_id"], last=False)
+            raise
+        finally:
+            self.flush_time += time.perf_counter() - start
+        self.flushed += len(batch)
+        self.batches += 1
+
+    def stats(self) -> dict:
+        return {
+            "recorded": self.recorded,
+            "coalesced": self.coalesced,
+            "flushed": self.flushed,
+            "batches": self.batches,
+            "pending": len(self._pending),
+            "failures": self.failures,
+            "dropped": self.dropped,
+            "batch_size": self.flushed / self.batches if self.batches else 0.0,
+            "flush_ms": self.flush_time / self.batches * 1000 if self.batches else 0.0,
+        }
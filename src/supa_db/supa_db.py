@@ -1,9 +1,13 @@
 from supabase import create_client
 
+from src.supa_db.profile_resolver import ProfileResolver
+
 
 class SupaDB:
     def __init__(self, database_url: str, jwt: str):
         self.client = create_client(database_url, jwt)
+        # 출력 경로에서 쓰는 비동기 이름 조회 (캐시/연결 재사용)
+        self.profiles = ProfileResolver(database_url, jwt)
 
     def get_user_name(self, user_id: str) -> str:
         result = self.client.table('profiles') \
@@ -11,3 +15,15 @@ class SupaDB:
             .eq('id', user_id) \
             .execute()
         return result.data[0]['name'] if result.data else "Unknown"
+
+    def recent_requesters(self, limit=500) -> list:
+        """Distinct ``requested_by`` ids of the latest ``limit`` laundry orders, newest first."""
+        result = self.client.table('laundry') \
+            .select('requested_by') \
+            .order('created_at', desc=True) \
+            .limit(limit) \
+            .execute()
+        return list(dict.fromkeys(row['requested_by'] for row in result.data if row.get('requested_by')))
+
+    async def close(self):
+        await self.profiles.close()
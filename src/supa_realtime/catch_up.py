@@ -0,0 +1,149 @@
+import logging
+import time
+from collections import OrderedDict
+
+
+def row_key(record):
+    return record['created_at'], record['id']
+
+
+class CatchUpSync:
+    """Replays the ``laundry`` rows inserted while the realtime channel was down.
+
+    Every processed row, live or replayed, moves a ``(created_at, id)`` high-water mark
+    forward; the mark is persisted in ``marks`` (the job journal) so a restart also
+    catches up. After each (re)subscribe ``run`` pages through the rows newer than the
+    mark with keyset queries, so its cost follows the size of the gap, not the table.
+    Recently seen ids are remembered to drop rows that arrive both ways.
+
+    From ``begin`` (called before subscribing) until the catch-up finishes, the mark
+    only moves in memory: live rows are newer than the gap, and persisting them first
+    would skip the gap after a crash.
+
+    Live rows that could not be submitted (a full print queue) are passed to ``rejected``.
+    The next ``run`` submits them before reading new rows, and until then the persisted
+    mark stays before the oldest of them, so a restart reads them again as well.
+    """
+
+    def __init__(self, feed, marks=None, stream="laundry", page_size=200, max_seen=4096):
+        self.feed = feed
+        self.marks = marks
+        self.stream = stream
+        self.page_size = page_size
+        self.max_seen = max_seen
+        self._mark = marks.high_water_mark(stream) if marks else None
+        self._seen = OrderedDict()
+        self._running = False
+        self._start = None  # 이번 따라잡기의 시작 표시
+        self._held = OrderedDict()  # 제출하지 못한 실시간 행 (id -> 행)
+        self._floor = None  # 보류한 행이 있는 동안 저장할 표시 (가장 오래된 보류 행 바로 앞)
+        self.runs = 0
+        self.pages = 0
+        self.replayed = 0
+        self.duplicates = 0
+        self.run_time = 0.0
+
+    @property
+    def mark(self):
+        return self._mark
+
+    def is_new(self, record) -> bool:
+        """False if the row was already processed through the other path."""
+        if str(record['id']) in self._seen:
+            self.duplicates += 1
+            return False
+        return True
+
+    def processed(self, record):
+        """Remember the row and move the high-water mark past it."""
+        self._seen[str(record['id'])] = None
+        released = self._held.pop(str(record['id']), None) is not None
+        while len(self._seen) > self.max_seen:
+            self._seen.popitem(last=False)
+        advanced = record.get('created_at') is not None and (self._mark is None or row_key(record) > self._mark)
+        if advanced:
+            self._mark = row_key(record)
+        if (advanced or released) and not self._running:
+            self._persist()
+
+    def rejected(self, record):
+        """Hold a row that could not be submitted so the next ``run`` submits it again."""
+        if not self._held:
+            # 실시간 행은 순서대로 오므로 지금 표시가 이 행 바로 앞
+            self._floor = self._mark
+        self._held[str(record['id'])] = record
+
+    def _persist(self):
+        mark = self._floor if self._held else self._mark
+        if self.marks and mark is not None:
+            self.marks.set_high_water_mark(mark, self.stream)
+
+    def begin(self):
+        """Fix the point the next ``run`` starts from; live rows after this no longer persist the mark."""
+        if not self._running:
+            self._running = True
+            self._start = self._mark
+
+    async def run(self, submit) -> int:
+        """Pass every unseen row newer than the mark to ``submit``; returns how many were replayed.
+
+        A failed query or ``submit`` stops the catch-up; the mark then stays before the
+        first unprocessed row so the next run starts there again.
+        """
+        self.begin()
+        start = time.perf_counter()
+        self.runs += 1
+        after = self._start
+        replayed = 0
+        try:
+            for record in list(self._held.values()):
+                if self.is_new(record):
+                    submit(record)
+                    replayed += 1
+                self.processed(record)
+
+            if after is None:
+                # 처음 실행: 테이블 전체가 아니라 지금부터 받음
+                latest = await self.feed.latest()
+                if latest is not None:
+                    self.processed(latest)
+                logging.info(f"Catch-up mark initialized - Mark: {self._mark}")
+                return 0
+
+            while True:
+                rows = await self.feed.rows_after(after, self.page_size)
+                self.pages += 1
+                for record in rows:
+                    if self.is_new(record):
+                        submit(record)
+                        replayed += 1
+                    self.processed(record)
+                    after = row_key(record)
+                if len(rows) < self.page_size:
+                    break
+        except BaseException:
+            if after is not None:
+                # 처리하지 못한 행부터 다시 받도록 표시를 되돌림 (실시간 행은 중복 제거로 걸러짐)
+                self._mark = after
+            raise
+        finally:
+            self._running = False
+            self._start = None
+            self._persist()
+            self.replayed += replayed
+            self.run_time += time.perf_counter() - start
+
+        if replayed:
+            logging.warning(f"Caught up on missed print requests - Rows: {replayed}, Mark: {self._mark}")
+        return replayed
+
+    def stats(self) -> dict:
+        return {
+            "mark": self._mark,
+            "runs": self.runs,
+            "pages": self.pages,
+            "replayed": self.replayed,
+            "held": len(self._held),
+            "duplicates": self.duplicates,
+            "run_ms": self.run_time / self.runs * 1000 if self.runs else 0.0,
+        }
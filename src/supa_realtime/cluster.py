@@ -0,0 +1,223 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+from collections import OrderedDict
+
+from src.supa_realtime.lease_store import LeaseStore
+from src.supa_realtime.print_queue import PrintQueueFull
+
+
+def default_node_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class ClusterNode:
+    """Shares the orders every node receives so each one is printed by a single node.
+
+    ``claim`` never waits on the shared ``store``: an order the node does not hold yet
+    is noted and a background task takes its lease, handing the orders it wins to
+    ``submit``. The leases it holds are renewed every ``renew_interval`` seconds and
+    expire after ``ttl`` if the node crashes; completed orders are marked done and
+    failed ones released by the same task.
+
+    Orders a node lost to another node are watched: once their lease expires without
+    being completed, the next sweep claims them. A node whose queue already holds
+    ``max_backlog`` jobs leaves new orders for later, so idle nodes pick them up first
+    and work spreads over the cluster; a sweep also runs whenever an order arrives or
+    one of its own orders finishes.
+    """
+
+    def __init__(self, store: LeaseStore, node_id=None, ttl=30.0, renew_interval=None, max_backlog=2,
+                 max_watched=4096, clock=time.time):
+        self.store = store
+        self.node_id = node_id or default_node_id()
+        self.ttl = ttl
+        self.renew_interval = renew_interval or ttl / 3
+        self.max_backlog = max_backlog
+        self.max_watched = max_watched
+        self.clock = clock
+        self._held = {}
+        self._watched = OrderedDict()  # key -> (record, 다시 시도할 시각)
+        self._ended = OrderedDict()  # key -> 완료 여부, 저장소에 아직 알리지 않은 임대
+        self._wake = asyncio.Event()
+        self._task = None
+        self.claims = 0
+        self.acquired = 0
+        self.contended = 0
+        self.skipped = 0
+        self.deferred = 0
+        self.reclaimed = 0
+        self.renewals = 0
+        self.lost = 0
+        self.claim_time = 0.0
+
+    @property
+    def held(self):
+        return list(self._held)
+
+    def claim(self, record, load=0) -> bool:
+        """True if this node holds ``record`` and should print it now.
+
+        Other orders are queued for the background claim and come back through
+        ``submit`` if this node wins them.
+        """
+        key = str(record['id'])
+        if key in self._held:
+            return True
+        if self._ended.get(key):
+            return False  # 이 노드가 이미 출력함
+        if load >= self.max_backlog:
+            self.deferred += 1
+            logging.debug(f"Print request deferred - Job: {key}, Backlog: {load}")
+        # 다른 노드가 가진 주문은 임대가 끝날 때까지 다시 시도하지 않음
+        self._watch(key, record, self._watched[key][1] if key in self._watched else 0.0)
+        self._wake.set()
+        return False
+
+    async def _acquire(self, key, record) -> bool:
+        start = time.perf_counter()
+        lease = await self.store.acquire(key, self.node_id, self.ttl)
+        self.claims += 1
+        self.claim_time += time.perf_counter() - start
+
+        if lease.held_by(self.node_id):
+            self.acquired += 1
+            self._held[key] = record
+            self._watched.pop(key, None)
+            return True
+        if lease.done:
+            self.skipped += 1
+            self._watched.pop(key, None)
+            logging.info(f"Print request skipped - Job: {key} was printed by {lease.owner}")
+        else:
+            self.contended += 1
+            # 담당 노드가 멈추면 임대가 만료된 뒤 이어받음
+            self._watch(key, record, lease.expires_at)
+            logging.info(f"Print request claimed by another node - Job: {key}, Node: {lease.owner}")
+        return False
+
+    def _watch(self, key, record, retry_at):
+        self._watched[key] = (record, retry_at)
+        self._watched.move_to_end(key)
+        while len(self._watched) > self.max_watched:
+            self._watched.popitem(last=False)
+
+    def finished(self, job_id, error=None):
+        """Complete the lease of a printed order, or release it after a failure."""
+        self._end(str(job_id), completed=error is None)
+
+    def release(self, job_id):
+        """Give up an order this node claimed but could not queue."""
+        self._end(str(job_id), completed=False)
+
+    def _end(self, key, completed):
+        if self._held.pop(key, None) is None:
+            return
+        self._ended[key] = completed
+        self._wake.set()
+
+    async def flush(self):
+        """Send the completions and releases of ended orders to the store."""
+        while self._ended:
+            key, completed = next(iter(self._ended.items()))
+            try:
+                if completed:
+                    await self.store.complete(key, self.node_id)
+                else:
+                    await self.store.release(key, self.node_id)
+            except Exception as e:
+                # 다음 주기에 다시 시도
+                logging.error(f"Lease update failed - Job: {key}, Error: {str(e)}")
+                return
+            if self._ended.get(key) == completed:
+                del self._ended[key]
+
+    async def renew(self):
+        if not self._held:
+            return
+        keys = list(self._held)
+        renewed = set(await self.store.renew(keys, self.node_id, self.ttl))
+        self.renewals += 1
+        for key in keys:
+            if key in self._held and key not in renewed:
+                # 갱신이 늦어 다른 노드가 이어받음 - 이 주문은 두 번 출력될 수 있음
+                self._held.pop(key)
+                self.lost += 1
+                logging.warning(f"Lease lost - Job: {key}, Node: {self.node_id}")
+
+    async def sweep(self, submit, load=lambda: 0) -> int:
+        """Claim the watched orders that are due and pass the ones won to ``submit``."""
+        now = self.clock()
+        taken = 0
+        for key, (record, retry_at) in list(self._watched.items()):
+            if retry_at > now or key in self._ended or key not in self._watched:
+                continue
+            if load() >= self.max_backlog:
+                break
+            if not await self._acquire(key, record):
+                continue
+            try:
+                submit(record)
+            except PrintQueueFull:
+                self.release(key)
+                self._watch(key, record, 0.0)
+                break
+            except Exception as e:
+                self.release(key)
+                logging.error(f"Invalid print request - Job: {key}, Error: {str(e)}")
+                continue
+            taken += 1
+            if retry_at:
+                self.reclaimed += 1
+                logging.warning(f"Print request reclaimed from an expired lease - Job: {key}")
+        return taken
+
+    async def _run(self, submit, load):
+        while True:
+            # wait_for 는 깨어나는 순간 들어온 취소를 삼킬 수 있어 stop 이 끝나지 않음
+            waiter = asyncio.ensure_future(self._wake.wait())
+            try:
+                await asyncio.wait((waiter,), timeout=self.renew_interval)
+            finally:
+                waiter.cancel()
+            self._wake.clear()
+            try:
+                # 끝난 주문을 먼저 알려야 다시 받은 같은 주문을 또 가져오지 않음
+                await self.flush()
+                await self.renew()
+                await self.sweep(submit, load)
+            except Exception as e:
+                logging.error(f"Lease heartbeat failed - Node: {self.node_id}, Error: {str(e)}")
+
+    def start(self, submit, load=lambda: 0):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(submit, load), name=f"lease-heartbeat-{self.node_id}")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "node": self.node_id,
+            "held": len(self._held),
+            "watched": len(self._watched),
+            "ending": len(self._ended),
+            "claims": self.claims,
+            "acquired": self.acquired,
+            "contended": self.contended,
+            "skipped": self.skipped,
+            "contention": (self.contended + self.skipped) / self.claims if self.claims else 0.0,
+            "deferred": self.deferred,
+            "reclaimed": self.reclaimed,
+            "renewals": self.renewals,
+            "lost": self.lost,
+            "claim_ms": self.claim_time / self.claims * 1000 if self.claims else 0.0,
+        }
@@ -0,0 +1,327 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+
+from src.niimbot.niimbot_printer import PrintJobError
+from src.supa_realtime.print_queue import JobState, PrintJob, PrintQueue, PrintQueueFull, _aiter
+
+
+def record_priority(job: PrintJob) -> int:
+    """Priority class from the order's ``priority`` column; lower classes print first."""
+    return int(job.record.get('priority') or 0)
+
+
+class _Flow:
+    """The queued orders of one requester in one priority class."""
+
+    def __init__(self, user, priority):
+        self.user = user
+        self.priority = priority
+        self.jobs = deque()
+        self.deficit = 0
+        self.served = deque()  # (시각, 라벨 수) - 할당량 창 안의 출력 기록
+
+
+class FairScheduler:
+    """Deficit round-robin over requesters, one slice of labels at a time.
+
+    Every requester with queued orders gets ``quantum`` labels per round, so a small
+    order waits for about one quantum of each other requester's labels instead of the
+    whole of a large order ahead of it. Priority classes are strict: requesters in a
+    lower class (``priority_of(job)``) are served first. With ``quota`` set, requesters
+    who were given ``quota`` labels within the last ``quota_window`` seconds yield to
+    everyone else, and only print while nobody under the quota is waiting.
+    """
+
+    def __init__(self, quantum=1, quota=None, quota_window=3600.0, priority_of=record_priority,
+                 clock=time.monotonic):
+        self.quantum = quantum
+        self.quota = quota
+        self.quota_window = quota_window
+        self.priority_of = priority_of
+        self.clock = clock
+        self._flows = {}
+        self._active = {}  # 우선순위 -> 차례를 기다리는 흐름
+        self._jobs = {}  # id(job) -> 흐름
+        self._idle = OrderedDict()  # 주문이 없는 흐름 -> 할당량 기록이 만료되는 시각
+        self.labels = {}
+        self.deferred = 0
+
+    def __len__(self):
+        return len(self._jobs)
+
+    def jobs(self):
+        return [job for flows in self._active.values() for flow in flows for job in flow.jobs]
+
+    def push(self, job: PrintJob):
+        self._expire(self.clock())
+        user = str(job.record.get('requested_by'))
+        priority = self.priority_of(job)
+        flow = self._flows.get((user, priority))
+        if flow is None:
+            flow = self._flows[(user, priority)] = _Flow(user, priority)
+        if not flow.jobs:
+            self._idle.pop(flow, None)
+            self._active.setdefault(priority, deque()).append(flow)
+        flow.jobs.append(job)
+        self._jobs[id(job)] = flow
+
+    def discard(self, job: PrintJob):
+        flow = self._jobs.pop(id(job), None)
+        if flow is None:
+            return
+        flow.jobs.remove(job)
+        if not flow.jobs:
+            flow.deficit = 0
+            rotation = self._active[flow.priority]
+            rotation.remove(flow)
+            if not rotation:
+                del self._active[flow.priority]
+            if self.quota is None or not flow.served:
+                del self._flows[(flow.user, flow.priority)]  # 할당량이 없으면 기록을 남길 필요 없음
+            else:
+                # 할당량 창이 지나면 기록과 함께 흐름을 지움
+                self._idle[flow] = flow.served[-1][0] + self.quota_window
+
+    def _expire(self, now):
+        while self._idle:
+            flow, expires_at = next(iter(self._idle.items()))
+            if expires_at > now:
+                return
+            del self._idle[flow]
+            del self._flows[(flow.user, flow.priority)]
+
+    def _over_quota(self, flow, now) -> bool:
+        while flow.served and flow.served[0][0] <= now - self.quota_window:
+            flow.served.popleft()
+        return sum(labels for _, labels in flow.served) >= self.quota
+
+    def next(self, available, copies=None):
+        """The ``(job, indexes)`` to print next, or None.
+
+        ``available(job)`` returns the label indexes of a job that can be handed out.
+        When the next job prints a different number of copies than ``copies``, None is
+        returned so the current print session can end first.
+        """
+        now = self.clock()
+        self._expire(now)
+        passes = (False, True) if self.quota else (True,)
+        for over_quota_allowed in passes:
+            for priority in sorted(self._active):
+                rotation = self._active[priority]
+                for _ in range(len(rotation)):
+                    flow = rotation[0]
+                    if not over_quota_allowed and self._over_quota(flow, now):
+                        rotation.rotate(-1)
+                        continue
+                    job = next((job for job in flow.jobs if available(job)), None)
+                    if job is None:
+                        rotation.rotate(-1)  # 이 사용자의 라벨은 모두 출력 중
+                        continue
+                    if copies is not None and job.copies != copies:
+                        return None
+                    if over_quota_allowed and self.quota and self._over_quota(flow, now):
+                        self.deferred += 1
+                    if flow.deficit <= 0:
+                        flow.deficit += self.quantum
+                    indexes = available(job)[:flow.deficit]
+                    flow.deficit -= len(indexes)
+                    if flow.deficit <= 0:
+                        rotation.rotate(-1)
+                    flow.served.append((now, len(indexes)))
+                    self.labels[flow.user] = self.labels.get(flow.user, 0) + len(indexes)
+                    return job, indexes
+        return None
+
+    def stats(self) -> dict:
+        return {
+            "queued": len(self._jobs),
+            "requesters": sum(len(flows) for flows in self._active.values()),
+            "tracked": len(self._flows),
+            "labels": dict(self.labels),
+            "over_quota": self.deferred,
+        }
+
+
+class FairPrintQueue(PrintQueue):
+    """Single-printer queue that interleaves the labels of different requesters.
+
+    Labels are handed to the printer one ``scheduler`` slice at a time within one
+    continuous print session, so switching between orders costs no extra session
+    setup; a session only ends when the queue runs dry or the next order prints a
+    different number of copies. An order completes as soon as its last label is out.
+
+    Each order is rendered once, as one stream over all of its labels, and the stream
+    is kept across slices and sessions; with a LabelPipeline its lookahead keeps
+    rendering an order's next labels while other requesters' labels print.
+    """
+
+    def __init__(self, printer, render, maxsize=100, on_finished=None, on_page=None, scheduler=None,
+                 prepare=None):
+        super().__init__(printer, render, maxsize, on_finished, on_page, prepare=prepare)
+        self.scheduler = scheduler if scheduler is not None else FairScheduler()
+        self.maxsize = maxsize
+        self._changed = asyncio.Condition()
+        self._in_flight = {}  # id(job) -> 이번 세션에서 프린터로 보낸 라벨 위치
+        self._streams = {}  # id(job) -> 남은 라벨의 렌더링 스트림 (조각 사이에도 유지)
+        self.sessions = 0
+
+    @property
+    def depth(self) -> int:
+        return len(self.scheduler)
+
+    async def stop(self):
+        await super().stop()
+        for job in self.scheduler.jobs():
+            self.scheduler.discard(job)
+            job._finish(Exception("Print queue stopped"))
+        for job_id in list(self._streams):
+            await self._close_stream(job_id)
+
+    def _full(self):
+        self.rejected += 1
+        logging.error(f"Print queue full - Job rejected, Rejected so far: {self.rejected}")
+        return PrintQueueFull(f"Print queue is full ({self.maxsize} jobs)")
+
+    async def _notify(self):
+        async with self._changed:
+            self._changed.notify_all()
+
+    def submit_nowait(self, job: PrintJob) -> PrintJob:
+        job.submitted_at = time.monotonic()
+        if len(self.scheduler) >= self.maxsize:
+            raise self._full()
+        self._push(job)
+        asyncio.get_running_loop().create_task(self._notify())
+        return job
+
+    async def submit(self, job: PrintJob, timeout=None) -> PrintJob:
+        job.submitted_at = time.monotonic()
+        async with self._changed:
+            try:
+                await asyncio.wait_for(self._changed.wait_for(lambda: len(self.scheduler) < self.maxsize), timeout)
+            except asyncio.TimeoutError:
+                raise self._full()
+            self._push(job)
+            self._changed.notify_all()
+        return job
+
+    def _push(self, job):
+        if job.remaining() == []:
+            # 출력할 라벨이 없는 주문은 스케줄러가 내줄 것도 없으므로 바로 완료
+            self._accepted(job)
+            self._complete(job)
+            return
+        self.scheduler.push(job)
+        self._accepted(job)
+
+    def _available(self, job):
+        sent = self._in_flight.get(id(job), ())
+        return [index for index in job.remaining() if index not in sent]
+
+    async def _run(self):
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: len(self.scheduler) > 0)
+            async with self._session_lock(self.printer):
+                await self._session()
+
+    async def _session(self):
+        grant = self.scheduler.next(self._available)
+        if grant is None:
+            # 내줄 라벨이 생길 때까지 (새 주문, 출력 완료) 기다림
+            async with self._changed:
+                await self._changed.wait()
+            return
+        copies = grant[0].copies
+        pages = []  # 세션의 페이지 번호 -> (작업, 작업 안의 페이지 번호)
+        touched = []
+        started_at = time.monotonic()
+        self.sessions += 1
+        try:
+            if self.prepare:
+                try:
+                    await self.prepare(self.scheduler.jobs())
+                except Exception as e:
+                    logging.warning(f"Print batch preparation failed - Jobs: {len(self.scheduler)}, Error: {str(e)}")
+
+            await self.printer.print_pages(self._pages(grant, copies, pages, touched), copies=copies,
+                                           on_page=lambda index: self._slice_page_printed(*pages[index]))
+
+        except asyncio.CancelledError:
+            for job in touched:
+                if not job.done:
+                    job._finish(Exception("Print queue stopped"))
+            raise
+        except Exception as e:
+            if isinstance(e, PrintJobError):
+                for job, index in (pages[i] for i in e.completed_pages if i < len(pages)):
+                    if index not in job.completed_pages:
+                        job.completed_pages.append(index)
+            for job in touched:
+                if not job.done:
+                    self.scheduler.discard(job)
+                    self._fail(job, e)
+
+        finally:
+            self._in_flight.clear()
+            self.current = None
+            self.print_time += time.monotonic() - started_at
+            for job in touched:
+                if job.done:
+                    await self._close_stream(id(job))
+                elif job.state == JobState.PRINTING:
+                    job.state = JobState.QUEUED
+
+    async def _pages(self, grant, copies, pages, touched):
+        while grant is not None:
+            job, indexes = grant
+            if job not in touched:
+                touched.append(job)
+                self._start(job, time.monotonic())
+            self._in_flight.setdefault(id(job), set()).update(indexes)
+            try:
+                stream = await self._stream(job)
+                for index in indexes:
+                    image = await anext(stream, None)
+                    if image is None:
+                        raise Exception(f"Rendering ended before label {job.numbers[index]}")
+                    pages.append((job, index))
+                    job.state = JobState.PRINTING
+                    self.current = job
+                    yield image
+                if not self._available(job):
+                    await self._close_stream(id(job))  # 마지막 라벨까지 프린터로 보냄
+            except Exception as e:
+                await self._close_stream(id(job))
+                self.scheduler.discard(job)
+                self._fail(job, e)
+            grant = self.scheduler.next(self._available, copies)
+
+    async def _stream(self, job):
+        """The render stream of ``job``, opened on its first slice for every label it has left."""
+        stream = self._streams.get(id(job))
+        if stream is None:
+            job.state = JobState.RENDERING
+            images = await self.render(job)
+            stream = self._streams[id(job)] = aiter(images) if hasattr(images, "__aiter__") else _aiter(images)
+        return stream
+
+    async def _close_stream(self, job_id):
+        stream = self._streams.pop(job_id, None)
+        if stream is not None and hasattr(stream, "aclose"):
+            await stream.aclose()
+
+    def _slice_page_printed(self, job, index):
+        self._page_printed(job, index)
+        if not job.remaining() and not job.done:
+            self.scheduler.discard(job)
+            self._complete(job)
+            asyncio.get_running_loop().create_task(self._notify())  # 대기 중인 submit 에 자리가 났음을 알림
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        stats["sessions"] = self.sessions
+        stats["scheduler"] = self.scheduler.stats()
+        return stats
@@ -0,0 +1,235 @@
+import enum
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+
+class LabelState(enum.IntEnum):
+    ACCEPTED = 0
+    SENT = 1
+    CONFIRMED = 2
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    record TEXT NOT NULL,
+    copies INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    failures INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS labels (
+    label_id TEXT PRIMARY KEY,
+    job_id TEXT NOT NULL REFERENCES jobs(job_id),
+    number INTEGER NOT NULL,
+    state INTEGER NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS labels_job ON labels(job_id, state);
+CREATE TABLE IF NOT EXISTS sync_marks (
+    stream TEXT PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    row_id TEXT NOT NULL
+);
+"""
+
+
+def label_id(job_id, number) -> str:
+    return f"{job_id}.{number}"
+
+
+class JobJournal:
+    """Write-ahead journal of print jobs and their labels in SQLite (WAL mode).
+
+    Accepting a job is committed immediately, once per order. The per-label SENT and
+    CONFIRMED transitions are buffered and group-committed by a background thread every
+    ``flush_interval`` seconds or ``flush_size`` updates, so printing never waits on
+    disk. A crash can lose only the last unflushed transitions, in which case those
+    labels are printed again on restart (at-least-once, never silently dropped).
+
+    A job that failed ``max_failures`` times is given up: it is no longer resumed on
+    restart and is pruned like a finished job.
+    """
+
+    def __init__(self, path="print_journal.db", flush_interval=0.05, flush_size=256, max_failures=3):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self.max_failures = max_failures
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")]
+        if "failures" not in columns:
+            # 실패 횟수 열이 없던 이전 버전의 저널
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN failures INTEGER NOT NULL DEFAULT 0")
+        self._lock = threading.Lock()
+        self._pending = []  # (state, updated_at, label_id)
+        self._wake = threading.Event()
+        self._closed = False
+        self.commits = 0
+        self.updates = 0
+        self._flusher = threading.Thread(target=self._flush_loop, name="job-journal", daemon=True)
+        self._flusher.start()
+
+    def _flush_loop(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                logging.error(f"Job journal flush failed: {str(e)}")
+
+    def _write_pending(self):
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+        self._conn.executemany(
+            "UPDATE labels SET state = ?, updated_at = ? WHERE label_id = ? AND state < ?",
+            [(state, at, label, state) for state, at, label in pending],
+        )
+        self.updates += len(pending)
+
+    def flush(self):
+        """Commit buffered label transitions in one transaction."""
+        with self._lock:
+            if not self._pending:
+                return
+            self._conn.execute("BEGIN")
+            try:
+                self._write_pending()
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self.commits += 1
+
+    def accept(self, job_id, record, copies, numbers):
+        """Journal a job and return the label numbers that still have to be printed.
+
+        Accepting the same job again (e.g. a redelivered event) adds nothing and only
+        returns the labels that were not confirmed yet.
+        """
+        job_id = str(job_id)
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._write_pending()
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO jobs (job_id, record, copies, created_at) VALUES (?, ?, ?, ?)",
+                    (job_id, json.dumps(record, default=str), copies, now),
+                )
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO labels (label_id, job_id, number, state, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    [(label_id(job_id, number), job_id, number, LabelState.ACCEPTED, now) for number in numbers],
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self.commits += 1
+            rows = self._conn.execute(
+                "SELECT number FROM labels WHERE job_id = ? AND state < ? ORDER BY number",
+                (job_id, LabelState.CONFIRMED),
+            ).fetchall()
+        return [number for number, in rows]
+
+    def _update(self, label, state):
+        with self._lock:
+            self._pending.append((state, time.time(), label))
+            full = len(self._pending) >= self.flush_size
+        if full:
+            self._wake.set()
+
+    def mark_sent(self, label):
+        self._update(label, LabelState.SENT)
+
+    def mark_confirmed(self, label):
+        self._update(label, LabelState.CONFIRMED)
+
+    def mark_failed(self, job_id) -> int:
+        """Count a failed attempt of a job and return how many times it has failed."""
+        job_id = str(job_id)
+        self.flush()
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET failures = failures + 1 WHERE job_id = ?", (job_id,))
+            self.commits += 1
+            row = self._conn.execute("SELECT failures FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        failures = row[0] if row else 0
+        if failures >= self.max_failures:
+            logging.error(f"Print job given up - Job: {job_id}, Failures: {failures}")
+        return failures
+
+    def label_state(self, label):
+        self.flush()
+        with self._lock:
+            row = self._conn.execute("SELECT state FROM labels WHERE label_id = ?", (label,)).fetchone()
+        return LabelState(row[0]) if row else None
+
+    def unfinished(self):
+        """Return ``(record, copies, numbers)`` for every job with unconfirmed labels, oldest first.
+
+        Jobs that were given up after ``max_failures`` failures are left out.
+        """
+        self.flush()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT jobs.job_id, jobs.record, jobs.copies, labels.number, labels.state FROM labels "
+                "JOIN jobs ON jobs.job_id = labels.job_id "
+                "WHERE labels.state < ? AND jobs.failures < ? ORDER BY jobs.created_at, labels.number",
+                (LabelState.CONFIRMED, self.max_failures),
+            ).fetchall()
+
+        jobs = {}
+        for job_id, record, copies, number, state in rows:
+            if job_id not in jobs:
+                jobs[job_id] = (json.loads(record), copies, [])
+            jobs[job_id][2].append(number)
+            if state == LabelState.SENT:
+                logging.warning(f"Label {label_id(job_id, number)} was sent but not confirmed, printing again")
+        return list(jobs.values())
+
+    def high_water_mark(self, stream="laundry"):
+        """Return the ``(created_at, id)`` of the last processed row of ``stream``, or None."""
+        with self._lock:
+            row = self._conn.execute("SELECT created_at, row_id FROM sync_marks WHERE stream = ?",
+                                     (stream,)).fetchone()
+        return (row[0], json.loads(row[1])) if row else None
+
+    def set_high_water_mark(self, mark, stream="laundry"):
+        created_at, row_id = mark
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO sync_marks (stream, created_at, row_id) VALUES (?, ?, ?) "
+                "ON CONFLICT(stream) DO UPDATE SET created_at = excluded.created_at, row_id = excluded.row_id",
+                (stream, created_at, json.dumps(row_id)),
+            )
+
+    def prune(self, max_age=30 * 24 * 3600):
+        """Delete jobs older than ``max_age`` seconds whose labels are all confirmed or that were given up."""
+        cutoff = time.time() - max_age
+        self.flush()
+        with self._lock:
+            self._conn.execute("BEGIN")
+            done = "SELECT job_id FROM jobs WHERE created_at < ? AND (failures >= ? OR job_id NOT IN " \
+                   "(SELECT job_id FROM labels WHERE state < ?))"
+            args = (cutoff, self.max_failures, LabelState.CONFIRMED)
+            self._conn.execute(f"DELETE FROM labels WHERE job_id IN ({done})", args)
+            self._conn.execute(f"DELETE FROM jobs WHERE job_id IN ({done})", args)
+            self._conn.execute("COMMIT")
+
+    def close(self):
+        self._closed = True
+        self._wake.set()
+        self._flusher.join(timeout=2)
+        self.flush()
+        self._conn.close()
+
+    def stats(self) -> dict:
+        return {"commits": self.commits, "updates": self.updates, "pending": len(self._pending)}
@@ -0,0 +1,117 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from src.niimbot.raster import pack_bitmap
+from src.qr_generator.layout import ImageLayout
+from src.qr_generator.render_cache import text_strips
+
+
+def render_label(data: str, text: str, raster_mode=None):
+    """Render and encode one label; runs in a worker process.
+
+    Returns the packed frame, the seconds spent rendering and encoding it, and the text
+    cache counters of the worker as ``(pid, stats)``.
+    """
+    start = time.perf_counter()
+    bitmap = ImageLayout.create_label_bitmap(data, text, raster_mode)
+    rendered = time.perf_counter()
+    packed = pack_bitmap(bitmap)
+    return packed, rendered - start, time.perf_counter() - rendered, (os.getpid(), text_strips.stats())
+
+
+class LabelPipeline:
+    """Renders labels in a worker pool ahead of the printer.
+
+    While the printer works on label N, labels N+1..N+``lookahead`` are rendered and
+    encoded in the pool; at most ``lookahead`` finished labels are held at a time.
+    Stage times show where a job spends its time: ``stall_time`` is how long the
+    printer waited for a label that was not ready yet.
+    """
+
+    def __init__(self, lookahead=4, executor=None, render=render_label):
+        assert lookahead >= 1, "Lookahead must be at least 1"
+        self.lookahead = lookahead
+        self.render = render
+        self._executor = executor
+        self._owns_executor = executor is None
+        self.labels = 0
+        self.render_time = 0.0
+        self.encode_time = 0.0
+        self.print_time = 0.0
+        self.stall_time = 0.0
+        self._cache_stats = {}  # 작업 프로세스별 최신 텍스트 캐시 통계
+
+    def _pool(self):
+        if self._executor is None:
+            # 저널, 프린터 수신 스레드 등이 잡고 있던 잠금을 물려받지 않도록 fork 대신 forkserver 로 작업 프로세스 생성
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            self._executor = ProcessPoolExecutor(max_workers=min(self.lookahead, os.cpu_count() or 1),
+                                                 mp_context=multiprocessing.get_context(method))
+        return self._executor
+
+    async def pages(self, labels):
+        """Yield the packed frames for ``(data, text)`` or ``(data, text, raster_mode)`` labels in order."""
+        loop = asyncio.get_running_loop()
+        pool = self._pool()
+        labels = iter(labels)
+        pending = deque()
+
+        def fill():
+            while len(pending) < self.lookahead:
+                label = next(labels, None)
+                if label is None:
+                    return
+                pending.append(loop.run_in_executor(pool, self.render, *label))
+
+        fill()
+        try:
+            while pending:
+                waited = time.perf_counter()
+                packed, render_time, encode_time, (pid, cache_stats) = await pending.popleft()
+                self._cache_stats[pid] = cache_stats
+                self.stall_time += time.perf_counter() - waited
+                self.render_time += render_time
+                self.encode_time += encode_time
+                self.labels += 1
+                fill()
+
+                handed = time.perf_counter()
+                yield packed
+                self.print_time += time.perf_counter() - handed
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def stats(self) -> dict:
+        def per_label(total):
+            return total / self.labels if self.labels else 0.0
+
+        return {
+            "labels": self.labels,
+            "render": per_label(self.render_time),
+            "encode": per_label(self.encode_time),
+            "print": per_label(self.print_time),
+            "stall": per_label(self.stall_time),
+            "text_cache": self.cache_stats(),
+        }
+
+    def cache_stats(self) -> dict:
+        """Text strip cache counters summed over the worker processes."""
+        totals = {"workers": len(self._cache_stats), "size": 0, "hits": 0, "misses": 0, "evictions": 0}
+        for stats in self._cache_stats.values():
+            for key in ("size", "hits", "misses", "evictions"):
+                totals[key] += stats[key]
+        lookups = totals["hits"] + totals["misses"]
+        totals["hit_rate"] = totals["hits"] / lookups if lookups else 0.0
+        return totals
+
+    def close(self):
+        if self._owns_executor and self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            logging.debug("Label render pool shut down")
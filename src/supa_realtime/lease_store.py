@@ -0,0 +1,280 @@
+import asyncio
+import socket
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import NamedTuple
+
+import httpx
+
+
+class Lease(NamedTuple):
+    key: str
+    owner: str
+    expires_at: float
+    done: bool
+
+    def held_by(self, owner) -> bool:
+        return self.owner == owner and not self.done
+
+
+class LeaseStore(ABC):
+    """Shared table of order leases the nodes of a cluster claim work through.
+
+    ``acquire`` is atomic: a key is granted to ``owner`` only if nobody holds it, the
+    previous holder's lease expired, or ``owner`` already holds it. Completed leases
+    stay ``done`` so a late or redelivered event cannot claim the order again.
+
+    Every operation is a coroutine, so a store that waits on a lock or the network
+    never blocks the event loop.
+    """
+
+    @abstractmethod
+    async def acquire(self, key, owner, ttl) -> Lease:
+        """Try to take ``key`` for ``ttl`` seconds; returns the lease as it stands afterwards."""
+
+    @abstractmethod
+    async def renew(self, keys, owner, ttl) -> list:
+        """Extend the leases ``owner`` still holds among ``keys``; returns the renewed keys."""
+
+    @abstractmethod
+    async def complete(self, key, owner) -> bool:
+        """Mark the order done so no node claims it again."""
+
+    @abstractmethod
+    async def release(self, key, owner) -> bool:
+        """Give the order up so another node can claim it right away."""
+
+    @abstractmethod
+    async def prune(self, max_age):
+        """Forget finished or abandoned leases older than ``max_age`` seconds."""
+
+    async def close(self):
+        pass
+
+
+class MemoryLeaseStore(LeaseStore):
+    """In-process lease store, shared by the nodes of one event loop (tests and simulations)."""
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self._leases = {}
+
+    async def acquire(self, key, owner, ttl) -> Lease:
+        key = str(key)
+        now = self.clock()
+        lease = self._leases.get(key)
+        if lease is None or (not lease.done and (lease.owner == owner or lease.expires_at <= now)):
+            lease = self._leases[key] = Lease(key, owner, now + ttl, False)
+        return lease
+
+    async def renew(self, keys, owner, ttl) -> list:
+        expires_at = self.clock() + ttl
+        renewed = []
+        for key in map(str, keys):
+            lease = self._leases.get(key)
+            if lease is not None and lease.held_by(owner):
+                self._leases[key] = lease._replace(expires_at=expires_at)
+                renewed.append(key)
+        return renewed
+
+    async def complete(self, key, owner) -> bool:
+        lease = self._leases.get(str(key))
+        if lease is None or not lease.held_by(owner):
+            return False
+        self._leases[lease.key] = lease._replace(expires_at=self.clock(), done=True)
+        return True
+
+    async def release(self, key, owner) -> bool:
+        lease = self._leases.get(str(key))
+        if lease is None or not lease.held_by(owner):
+            return False
+        del self._leases[lease.key]
+        return True
+
+    async def prune(self, max_age):
+        cutoff = self.clock() - max_age
+        for key in [key for key, lease in self._leases.items() if lease.expires_at < cutoff]:
+            del self._leases[key]
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS leases (
+    key TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    done INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS lease_host (
+    host TEXT NOT NULL
+);
+"""
+
+# ON CONFLICT ... DO UPDATE (upsert) 이 필요
+MIN_SQLITE_VERSION = (3, 24, 0)
+
+
+class SqliteLeaseStore(LeaseStore):
+    """Lease store in a SQLite file shared by the service processes of one host.
+
+    Every claim is a single upsert whose ``WHERE`` clause only lets it through for a
+    free, expired or own lease, run in an immediate transaction so concurrent nodes
+    can never both win the same order. The file uses WAL mode, which needs shared
+    memory between the processes, so it must live on a local disk of one host: the
+    first host to open it is recorded and other hosts are refused. Use
+    ``PostgrestLeaseStore`` for nodes on several hosts.
+
+    Queries run in a worker thread, so waiting up to ``busy_timeout`` for another
+    process's write lock does not stall the event loop.
+    """
+
+    def __init__(self, path="print_leases.db", clock=time.time, busy_timeout=5.0, host=None):
+        if sqlite3.sqlite_version_info < MIN_SQLITE_VERSION:
+            raise RuntimeError(f"SQLite {sqlite3.sqlite_version} is too old for the lease store "
+                               f"(needs {'.'.join(map(str, MIN_SQLITE_VERSION))} or later)")
+        self.path = path
+        self.clock = clock
+        self.host = host or socket.gethostname()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=busy_timeout)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._claim_host()
+
+    def _claim_host(self):
+        with self._transaction():
+            row = self._conn.execute("SELECT host FROM lease_host").fetchone()
+            if row is None:
+                self._conn.execute("INSERT INTO lease_host (host) VALUES (?)", (self.host,))
+        if row is not None and row[0] != self.host:
+            self._conn.close()
+            raise RuntimeError(f"Lease file {self.path} belongs to host '{row[0]}' - "
+                               f"SQLite leases only work between the processes of one host")
+
+    @contextmanager
+    def _transaction(self):
+        # 쓰기 잠금을 먼저 잡아 읽기와 쓰기 사이에 다른 프로세스가 끼어들지 못하게 함
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    async def acquire(self, key, owner, ttl) -> Lease:
+        return await asyncio.to_thread(self._acquire, key, owner, ttl)
+
+    async def renew(self, keys, owner, ttl) -> list:
+        return await asyncio.to_thread(self._renew, keys, owner, ttl)
+
+    async def complete(self, key, owner) -> bool:
+        return await asyncio.to_thread(self._complete, key, owner)
+
+    async def release(self, key, owner) -> bool:
+        return await asyncio.to_thread(self._release, key, owner)
+
+    async def prune(self, max_age=7 * 24 * 3600):
+        await asyncio.to_thread(self._prune, max_age)
+
+    async def close(self):
+        await asyncio.to_thread(self._close)
+
+    def _acquire(self, key, owner, ttl) -> Lease:
+        key = str(key)
+        now = self.clock()
+        with self._transaction():
+            self._conn.execute(
+                "INSERT INTO leases (key, owner, expires_at, done) VALUES (?, ?, ?, 0) "
+                "ON CONFLICT(key) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+                "WHERE leases.done = 0 AND (leases.owner = excluded.owner OR leases.expires_at <= ?)",
+                (key, owner, now + ttl, now),
+            )
+            # 조건을 통과하지 못했다면 다른 노드가 가진 임대가 그대로 남아 있음
+            owner, expires_at, done = self._conn.execute(
+                "SELECT owner, expires_at, done FROM leases WHERE key = ?", (key,)).fetchone()
+        return Lease(key, owner, expires_at, bool(done))
+
+    def _renew(self, keys, owner, ttl) -> list:
+        keys = [str(key) for key in keys]
+        if not keys:
+            return []
+        held = f"owner = ? AND done = 0 AND key IN ({','.join('?' * len(keys))})"
+        with self._transaction():
+            rows = self._conn.execute(f"SELECT key FROM leases WHERE {held}", (owner, *keys)).fetchall()
+            self._conn.execute(f"UPDATE leases SET expires_at = ? WHERE {held}", (self.clock() + ttl, owner, *keys))
+        return [key for key, in rows]
+
+    def _complete(self, key, owner) -> bool:
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE leases SET done = 1, expires_at = ? WHERE key = ? AND owner = ? AND done = 0",
+                (self.clock(), str(key), owner),
+            )
+        return cursor.rowcount > 0
+
+    def _release(self, key, owner) -> bool:
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM leases WHERE key = ? AND owner = ? AND done = 0",
+                                        (str(key), owner))
+        return cursor.rowcount > 0
+
+    def _prune(self, max_age):
+        with self._lock:
+            self._conn.execute("DELETE FROM leases WHERE expires_at < ?", (self.clock() - max_age,))
+
+    def _close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class PostgrestLeaseStore(LeaseStore):
+    """Lease store in a database table reached through PostgREST, shared by nodes on any host.
+
+    Each operation calls one SQL function of the ``print_leases`` table (see README);
+    a claim is a single conditional upsert in the database, so two hosts can never
+    both win an order. Expiry uses the database clock and ``expires_at`` is returned
+    in its epoch seconds: host clocks only decide when a lost order is tried again,
+    never who gets it.
+    """
+
+    def __init__(self, database_url: str, jwt: str, timeout=5.0, transport=None):
+        self.requests = 0
+        self._client = httpx.AsyncClient(
+            base_url=f"{database_url.rstrip('/')}/rest/v1",
+            headers={"apikey": jwt, "Authorization": f"Bearer {jwt}"},
+            timeout=timeout,
+            transport=transport,
+        )
+
+    async def _call(self, function, **args):
+        self.requests += 1
+        response = await self._client.post(f"/rpc/{function}", json=args)
+        response.raise_for_status()
+        return response.json() if response.content else None
+
+    async def acquire(self, key, owner, ttl) -> Lease:
+        row, = await self._call("claim_print_lease", lease_key=str(key), lease_owner=owner, ttl=ttl)
+        return Lease(row["key"], row["owner"], row["expires_at"], row["done"])
+
+    async def renew(self, keys, owner, ttl) -> list:
+        keys = [str(key) for key in keys]
+        if not keys:
+            return []
+        return await self._call("renew_print_leases", lease_keys=keys, lease_owner=owner, ttl=ttl)
+
+    async def complete(self, key, owner) -> bool:
+        return await self._call("complete_print_lease", lease_key=str(key), lease_owner=owner)
+
+    async def release(self, key, owner) -> bool:
+        return await self._call("release_print_lease", lease_key=str(key), lease_owner=owner)
+
+    async def prune(self, max_age=7 * 24 * 3600):
+        await self._call("prune_print_leases", max_age=max_age)
+
+    async def close(self):
+        await self._client.aclose()
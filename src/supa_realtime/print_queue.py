@@ -0,0 +1,405 @@
+import asyncio
+import enum
+import logging
+import time
+
+from src.niimbot.niimbot_printer import PrintJobError
+
+
+class JobState(enum.Enum):
+    QUEUED = "queued"
+    RENDERING = "rendering"
+    PRINTING = "printing"
+    DONE = "done"
+    FAILED = "failed"
+
+
+class PrintQueueFull(Exception):
+    """Raised when a job is submitted without waiting and the queue has no room."""
+
+
+class PrintJob:
+    """One order to print; ``await job.result()`` returns the printed page indexes."""
+
+    def __init__(self, job_id, record, copies=1, numbers=None, raster_mode=None, group=None):
+        self.job_id = job_id
+        self.record = record
+        self.copies = copies
+        self.numbers = numbers  # 출력할 라벨 번호 (None 이면 전체)
+        self.raster_mode = raster_mode  # None 이면 템플릿 기본값
+        self.group = group  # 출력할 프린터 그룹 (None 이면 아무 프린터)
+        self.user_name = None
+        self.state = JobState.QUEUED
+        self.completed_pages = []
+        self.error = None
+        self.submitted_at = None
+        self.started_at = None
+        self.finished_at = None
+        self.attempts = 0
+        self._done = asyncio.Event()
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def remaining(self):
+        """Indexes into ``numbers`` not printed yet, or None if the numbers are not known."""
+        if self.numbers is None:
+            return None
+        printed = set(self.completed_pages)
+        return [index for index in range(len(self.numbers)) if index not in printed]
+
+    def pending_numbers(self):
+        """Label numbers still to print; after a failover only the ones the first printer missed."""
+        return [self.numbers[index] for index in self.remaining()]
+
+    async def result(self):
+        """Wait for the job and return its printed pages, or raise the error it failed with."""
+        await self._done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.completed_pages
+
+    def _finish(self, error=None):
+        self.error = error
+        self.state = JobState.FAILED if error is not None else JobState.DONE
+        self.finished_at = time.monotonic()
+        self._done.set()
+
+    def __repr__(self):
+        return f"<PrintJob {self.job_id} {self.state.value}>"
+
+
+class PrintQueue:
+    """Bounded job queue drained by a single worker that owns the printer.
+
+    Jobs are printed one at a time, so commands of different orders never interleave on
+    the serial port. ``render(job)`` is awaited to turn a job into label images before
+    the printer is used; ``on_page(job, index)`` is called as each page is printed and
+    ``on_finished(job)`` after every job, failed or not.
+
+    With ``max_batch`` above one, the worker prints up to ``max_batch`` queued jobs with
+    the same number of copies in one print session, waiting up to ``batch_window``
+    seconds for more jobs when it finds the queue empty. ``prepare(jobs)`` is awaited
+    once per batch (e.g. to look up all user names in one query). Every job of a batch
+    still completes, and calls ``on_finished``, as soon as its own labels are printed.
+    """
+
+    def __init__(self, printer, render, maxsize=100, on_finished=None, on_page=None, max_batch=1,
+                 batch_window=0.0, prepare=None):
+        self.printer = printer
+        self.render = render
+        self.on_finished = on_finished
+        self.on_page = on_page
+        self.max_batch = max_batch
+        self.batch_window = batch_window
+        self.prepare = prepare
+        self._queue = asyncio.Queue(maxsize)
+        self._carry = None  # 배치에 넣지 못해 다음에 먼저 출력할 작업
+        self._arrived = asyncio.Event()
+        self._sessions = {}  # id(printer) -> 출력 세션 동안 잡는 잠금
+        self._worker = None
+        self.current = None
+        self.submitted = 0
+        self.rejected = 0
+        self.completed = 0
+        self.failed = 0
+        self.max_depth = 0
+        self.wait_time = 0.0
+        self.print_time = 0.0
+        self.batches = 0
+        self.batched_jobs = 0
+        self.largest_batch = 0
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize() + (self._carry is not None)
+
+    def start(self):
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run(), name="printer-worker")
+
+    async def stop(self):
+        if self._worker:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+        if self._carry is not None:
+            self._carry._finish(Exception("Print queue stopped"))
+            self._carry = None
+        while not self._queue.empty():
+            job = self._queue.get_nowait()
+            job._finish(Exception("Print queue stopped"))
+
+    def serves(self, group) -> bool:
+        """Whether a job routed to printer ``group`` can be printed here; one printer prints every group."""
+        return True
+
+    def _session_lock(self, printer) -> asyncio.Lock:
+        return self._sessions.setdefault(id(printer), asyncio.Lock())
+
+    async def check_printer(self, printer=None) -> bool:
+        """Check ``printer``'s connection between print sessions; False if it is printing.
+
+        The driver has no lock of its own, so a connection check (which may reconnect)
+        must never run while a worker is in the middle of a session on the same printer.
+        A printer that is busy printing is already known to be connected.
+        """
+        printer = printer or self.printer
+        lock = self._session_lock(printer)
+        if lock.locked():
+            logging.debug("Printer heartbeat check skipped - Printer is printing")
+            return False
+        async with lock:
+            await printer.check_printer_connection()
+        return True
+
+    def _accepted(self, job):
+        self._arrived.set()
+        self.submitted += 1
+        self.max_depth = max(self.max_depth, self.depth)
+        logging.info(f"Print job queued - Job: {job.job_id}, Depth: {self.depth}")
+        return job
+
+    def submit_nowait(self, job: PrintJob) -> PrintJob:
+        """Queue a job, raising PrintQueueFull instead of waiting for room."""
+        job.submitted_at = time.monotonic()
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            logging.error(f"Print queue full - Job rejected: {job.job_id}, Rejected so far: {self.rejected}")
+            raise PrintQueueFull(f"Print queue is full ({self._queue.maxsize} jobs)")
+        return self._accepted(job)
+
+    async def submit(self, job: PrintJob, timeout=None) -> PrintJob:
+        """Queue a job, waiting up to ``timeout`` seconds for room."""
+        job.submitted_at = time.monotonic()
+        try:
+            await asyncio.wait_for(self._queue.put(job), timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            logging.error(f"Print queue full - Job rejected: {job.job_id}, Rejected so far: {self.rejected}")
+            raise PrintQueueFull(f"Print queue is full ({self._queue.maxsize} jobs)")
+        return self._accepted(job)
+
+    async def _run(self):
+        while True:
+            job, self._carry = self._carry or await self._queue.get(), None
+            batch = await self._collect(job)
+            try:
+                async with self._session_lock(self.printer):
+                    await self._process_batch(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _compatible(self, first: PrintJob, job: PrintJob) -> bool:
+        return job.copies == first.copies and job.remaining() is not None
+
+    def _take_batchable(self, first, limit):
+        """Up to ``limit`` queued jobs that can join ``first``'s batch, and whether an incompatible job is next."""
+        taken = []
+        while len(taken) < limit and not self._queue.empty():
+            job = self._queue.get_nowait()
+            if not self._compatible(first, job):
+                self._carry = job
+                return taken, True
+            taken.append(job)
+        return taken, False
+
+    async def _collect(self, job, take=None) -> list:
+        """``job`` plus the jobs to print with it in one session, taken with ``take(first, limit)``."""
+        take = take or self._take_batchable
+        batch = [job]
+        if self.max_batch <= 1 or job.remaining() is None:
+            return batch
+        deadline = time.monotonic() + self.batch_window
+        try:
+            while True:
+                taken, blocked = take(job, self.max_batch - len(batch))
+                batch += taken
+                remaining = deadline - time.monotonic()
+                if blocked or len(batch) >= self.max_batch or remaining <= 0:
+                    return batch
+                # 프린터가 놀고 있을 때만 잠깐 더 기다려 함께 도착한 주문을 모음
+                self._arrived.clear()
+                waiter = asyncio.ensure_future(self._arrived.wait())
+                try:
+                    await asyncio.wait((waiter,), timeout=remaining)
+                finally:
+                    waiter.cancel()
+        except asyncio.CancelledError:
+            for queued in batch:
+                queued._finish(Exception("Print queue stopped"))
+            raise
+
+    async def _process(self, job: PrintJob, printer=None):
+        printer = printer or self.printer
+        self.current = job
+        started_at = time.monotonic()
+        self._start(job, started_at)
+        # 페이지 번호는 이번 시도에서 출력하는 라벨 기준이므로 작업 전체 기준으로 바꿔서 기록
+        pending = job.remaining()
+        absolute = (lambda index: pending[index]) if pending is not None else (lambda index: index)
+        try:
+            job.state = JobState.RENDERING
+            images = await self.render(job)
+
+            job.state = JobState.PRINTING
+            await printer.print_pages(images, copies=job.copies,
+                                      on_page=lambda index: self._page_printed(job, absolute(index)))
+            job._finish()
+            self.completed += 1
+
+        except asyncio.CancelledError:
+            job._finish(Exception("Print queue stopped"))
+            raise
+        except Exception as e:
+            if isinstance(e, PrintJobError):
+                job.completed_pages = sorted(set(job.completed_pages) | {absolute(i) for i in e.completed_pages})
+            if self._retry(job, e, printer):
+                return
+            job._finish(e)
+            self.failed += 1
+            logging.error(f"Print job failed - Job: {job.job_id}, Error: {str(e)}")
+
+        finally:
+            self.print_time += time.monotonic() - started_at
+            self._released(job)
+
+        self._job_finished(job)
+
+    def _job_finished(self, job):
+        if self.on_finished:
+            try:
+                self.on_finished(job)
+            except Exception as e:
+                logging.warning(f"Print job callback failed: {str(e)}")
+
+    def _start(self, job: PrintJob, started_at):
+        if job.started_at is None:
+            job.started_at = started_at
+            self.wait_time += job.started_at - job.submitted_at
+        job.attempts += 1
+
+    async def _process_batch(self, jobs, printer=None):
+        """Print ``jobs`` in order as one print session."""
+        if len(jobs) == 1:
+            return await self._process(jobs[0], printer)
+        printer = printer or self.printer
+        self.current = jobs[0]
+        started_at = time.monotonic()
+        self.batches += 1
+        self.batched_jobs += len(jobs)
+        self.largest_batch = max(self.largest_batch, len(jobs))
+        for job in jobs:
+            self._start(job, started_at)
+            job.state = JobState.RENDERING
+        pages = []  # 세션의 페이지 번호 -> (작업, 작업 안의 페이지 번호)
+        try:
+            if self.prepare:
+                try:
+                    await self.prepare(jobs)
+                except Exception as e:
+                    logging.warning(f"Print batch preparation failed - Jobs: {len(jobs)}, Error: {str(e)}")
+
+            await printer.print_pages(self._batch_pages(jobs, pages), copies=jobs[0].copies,
+                                      on_page=lambda index: self._batch_page_printed(*pages[index]))
+            for job in jobs:
+                if not job.done:
+                    self._complete(job)
+
+        except asyncio.CancelledError:
+            for job in jobs:
+                if not job.done:
+                    job._finish(Exception("Print queue stopped"))
+            raise
+        except Exception as e:
+            if isinstance(e, PrintJobError):
+                for job, index in (pages[i] for i in e.completed_pages if i < len(pages)):
+                    if index not in job.completed_pages:
+                        job.completed_pages.append(index)
+            # 되돌리는 작업이 원래 순서대로 큐 앞에 오도록 뒤에서부터 처리
+            for job in reversed([job for job in jobs if not job.done]):
+                if self._retry(job, e, printer):
+                    continue
+                self._fail(job, e)
+
+        finally:
+            self.print_time += time.monotonic() - started_at
+            for job in jobs:
+                self._released(job)
+
+    async def _batch_pages(self, jobs, pages):
+        for job in jobs:
+            if job.done:
+                continue
+            try:
+                images = await self.render(job)
+                numbers = iter(job.remaining())
+                if not hasattr(images, "__aiter__"):
+                    images = _aiter(images)
+                async for image in images:
+                    pages.append((job, next(numbers)))
+                    job.state = JobState.PRINTING
+                    self.current = job
+                    yield image
+            except Exception as e:
+                # 잘못된 주문 하나가 같은 배치의 다른 주문을 막지 않음
+                self._fail(job, e)
+
+    def _batch_page_printed(self, job, index):
+        self._page_printed(job, index)
+        if len(job.completed_pages) == len(job.numbers) and not job.done:
+            self._complete(job)
+
+    def _complete(self, job):
+        job._finish()
+        self.completed += 1
+        self._job_finished(job)
+
+    def _fail(self, job, error):
+        job._finish(error)
+        self.failed += 1
+        logging.error(f"Print job failed - Job: {job.job_id}, Error: {str(error)}")
+        self._job_finished(job)
+
+    def _retry(self, job, error, printer) -> bool:
+        """Hook for queues that can hand a failed job to another printer; True if it was requeued."""
+        return False
+
+    def _released(self, job):
+        self.current = None
+
+    def _page_printed(self, job, index):
+        job.completed_pages.append(index)
+        if self.on_page:
+            self.on_page(job, index)
+
+    def stats(self) -> dict:
+        finished = self.completed + self.failed
+        return {
+            "depth": self.depth,
+            "max_depth": self.max_depth,
+            "submitted": self.submitted,
+            "rejected": self.rejected,
+            "completed": self.completed,
+            "failed": self.failed,
+            "average_wait": self.wait_time / finished if finished else 0.0,
+            "average_print": self.print_time / finished if finished else 0.0,
+            "batches": self.batches,
+            "average_batch": self.batched_jobs / self.batches if self.batches else 0.0,
+            "largest_batch": self.largest_batch,
+            # 배치로 묶여 따로 열지 않은 출력 세션 수
+            "sessions_saved": self.batched_jobs - self.batches,
+        }
+
+
+async def _aiter(images):
+    for image in images:
+        yield image
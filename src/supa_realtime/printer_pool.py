@@ -0,0 +1,244 @@
+import asyncio
+import logging
+import time
+from collections import deque
+
+from src.niimbot.niimbot_printer import find_fault
+from src.supa_realtime.print_queue import JobState, PrintJob, PrintQueue, PrintQueueFull
+
+
+def printer_fault(error: Exception):
+    """The device condition behind ``error``, or None if the job itself is at fault."""
+    fault = find_fault(error)
+    return fault.reason if fault else None
+
+
+class PoolMember:
+    """One printer of a pool with its own worker and health."""
+
+    def __init__(self, printer, name, groups=()):
+        self.printer = printer
+        self.name = name
+        self.groups = set(groups)
+        self.healthy = True
+        self.fault = None
+        self.current = None
+        self.jobs = 0
+        self.labels = 0
+        self.busy_time = 0.0
+        self.faults = 0
+
+    def accepts(self, job) -> bool:
+        """Whether this printer belongs to the group the job was routed to."""
+        return job.group is None or job.group in self.groups
+
+    @property
+    def load(self) -> int:
+        """Labels left in the job this printer is working on."""
+        if self.current is None:
+            return 0
+        remaining = self.current.remaining()
+        return len(remaining) if remaining is not None else 1
+
+    def stats(self) -> dict:
+        return {
+            "healthy": self.healthy,
+            "fault": self.fault,
+            "groups": sorted(self.groups),
+            "load": self.load,
+            "jobs": self.jobs,
+            "labels": self.labels,
+            "busy": self.busy_time,
+            "faults": self.faults,
+        }
+
+
+class PrinterPool(PrintQueue):
+    """Print queue drained by one worker per printer.
+
+    Whenever a healthy printer is idle its worker takes the next job, so orders always
+    go to the least-loaded printer and throughput grows with the number of devices.
+    When a printer fails with a device fault (cover open, low battery, disabled, no
+    response), it leaves the rotation and the labels it did not print go back to the
+    front of the queue for the other printers. Faulted printers are probed every
+    ``recovery_interval`` seconds and rejoin once their status check passes. With no
+    healthy printer left the job fails as it would with a single printer.
+
+    ``groups`` maps printer group names to printer names. A job routed to a group
+    (``job.group``) is only taken, and failed over, by printers of that group; jobs
+    without a group go to any printer.
+    """
+
+    def __init__(self, printers, render, maxsize=100, on_finished=None, on_page=None, recovery_interval=30.0,
+                 names=None, groups=None, max_batch=1, batch_window=0.0, prepare=None):
+        assert printers, "A printer pool needs at least one printer"
+        super().__init__(printers[0], render, maxsize, on_finished, on_page, max_batch, batch_window, prepare)
+        names = names or [f"printer-{index}" for index in range(len(printers))]
+        groups = groups or {}
+        self.members = [PoolMember(printer, name, [group for group, members in groups.items() if name in members])
+                        for printer, name in zip(printers, names)]
+        self._by_printer = {id(member.printer): member for member in self.members}
+        self.maxsize = maxsize
+        self.recovery_interval = recovery_interval
+        self._jobs = deque()
+        self._changed = asyncio.Condition()
+        self._workers = []
+        self.failovers = 0
+
+    @property
+    def depth(self) -> int:
+        return len(self._jobs)
+
+    @property
+    def healthy(self):
+        return [member for member in self.members if member.healthy]
+
+    def serves(self, group) -> bool:
+        return any(group in member.groups for member in self.members)
+
+    def start(self):
+        if not self._workers:
+            self._workers = [asyncio.create_task(self._run_member(member), name=f"printer-worker-{member.name}")
+                             for member in self.members]
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        for worker in self._workers:
+            try:
+                await worker
+            except asyncio.CancelledError:
+                pass
+        self._workers = []
+
+        while self._jobs:
+            self._jobs.popleft()._finish(Exception("Print queue stopped"))
+
+    def _full(self):
+        self.rejected += 1
+        logging.error(f"Print queue full - Job rejected, Rejected so far: {self.rejected}")
+        return PrintQueueFull(f"Print queue is full ({self.maxsize} jobs)")
+
+    async def _notify(self):
+        async with self._changed:
+            self._changed.notify_all()
+
+    def submit_nowait(self, job: PrintJob) -> PrintJob:
+        job.submitted_at = time.monotonic()
+        if len(self._jobs) >= self.maxsize:
+            raise self._full()
+        self._jobs.append(job)
+        asyncio.get_running_loop().create_task(self._notify())
+        return self._accepted(job)
+
+    async def submit(self, job: PrintJob, timeout=None) -> PrintJob:
+        job.submitted_at = time.monotonic()
+        async with self._changed:
+            try:
+                await asyncio.wait_for(self._changed.wait_for(lambda: len(self._jobs) < self.maxsize), timeout)
+            except asyncio.TimeoutError:
+                raise self._full()
+            self._jobs.append(job)
+            self._changed.notify_all()
+        return self._accepted(job)
+
+    def _position(self, member: PoolMember):
+        # 이 프린터 그룹으로 지정된 작업 중 가장 앞의 것
+        return next((index for index, job in enumerate(self._jobs) if member.accepts(job)), None)
+
+    async def _next_job(self, member: PoolMember) -> PrintJob:
+        async with self._changed:
+            await self._changed.wait_for(lambda: self._position(member) is not None or not member.healthy)
+            if not member.healthy:
+                return None
+            index = self._position(member)
+            job = self._jobs[index]
+            del self._jobs[index]
+            self._changed.notify_all()  # 대기 중인 submit 에 자리가 났음을 알림
+            return job
+
+    def _take_batchable(self, first, limit, member: PoolMember):
+        taken = []
+        for job in list(self._jobs):
+            if len(taken) >= limit:
+                break
+            if not member.accepts(job):
+                continue  # 다른 그룹의 작업은 건너뛰고 이 프린터의 작업 순서만 지킴
+            if not self._compatible(first, job):
+                return self._taken(taken), True
+            taken.append(job)
+            self._jobs.remove(job)
+        return self._taken(taken), False
+
+    def _taken(self, jobs):
+        if jobs:
+            asyncio.get_running_loop().create_task(self._notify())
+        return jobs
+
+    async def _run_member(self, member: PoolMember):
+        while True:
+            if not member.healthy:
+                await asyncio.sleep(self.recovery_interval)
+                async with self._session_lock(member.printer):
+                    await self._probe(member)
+                continue
+
+            job = await self._next_job(member)
+            if job is None:
+                continue
+            batch = await self._collect(job, lambda first, limit: self._take_batchable(first, limit, member))
+            member.current = job
+            started = time.monotonic()
+            printed = [len(job.completed_pages) for job in batch]
+            try:
+                async with self._session_lock(member.printer):
+                    await self._process_batch(batch, member.printer)
+            finally:
+                member.current = None
+                member.jobs += len(batch)
+                member.labels += sum(len(job.completed_pages) for job in batch) - sum(printed)
+                member.busy_time += time.monotonic() - started
+
+    async def _probe(self, member: PoolMember):
+        try:
+            await member.printer.check_printer_status()
+        except Exception as e:
+            logging.debug(f"Printer still unavailable - Printer: {member.name}, Error: {str(e)}")
+            return
+        member.healthy = True
+        member.fault = None
+        logging.info(f"Printer back in rotation - Printer: {member.name}")
+        await self._notify()
+
+    def _retry(self, job, error, printer) -> bool:
+        fault = printer_fault(error)
+        if fault is None:
+            return False
+        member = self._by_printer[id(printer)]
+        if member.healthy:
+            # 배치의 남은 작업마다 불리므로 장애는 한 번만 기록
+            member.faults += 1
+            logging.warning(f"Printer taken out of rotation - Printer: {member.name}, Fault: {fault}")
+        member.healthy = False
+        member.fault = fault
+
+        if not any(other.accepts(job) for other in self.healthy) or job.attempts >= len(self.members):
+            return False
+        # 남은 라벨만 다른 프린터가 먼저 출력하도록 큐 앞에 되돌림
+        job.state = JobState.QUEUED
+        self._jobs.appendleft(job)
+        self.failovers += 1
+        asyncio.get_running_loop().create_task(self._notify())
+        logging.warning(f"Print job moved to another printer - Job: {job.job_id}, "
+                        f"Remaining labels: {len(job.remaining() or ())}")
+        return True
+
+    def _released(self, job):
+        active = [member.current for member in self.members if member.current not in (None, job)]
+        self.current = active[0] if active else None
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        stats["failovers"] = self.failovers
+        stats["printers"] = {member.name: member.stats() for member in self.members}
+        return stats
@@ -3,18 +3,70 @@ import logging
 import json
 
 from realtime import AsyncRealtimeClient
-from src.niimbot.niimbot_printer import NiimbotPrint
-from src.qr_generator.layout import ImageLayout
+from src.niimbot.async_niimbot_printer import AsyncNiimbotPrint
+from src.niimbot.raster import RASTER_MODES
+from src.supa_db.result_writer import FAILED, PRINTED, ResultWriter
 from src.supa_db.supa_db import SupaDB
+from src.supa_realtime.catch_up import CatchUpSync
+from src.supa_realtime.fair_queue import FairPrintQueue, FairScheduler
+from src.supa_realtime.cluster import ClusterNode
+from src.supa_realtime.job_journal import JobJournal, label_id
+from src.supa_realtime.label_pipeline import LabelPipeline
+from src.supa_realtime.print_queue import PrintJob, PrintQueue, PrintQueueFull
+from src.supa_realtime.printer_pool import PrinterPool
+from src.supa_realtime.station_routing import RoutingTable, StationFilter
 from src.utils.suppress_log import temporary_log_level
 
 
 class RealtimeService:
-    def __init__(self, url: str, jwt: str, printer: NiimbotPrint, supa_api: SupaDB):
+    def __init__(self, url: str, jwt: str, printer: AsyncNiimbotPrint, supa_api: SupaDB, queue_size=100,
+                 journal: JobJournal = None, pipeline: LabelPipeline = None, results: ResultWriter = None,
+                 catch_up: CatchUpSync = None, printer_names=None, cluster: ClusterNode = None,
+                 station: StationFilter = None, routes: RoutingTable = None, max_batch=1, batch_window=0.0,
+                 fair: FairScheduler = None):
         self.url = url
         self.jwt = jwt
-        self.printer = printer
+        # 프린터 목록을 받으면 프린터마다 작업자를 두고 주문을 나눠서 출력
+        self.printers = list(printer) if isinstance(printer, (list, tuple)) else [printer]
+        self.printer = self.printers[0]
         self.supa_api = supa_api
+        self.journal = journal
+        # 라벨별 출력 결과를 모아서 DB 에 기록 (출력 경로를 막지 않음)
+        self.results = results
+        # 연결이 끊긴 동안 추가된 주문을 재구독 후 다시 받음
+        self.catch_up = catch_up
+        self._catch_up_task = None
+        # 여러 호스트가 같은 채널을 구독할 때 주문마다 임대를 얻은 노드만 출력
+        self.cluster = cluster
+        # 이 노드의 지점 주문만 구독하고, 주문 속성에 따라 프린터 그룹을 고름
+        self.station = station
+        self.routes = routes
+        self.filtered = 0
+        # 프린터가 출력하는 동안 다음 라벨들을 미리 렌더링
+        self.pipeline = pipeline or LabelPipeline()
+        # 프린터는 하나의 작업자만 사용하도록 주문을 큐로 직렬화
+        # (몰려 들어온 주문은 max_batch 개까지 한 번의 출력 세션으로 묶음)
+        batching = dict(max_batch=max_batch, batch_window=batch_window, prepare=self._prepare_batch)
+        if fair is not None and len(self.printers) > 1:
+            logging.warning("Fair scheduling needs a single printer - Printer pool keeps arrival order")
+        if fair is not None and len(self.printers) == 1:
+            if max_batch > 1 or batch_window:
+                logging.warning("Fair scheduling prints label slices in one session - "
+                                "max_batch and batch_window are ignored")
+            # 큰 주문이 프린터를 독차지하지 않도록 요청자별로 라벨을 번갈아 출력
+            self.print_queue = FairPrintQueue(self.printer, self._render_labels, queue_size,
+                                              on_finished=self._on_job_finished, on_page=self._on_page_printed,
+                                              scheduler=fair, prepare=self._prepare_batch)
+        elif len(self.printers) > 1:
+            self.print_queue = PrinterPool(self.printers, self._render_labels, queue_size,
+                                           on_finished=self._on_job_finished, on_page=self._on_page_printed,
+                                           names=printer_names, groups=routes.groups if routes else None,
+                                           **batching)
+        else:
+            self.print_queue = PrintQueue(self.printer, self._render_labels, queue_size,
+                                          on_finished=self._on_job_finished, on_page=self._on_page_printed,
+                                          **batching)
+        self._active_jobs = set()
         self._socket = None
         self._channel = None
         self._heartbeat_task = None
@@ -26,11 +78,13 @@ class RealtimeService:
 
     async def _printer_heartbeat_monitor(self):
         while True:
-            try:
-                self.printer.check_printer_connection()
-                logging.debug("Printer heartbeat check: OK")
-            except Exception as e:
-                logging.error(f"Printer heartbeat check failed: {str(e)}")
+            for printer in self.printers:
+                try:
+                    # 출력 중인 프린터는 건너뛰고, 세션 사이에만 연결을 확인
+                    if await self.print_queue.check_printer(printer):
+                        logging.debug("Printer heartbeat check: OK")
+                except Exception as e:
+                    logging.error(f"Printer heartbeat check failed: {str(e)}")
             await asyncio.sleep(300)
 
     async def _cleanup_channel(self):
@@ -61,9 +115,10 @@ class RealtimeService:
                 event="INSERT",
                 schema="public",
                 table="laundry",
-                callback=self._callback_wrapper
+                callback=self._callback_wrapper,
+                filter=self.station.realtime() if self.station else None
             ).subscribe()
-            logging.info("Channel subscribed successfully")
+            logging.info(f"Channel subscribed successfully - Filter: {self.station}")
             return True
         except Exception as e:
             logging.error(f"Channel setup failed: {str(e)}")
@@ -88,42 +143,184 @@ class RealtimeService:
             return False
 
     def _callback_wrapper(self, payload):
-        asyncio.create_task(self._handle_print_request(payload))
-
-    async def _handle_print_request(self, payload):
         try:
             record = payload['data']['record']
-            laundry_id = record['id']
-            amount = record['amount']
-            requested_by = record['requested_by']
-            user_name = self.supa_api.get_user_name(requested_by)
-            logging.info(f"Print request received - User: {user_name}, Amount: {amount}")
+            if self.station and not self.station.matches(record):
+                # 서버 필터가 적용되지 않은 경우에도 다른 지점 주문은 받지 않음
+                self.filtered += 1
+                logging.debug(f"Print request for another station ignored - Job: {record['id']}")
+                return
+            if self.catch_up and not self.catch_up.is_new(record):
+                logging.info(f"Duplicate print request ignored - Job: {record['id']} was caught up")
+                return
+            self._submit_record(record)
+            if self.catch_up:
+                self.catch_up.processed(record)
+        except PrintQueueFull as e:
+            if self.catch_up:
+                # 다음 따라잡기에서 다시 제출하고, 그 전까지 표시는 이 행 앞에 머묾
+                self.catch_up.rejected(record)
+                logging.error(f"Print request deferred to next catch-up - Job: {record['id']}, Error: {str(e)}")
+            else:
+                logging.error(f"Print request dropped - Error: {str(e)}")
+        except Exception as e:
+            logging.error(f"Invalid print request - Error: {str(e)}")
 
-            for i in range(amount):
-                try:
-                    self.printer.check_printer_status()
-                    number = i + 1
-                    data = f"{laundry_id}.{number}"
-                    image = ImageLayout.create_qr_image(data, f"{user_name} {number}")
-                    self.printer.print_image(image)
-                    logging.info(f"Print success - User: {user_name}, Number: {number}/{amount}")
+    def _submit_record(self, record):
+        job = self._accept_job(record)
+        if job:
+            self._submit_nowait(job)
 
-                except Exception as e:
-                    error_msg = str(e)
-                    logging.error(f"Print failed - Error: {error_msg}")
-                    if "프린터 커버가 열려있습니다" in error_msg:
-                        raise Exception("프린터 커버가 열려있어 인쇄할 수 없습니다")
-                    if "프린터 배터리가 부족합니다" in error_msg:
-                        raise Exception("프린터 배터리가 부족하여 인쇄할 수 없습니다")
-                    if "용지 걸림" in error_msg or "사용 불가능한 상태" in error_msg:
-                        raise Exception("프린터가 사용 불가능한 상태입니다")
-                    raise Exception(f"알 수 없는 프린터 오류가 발생했습니다: {error_msg}")
-
-            logging.info(f"All prints completed - User: {user_name}, Total Amount: {amount}")
+    def _submit_caught_up(self, record):
+        try:
+            self._submit_record(record)
+        except PrintQueueFull:
+            raise  # 큐가 비면 다음 재연결 때 이 주문부터 다시 받음
+        except Exception as e:
+            logging.error(f"Invalid print request - Job: {record.get('id')}, Error: {str(e)}")
 
+    async def _run_catch_up(self):
+        try:
+            await self.catch_up.run(self._submit_caught_up)
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
-            logging.error(f"Print job failed - Error: {str(e)}")
+            logging.error(f"Catch-up sync failed - Mark: {self.catch_up.mark}, Error: {str(e)}")
+        logging.debug(f"Catch-up sync stats: {self.catch_up.stats()}")
+
+    def _start_catch_up(self):
+        if self.catch_up and (self._catch_up_task is None or self._catch_up_task.done()):
+            self._catch_up_task = asyncio.create_task(self._run_catch_up())
+
+    def _accept_job(self, record, copies=None, numbers=None):
+        """Create a job for the labels of ``record`` that still have to be printed, or None."""
+        job_id = record['id']
+        copies = copies or record.get('copies') or 1
+        if numbers is None:
+            numbers = list(range(1, record['amount'] + 1))
+        raster_mode = record.get('raster_mode')
+        if raster_mode is not None and raster_mode not in RASTER_MODES:
+            raise ValueError(f"Unknown raster mode '{raster_mode}'")
+
+        group = self.routes.route(record) if self.routes else None
+        if group is not None and not self.print_queue.serves(group):
+            raise ValueError(f"No printer in group '{group}'")
+
+        if str(job_id) in self._active_jobs:
+            logging.info(f"Duplicate print request ignored - Job: {job_id} is already queued")
+            return None
+        if self.cluster and not self.cluster.claim(record, self.print_queue.depth):
+            return None
+        if self.journal:
+            # 이미 출력이 확인된 라벨은 건너뜀 (재전송된 이벤트)
+            try:
+                numbers = self.journal.accept(job_id, record, copies, numbers)
+            except Exception:
+                self._release_claim(job_id)
+                raise
+            if not numbers:
+                logging.info(f"Duplicate print request ignored - Job: {job_id} was already printed")
+                if self.cluster:
+                    self.cluster.finished(job_id)
+                return None
+        return PrintJob(job_id, record, copies=copies, numbers=numbers, raster_mode=raster_mode, group=group)
+
+    def _release_claim(self, job_id):
+        if self.cluster:
+            self.cluster.release(job_id)
+
+    def _submit_nowait(self, job: PrintJob):
+        try:
+            self.print_queue.submit_nowait(job)
+        except PrintQueueFull:
+            self._release_claim(job.job_id)  # 여유가 있는 다른 노드가 가져가도록 임대를 돌려줌
+            raise
+        self._active_jobs.add(str(job.job_id))
+
+    async def _handle_print_request(self, payload):
+        """Queue a print request and wait until it is printed."""
+        job = self._accept_job(payload['data']['record'])
+        if job is None:
+            return []
+        try:
+            job = await self.print_queue.submit(job)
+        except PrintQueueFull:
+            self._release_claim(job.job_id)
             raise
+        self._active_jobs.add(str(job.job_id))
+        try:
+            return await job.result()
+        except Exception as e:
+            raise _describe_print_error(e)
+
+    def _resume_unfinished(self):
+        """Queue the labels a previous run accepted but did not confirm."""
+        if not self.journal:
+            return
+        for record, copies, numbers in self.journal.unfinished():
+            logging.warning(f"Resuming unfinished print job - Job: {record['id']}, Labels: {numbers}")
+            try:
+                job = self._accept_job(record, copies, numbers)
+                if job:
+                    self._submit_nowait(job)
+            except PrintQueueFull as e:
+                logging.error(f"Unfinished print job not resumed - Error: {str(e)}")
+
+    async def _prepare_batch(self, jobs):
+        """Look up the names of every user in a print batch with one query."""
+        await self.supa_api.profiles.prefetch([job.record['requested_by'] for job in jobs])
+        logging.info(f"Printing batched orders - Jobs: {[job.job_id for job in jobs]}")
+
+    async def _render_labels(self, job: PrintJob):
+        record = job.record
+        laundry_id = record['id']
+        user_name = await self.supa_api.profiles.get_user_name(record['requested_by'])
+        job.user_name = user_name
+        numbers = job.pending_numbers()
+        logging.info(f"Print request received - User: {user_name}, Labels: {numbers}, Copies: {job.copies}")
+
+        pages = self.pipeline.pages(
+            (label_id(laundry_id, number), f"{user_name} {number}", job.raster_mode) for number in numbers
+        )
+
+        async def send():
+            numbers_sent = iter(numbers)
+            async for page in pages:
+                if self.journal:
+                    self.journal.mark_sent(label_id(laundry_id, next(numbers_sent)))
+                yield page
+
+        return send()
+
+    def _on_page_printed(self, job: PrintJob, index):
+        number = job.numbers[index]
+        if self.journal:
+            self.journal.mark_confirmed(label_id(job.job_id, number))
+        if self.results:
+            self.results.record(label_id(job.job_id, number), job.job_id, number, PRINTED)
+        logging.info(f"Print success - User: {job.user_name}, Number: {number}/{job.record['amount']}")
+
+    def _on_job_finished(self, job: PrintJob):
+        self._active_jobs.discard(str(job.job_id))
+        if self.cluster:
+            self.cluster.finished(job.job_id, job.error)
+        user_name = job.user_name
+        if job.error is None:
+            logging.info(f"All prints completed - User: {user_name}, Total Amount: {job.record['amount']}")
+            logging.debug(f"Print completion wait stats: {self.printer.completion.stats()}")
+            logging.debug(f"Label pipeline stage times: {self.pipeline.stats()}")
+        else:
+            printed = [job.numbers[index] for index in job.completed_pages]
+            reason = str(_describe_print_error(job.error))
+            logging.error(f"Print failed - User: {user_name}, Printed: {printed}, Error: {reason}")
+            if self.journal and "Print queue stopped" not in str(job.error):
+                # 종료로 멈춘 작업은 재시작하면 다시 출력하고, 반복해서 실패한 작업은 포기
+                self.journal.mark_failed(job.job_id)
+            if self.results:
+                for number in job.numbers or ():
+                    if number not in printed:
+                        self.results.record(label_id(job.job_id, number), job.job_id, number, FAILED, reason)
+        logging.debug(f"Print queue stats: {self.print_queue.stats()}")
 
     async def establish_connection(self):
         logging.info("Establishing socket connection...")
@@ -132,11 +329,16 @@ class RealtimeService:
                 logging.warning("Failed to connect socket")
                 return False
 
+            if self.catch_up:
+                # 구독 중에 도착하는 이벤트가 표시를 앞당기지 않도록 먼저 시작점을 고정
+                self.catch_up.begin()
             if not await self._setup_channel():
                 logging.warning("Failed to setup channel")
                 await self._cleanup_socket()
                 return False
 
+            # 구독 후에 조회해야 그 사이 추가된 주문도 놓치지 않음
+            self._start_catch_up()
             return True
         except Exception as e:
             logging.error(f"Connection establishment failed: {str(e)}")
@@ -147,6 +349,12 @@ class RealtimeService:
         self._is_running = True
         self._reconnect_attempts = 0
         self._heartbeat_task = asyncio.create_task(self._printer_heartbeat_monitor())
+        self.print_queue.start()
+        if self.results:
+            self.results.start()
+        if self.cluster:
+            self.cluster.start(self._submit_record, lambda: self.print_queue.depth)
+        self._resume_unfinished()
 
         while self._is_running:
             try:
@@ -174,12 +382,44 @@ class RealtimeService:
 
     async def stop_listening(self):
         self._is_running = False
+        if self._catch_up_task:
+            self._catch_up_task.cancel()
         if self._heartbeat_task:
             self._heartbeat_task.cancel()
             try:
                 await self._heartbeat_task
             except asyncio.CancelledError:
                 pass
+        if self.cluster:
+            await self.cluster.stop()
+        await self.print_queue.stop()
+        if self.cluster:
+            # 대기 중인 작업은 큐를 멈추며 실패 처리되므로 그 임대까지 돌려줌
+            await self.cluster.flush()
+        self.pipeline.close()
+        if self.results:
+            # 큐를 멈추며 실패 처리된 작업까지 기록한 뒤 종료
+            await self.results.stop()
+            logging.info(f"Print result write-back stats: {self.results.stats()}")
+        if self.cluster:
+            logging.info(f"Cluster lease stats: {self.cluster.stats()}")
+        if self.station or self.routes:
+            logging.info(f"Station routing - Filtered locally: {self.filtered}, "
+                         f"Orders by printer group: {self.routes.stats() if self.routes else {}}")
+        if self.journal:
+            self.journal.flush()
         await self._cleanup_channel()
         await self._cleanup_socket()
         logging.warning("Service stopped and connection closed")
+
+
+def _describe_print_error(error: Exception) -> Exception:
+    """Map a printer failure to the message shown to users."""
+    error_msg = str(error)
+    if "프린터 커버가 열려있습니다" in error_msg:
+        return Exception("프린터 커버가 열려있어 인쇄할 수 없습니다")
+    if "프린터 배터리가 부족합니다" in error_msg:
+        return Exception("프린터 배터리가 부족하여 인쇄할 수 없습니다")
+    if "용지 걸림" in error_msg or "사용 불가능한 상태" in error_msg:
+        return Exception("프린터가 사용 불가능한 상태입니다")
+    return Exception(f"알 수 없는 프린터 오류가 발생했습니다: {error_msg}")
@@ -0,0 +1,85 @@
+import json
+
+
+class StationFilter:
+    """Restricts the ``laundry`` rows a node receives to its own stations.
+
+    The same condition is sent as the realtime subscription ``filter`` (so the server
+    only pushes matching INSERTs), as ``filters`` of the catch-up reads, and checked
+    locally on every record. Realtime filters take a single column, so a station
+    filter is one column compared with one or more values.
+    """
+
+    def __init__(self, column, values):
+        values = [values] if isinstance(values, (str, int)) else list(values)
+        assert values, "A station filter needs at least one value"
+        self.column = column
+        self.values = [str(value) for value in values]
+        self._accepted = set(self.values)
+
+    @classmethod
+    def parse(cls, text):
+        """``"station=gangnam"`` or ``"station=gangnam,seocho"``."""
+        column, sep, values = text.partition("=")
+        if not sep or not column or not values:
+            raise ValueError(f"Station filter must look like column=value[,value...], got '{text}'")
+        return cls(column.strip(), [value.strip() for value in values.split(",")])
+
+    def realtime(self) -> str:
+        if len(self.values) == 1:
+            return f"{self.column}=eq.{self.values[0]}"
+        return f"{self.column}=in.({','.join(self.values)})"
+
+    def matches(self, record) -> bool:
+        return str(record.get(self.column)) in self._accepted
+
+    def __repr__(self):
+        return f"<StationFilter {self.realtime()}>"
+
+
+class RoutingTable:
+    """Maps order attributes to the printer group that prints the order.
+
+    ``routes`` is a list of ``(match, group)`` pairs checked in order; ``match`` maps
+    record columns to a value or a list of accepted values, and the first route whose
+    columns all match wins. ``groups`` maps each group to printer names. Orders no
+    route matches go to ``default`` (None lets any printer take them).
+    """
+
+    def __init__(self, routes, groups, default=None):
+        self.groups = {group: list(printers) for group, printers in groups.items()}
+        self.default = default
+        self.routes = []
+        for match, group in routes:
+            if group not in self.groups:
+                raise ValueError(f"Route to unknown printer group '{group}'")
+            accepted = {column: {str(value) for value in (values if isinstance(values, list) else [values])}
+                        for column, values in match.items()}
+            self.routes.append((accepted, group))
+        if default is not None and default not in self.groups:
+            raise ValueError(f"Unknown default printer group '{default}'")
+        self.routed = {}
+
+    @classmethod
+    def from_config(cls, config: dict):
+        """``{"groups": {name: [printer, ...]}, "routes": [{"match": {...}, "group": name}], "default": name}``"""
+        return cls([(route["match"], route["group"]) for route in config.get("routes", [])],
+                   config.get("groups", {}), config.get("default"))
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding="utf-8") as file:
+            return cls.from_config(json.load(file))
+
+    def route(self, record):
+        """The printer group for ``record``, or the default group."""
+        group = self.default
+        for accepted, candidate in self.routes:
+            if all(str(record.get(column)) in values for column, values in accepted.items()):
+                group = candidate
+                break
+        self.routed[group] = self.routed.get(group, 0) + 1
+        return group
+
+    def stats(self) -> dict:
+        return dict(self.routed)
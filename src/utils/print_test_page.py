@@ -1,3 +1,4 @@
+from src.niimbot.async_niimbot_printer import AsyncNiimbotPrint
 from src.niimbot.niimbot_printer import NiimbotPrint
 from PIL import Image
 
@@ -5,4 +6,10 @@ from PIL import Image
 def print_test_page(printer: NiimbotPrint):
     image = Image.open('./sample.png')
     printer.print_image(image)
-    image.close()
\ No newline at end of file
+    image.close()
+
+
+async def print_test_page_async(printer: AsyncNiimbotPrint):
+    image = Image.open('./sample.png')
+    await printer.print_image(image)
+    image.close()
@@ -0,0 +1,193 @@
+import asyncio
+import struct
+import threading
+import time
+
+from src.niimbot.enum import InfoEnum, RequestCodeEnum
+from src.niimbot.frame_decoder import FrameDecoder
+from src.niimbot.packet import NiimbotPacket
+
+IMAGE_ROW_TYPES = (
+    RequestCodeEnum.PRINT_BITMAP_ROW,
+    RequestCodeEnum.PRINT_BITMAP_ROW_INDEXED,
+    RequestCodeEnum.PRINT_EMPTY_ROW,
+)
+
+
+class FakePrinterTransport:
+    """In-process Niimbot printer emulator exposing the SerialTransport interface.
+
+    Each command gets its response after ``latency`` seconds; a page finishes
+    ``print_time`` seconds after END_PAGE_PRINT.
+    """
+
+    def __init__(self, latency=0.002, print_time=0.05, read_timeout=0.5):
+        self.latency = latency
+        self.print_time = print_time
+        self.read_timeout = read_timeout
+        self.closingstate = 0
+        self.powerlevel = 4
+        self.enabled = True
+        self.silent = set()  # 응답하지 않을 요청 코드
+        self.commands = []
+        self.rows = 0
+        self.writes = 0
+        self.bytes_written = 0
+        self.pages_printed = 0
+        self.supports_quantity = True
+        self._quantity = 1
+        self._copies_left = 0
+        self._decoder = FrameDecoder()
+        self._cond = threading.Condition()
+        self._outbox = []  # (ready_at, raw)
+        self._page_started = None
+        self._page_done = 0
+        self.is_open = True
+
+    # SerialTransport interface
+
+    def write(self, data):
+        data = bytes(data)
+        self.writes += 1
+        self.bytes_written += len(data)
+        for packet in self._decoder.feed(data):
+            self._handle(packet)
+        return len(data)
+
+    def read_available(self) -> bytes:
+        deadline = time.monotonic() + self.read_timeout
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                ready = [raw for at, raw in self._outbox if at <= now]
+                if ready:
+                    self._outbox = [(at, raw) for at, raw in self._outbox if at > now]
+                    return b"".join(ready)
+                if now >= deadline:
+                    return b""
+                wake = min([deadline] + [at for at, _ in self._outbox])
+                self._cond.wait(max(0.0, wake - now))
+
+    def read(self, length):
+        # pyserial 처럼 length 바이트가 모이거나 타임아웃이 될 때까지 대기
+        deadline = time.monotonic() + self.read_timeout
+        data = b""
+        with self._cond:
+            while len(data) < length:
+                now = time.monotonic()
+                ready = [raw for at, raw in self._outbox if at <= now]
+                self._outbox = [(at, raw) for at, raw in self._outbox if at > now]
+                data += b"".join(ready)
+                if now >= deadline:
+                    break
+                self._cond.wait(deadline - now)
+        return data
+
+    def close(self):
+        self.is_open = False
+
+    def open(self):
+        self.is_open = True
+
+    def reconnect(self):
+        self.is_open = True
+        return True
+
+    # Printer behaviour
+
+    def _reply(self, type_, data):
+        raw = NiimbotPacket(type_, data).to_bytes()
+        with self._cond:
+            self._outbox.append((time.monotonic() + self.latency, raw))
+            self._cond.notify_all()
+
+    def _progress(self):
+        while self._page_started is not None:
+            elapsed = time.monotonic() - self._page_started
+            if elapsed < self.print_time:
+                return int(elapsed / self.print_time * 100)
+            # 한 장 완료, 남은 매수가 있으면 이어서 출력
+            self._page_done += 1
+            self.pages_printed += 1
+            self._copies_left -= 1
+            self._page_started = self._page_started + self.print_time if self._copies_left else None
+        return 100
+
+    def _status(self):
+        progress = self._progress()
+        return struct.pack(">HBBBBB3s", self._page_done, progress, progress, 0, 0,
+                           0 if self.enabled else 1, b"\x00\x00\x00")
+
+    def _handle(self, packet):
+        type_ = packet.type
+        if type_ in IMAGE_ROW_TYPES:
+            self.rows += 1
+            return
+        self.commands.append(type_)
+        if type_ in self.silent:
+            return
+
+        match type_:
+            case RequestCodeEnum.HEARTBEAT:
+                data = bytes(9) + bytes((self.closingstate, self.powerlevel, 0, 0))
+                self._reply(type_ + 1, data)
+            case RequestCodeEnum.GET_PRINT_STATUS:
+                self._reply(type_ + 16, self._status())
+            case RequestCodeEnum.GET_INFO:
+                key = packet.data[0]
+                value = {
+                    InfoEnum.DEVICESERIAL: b"\x12\x34\x56\x78",
+                    InfoEnum.SOFTVERSION: struct.pack(">H", 105),
+                    InfoEnum.BATTERY: b"\x04",
+                }.get(key, b"\x01")
+                self._reply(type_ + key, value)
+            case RequestCodeEnum.SET_LABEL_TYPE | RequestCodeEnum.SET_LABEL_DENSITY | \
+                    RequestCodeEnum.ALLOW_PRINT_CLEAR:
+                self._reply(type_ + 16, b"\x01")
+            case RequestCodeEnum.START_PRINT:
+                self._page_done = 0
+                self._reply(type_ + 1, b"\x01")
+            case RequestCodeEnum.SET_QUANTITY:
+                if self.supports_quantity:
+                    self._quantity = struct.unpack(">H", packet.data)[0]
+                self._reply(type_ + 1, b"\x01")
+            case RequestCodeEnum.END_PAGE_PRINT:
+                self._page_started = time.monotonic()
+                self._copies_left = self._quantity
+                self._quantity = 1
+                self._reply(type_ + 1, b"\x01")
+            case _:
+                self._reply(type_ + 1, b"\x01")
+
+
+class FakeAsyncPrinterTransport:
+    """Asyncio adapter around FakePrinterTransport with the AsyncSerialTransport interface."""
+
+    def __init__(self, printer: FakePrinterTransport = None):
+        self.printer = printer or FakePrinterTransport(read_timeout=0.05)
+        self._running = False
+
+    @property
+    def is_open(self):
+        return self._running
+
+    def open(self, on_data):
+        loop = asyncio.get_running_loop()
+        self._running = True
+
+        def pump():
+            while self._running:
+                data = self.printer.read_available()
+                if data and self._running:
+                    loop.call_soon_threadsafe(on_data, data)
+
+        threading.Thread(target=pump, name="fake-printer-pump", daemon=True).start()
+
+    async def write(self, data):
+        return self.printer.write(data)
+
+    def close(self):
+        self._running = False
+
+    async def reconnect(self):
+        return True
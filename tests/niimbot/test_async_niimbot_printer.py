@@ -0,0 +1,108 @@
+import asyncio
+import os
+import time
+
+import pytest
+import pytest_asyncio
+from PIL import Image
+
+from src.niimbot.async_niimbot_printer import AsyncNiimbotPrint
+from src.niimbot.async_serial_transport import AsyncSerialTransport
+from src.niimbot.enum import InfoEnum, RequestCodeEnum
+from tests.niimbot.emulator import FakeAsyncPrinterTransport, FakePrinterTransport
+
+
+@pytest_asyncio.fixture
+async def transport():
+    transport = FakeAsyncPrinterTransport(FakePrinterTransport(print_time=0.2, read_timeout=0.05))
+    yield transport
+    transport.close()
+
+
+@pytest_asyncio.fixture
+async def printer(transport):
+    printer = await AsyncNiimbotPrint(transport=transport).connect()
+    yield printer
+    printer.close()
+
+
+@pytest.mark.asyncio
+async def test_async_commands(printer):
+    assert (await printer.heartbeat())["powerlevel"] == 4
+    assert (await printer.get_print_status())["isEnabled"] is True
+    assert await printer.get_info(InfoEnum.SOFTVERSION) == 1.05
+    assert await printer.check_printer_status() is True
+
+
+@pytest.mark.asyncio
+async def test_missing_response_raises_timeout(printer, transport):
+    transport.printer.silent.add(RequestCodeEnum.START_PRINT)
+    with pytest.raises(TimeoutError, match="No response"):
+        await printer.start_print()
+
+
+@pytest.mark.asyncio
+async def test_async_cover_open(printer, transport):
+    transport.printer.closingstate = 1
+    with pytest.raises(Exception, match="cover is open"):
+        await printer.check_printer_status()
+
+
+@pytest.mark.asyncio
+async def test_event_loop_stays_responsive_while_printing(printer, transport):
+    """인쇄 중에도 이벤트 루프가 멈추지 않음"""
+    gaps = []
+
+    async def ticker():
+        last = time.monotonic()
+        while True:
+            await asyncio.sleep(0.005)
+            now = time.monotonic()
+            gaps.append(now - last)
+            last = now
+
+    task = asyncio.create_task(ticker())
+    await printer.print_image(Image.new("RGB", (320, 240), "white"))
+    task.cancel()
+
+    assert transport.printer.pages_printed == 1
+    assert len(gaps) > 10
+    assert max(gaps) < 0.1
+
+
+@pytest.mark.asyncio
+async def test_async_serial_transport_over_pty():
+    """가상 터미널(pty)로 fd 기반 읽기/쓰기 확인"""
+    master, slave = os.openpty()
+    transport = AsyncSerialTransport(os.ttyname(slave))
+    received = asyncio.Queue()
+    try:
+        transport.open(received.put_nowait)
+
+        assert await transport.write(b"\x55\x55\x01") == 3
+        assert os.read(master, 16) == b"\x55\x55\x01"
+
+        os.write(master, b"\xaa\xaa")
+        assert await asyncio.wait_for(received.get(), 1) == b"\xaa\xaa"
+    finally:
+        transport.close()
+        os.close(master)
+        os.close(slave)
+
+
+@pytest.mark.asyncio
+async def test_async_serial_write_error_is_raised():
+    """쓰기 실패(OSError)를 성공으로 돌려주지 않음"""
+    master, slave = os.openpty()
+    transport = AsyncSerialTransport(os.ttyname(slave))
+    try:
+        transport.open(lambda data: None)
+        os.close(master)
+        master = None
+        with pytest.raises(OSError):
+            await transport.write(b"\x55\x55\x01")
+    finally:
+        transport.close()
+        if master is not None:
+            os.close(master)
+        os.close(slave)
@@ -0,0 +1,69 @@
+import itertools
+import logging
+
+import pytest
+from PIL import Image
+
+from src.niimbot.completion_waiter import CompletionWaiter, PrintTimeEstimator
+from src.niimbot.enum import RequestCodeEnum
+from src.niimbot.niimbot_printer import NiimbotPrint
+from tests.niimbot.emulator import FakePrinterTransport
+
+
+def test_estimate_scales_with_height_and_density():
+    estimator = PrintTimeEstimator(density=1)
+    short = estimator.estimate(320, 120)
+    tall = estimator.estimate(320, 480)
+    assert tall > short
+
+    estimator.density = 5
+    assert estimator.estimate(320, 480) > tall
+
+
+def test_estimator_learns_measured_durations():
+    estimator = PrintTimeEstimator()
+    assert not estimator.is_measured(320, 240)
+
+    for _ in range(20):
+        estimator.record(320, 240, 0.4)
+    assert estimator.is_measured(320, 240)
+    assert estimator.estimate(320, 240) == pytest.approx(0.4)
+    # 크기별로 따로 기록
+    assert not estimator.is_measured(320, 120)
+
+
+def test_delays_sleep_then_back_off():
+    waiter = CompletionWaiter(PrintTimeEstimator(rows_per_second=240, overhead=0), cold_lead=0.5,
+                              min_poll=0.02, max_poll=0.1)
+    delays = list(itertools.islice(waiter.delays(320, 240, pages=2), 6))
+
+    assert delays[0] == pytest.approx(1.0)  # 2장 x 1초 x 0.5
+    assert delays[1:] == pytest.approx([0.02, 0.04, 0.08, 0.1, 0.1])
+
+
+def test_first_poll_overshoot_shrinks_estimate():
+    waiter = CompletionWaiter(PrintTimeEstimator(rows_per_second=240, overhead=0), cold_lead=0.5)
+    waiter.finished(320, 240, 1, elapsed=1.0, polls=1)
+    assert waiter.estimator.estimate(320, 240) == pytest.approx(0.5)
+
+
+@pytest.mark.benchmark
+def test_adaptive_wait_polls_less():
+    """10ms 폴링 대비 상태 조회 횟수와 대기 시간"""
+    transport = FakePrinterTransport(print_time=0.3)
+    printer = NiimbotPrint(transport=transport)
+    image = Image.new("RGB", (320, 240), "white")
+    try:
+        for _ in range(5):
+            start = len(transport.commands)
+            printer.print_image(image)
+        last_polls = transport.commands[start:].count(RequestCodeEnum.GET_PRINT_STATUS)
+    finally:
+        printer.close()
+
+    stats = printer.completion.stats()
+    logging.info(f"completion wait: {stats}, polls on last label {last_polls}")
+    # 10ms 간격이면 0.3초 동안 약 25회 조회
+    assert stats["polls_per_wait"] < 8
+    assert last_polls < 8
+    assert stats["last_wait"] < 0.3 + 0.25
@@ -0,0 +1,134 @@
+import logging
+import random
+import time
+
+import pytest
+
+from src.niimbot.frame_decoder import FrameDecoder
+from src.niimbot.packet import NiimbotPacket
+
+
+def _random_packet(rng):
+    return NiimbotPacket(rng.randrange(256), bytes(rng.randrange(256) for _ in range(rng.randrange(24))))
+
+
+def _legacy_recv(buf: bytearray):
+    """기존 _recv 파싱 루프 (비교 기준, 완전한 패킷만 들어있는 스트림 전용)"""
+    packets = []
+    while len(buf) > 4:
+        pkt_len = buf[3] + 7
+        if len(buf) >= pkt_len:
+            packets.append(NiimbotPacket.from_bytes(buf[:pkt_len]))
+            del buf[:pkt_len]
+    return packets
+
+
+def _key(packets):
+    return [(p.type, bytes(p.data)) for p in packets]
+
+
+def _feed_chunks(decoder, stream, rng):
+    packets = []
+    i = 0
+    while i < len(stream):
+        n = rng.randrange(1, 64)
+        packets += decoder.feed(stream[i:i + n])
+        i += n
+    return packets
+
+
+def test_single_packet():
+    decoder = FrameDecoder()
+    packet = NiimbotPacket(0xDD, b"\x01\x02")
+    assert _key(decoder.feed(packet.to_bytes())) == [(0xDD, b"\x01\x02")]
+    assert len(decoder) == 0
+
+
+def test_partial_packet_waits():
+    """패킷 일부만 있을 때 멈추지 않고 다음 입력을 기다림"""
+    decoder = FrameDecoder()
+    raw = NiimbotPacket(0xB3, b"\x00" * 10).to_bytes()
+    assert decoder.feed(raw[:5]) == []
+    assert decoder.feed(raw[5:12]) == []
+    assert _key(decoder.feed(raw[12:])) == [(0xB3, b"\x00" * 10)]
+
+
+def test_resync_after_garbage():
+    decoder = FrameDecoder()
+    good = NiimbotPacket(0x02, b"\x01").to_bytes()
+    packets = decoder.feed(b"\x00\x13\x55\xff" + good + b"\x55\x55\x02\x01\x01\x99\xaa\xaa" + good)
+    assert _key(packets) == [(0x02, b"\x01"), (0x02, b"\x01")]
+    assert decoder.bad_frames == 1
+    assert decoder.dropped_bytes > 0
+
+
+def test_corrupt_length_does_not_block():
+    """길이 바이트가 깨진 헤더 뒤의 정상 패킷도 복구"""
+    decoder = FrameDecoder()
+    good = NiimbotPacket(0x02, b"\x01").to_bytes()
+    assert _key(decoder.feed(b"\x55\x55\x02\xf0\x01" + good)) == [(0x02, b"\x01")]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_fuzz_garbage_and_chunking(seed):
+    """무작위 쓰레기 바이트와 분할 입력 속에서 모든 정상 패킷 복구"""
+    rng = random.Random(seed)
+    expected = []
+    stream = bytearray()
+    for _ in range(200):
+        if rng.random() < 0.3:
+            stream += bytes(rng.choice((0x55, 0xAA, rng.randrange(256))) for _ in range(rng.randrange(1, 12)))
+        packet = _random_packet(rng)
+        expected.append(packet)
+        stream += packet.to_bytes()
+
+    decoder = FrameDecoder()
+    assert _key(_feed_chunks(decoder, bytes(stream), rng)) == _key(expected)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_fuzz_bit_flips(seed):
+    """비트가 깨진 패킷은 버리고 나머지는 그대로 복구"""
+    rng = random.Random(seed)
+    raws = [_random_packet(rng).to_bytes() for _ in range(200)]
+    corrupted = set(rng.sample(range(len(raws)), 20))
+    stream = bytearray()
+    for i, raw in enumerate(raws):
+        raw = bytearray(raw)
+        if i in corrupted:
+            raw[rng.randrange(2, len(raw) - 2)] ^= 1 << rng.randrange(8)
+        stream += raw
+
+    decoder = FrameDecoder()
+    packets = _key(_feed_chunks(decoder, bytes(stream), rng))
+    intact = _key(NiimbotPacket.from_bytes(r) for i, r in enumerate(raws) if i not in corrupted)
+    # 깨진 패킷이 우연히 유효해 보일 수 있으므로 정상 패킷이 순서대로 포함되는지만 확인
+    it = iter(packets)
+    assert all(p in it for p in intact)
+
+
+@pytest.mark.benchmark
+def test_decoder_throughput():
+    """대용량 캡처 스트림 파싱 속도"""
+    rng = random.Random(0)
+    stream = b"".join(_random_packet(rng).to_bytes() for _ in range(20000))
+
+    start = time.perf_counter()
+    legacy = _legacy_recv(bytearray(stream))
+    legacy_time = time.perf_counter() - start
+
+    decoder = FrameDecoder()
+    start = time.perf_counter()
+    packets = []
+    for i in range(0, len(stream), 1024):
+        packets += decoder.feed(stream[i:i + 1024])
+    decoder_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    whole = FrameDecoder().feed(stream)
+    whole_time = time.perf_counter() - start
+
+    assert _key(packets) == _key(legacy) == _key(whole)
+    mb = len(stream) / 1e6
+    logging.info(f"decode {len(packets)} packets ({mb:.2f} MB): legacy (whole stream) {mb / legacy_time:.1f} MB/s, "
+                 f"decoder (whole stream) {mb / whole_time:.1f} MB/s, decoder (1 KiB reads) {mb / decoder_time:.1f} MB/s")
@@ -0,0 +1,88 @@
+import logging
+import os
+import random
+import time
+
+import pytest
+from PIL import Image
+
+from src.niimbot.packet import FrameBuffer, NiimbotPacket, xor_checksum
+from src.niimbot.raster import pack_image
+from src.niimbot.row_encoder import encode_frame, encode_rows
+from src.qr_generator.layout import ImageLayout
+
+IMG_DIR = os.path.join(os.path.dirname(__file__), "img")
+
+
+def _legacy_to_bytes(type_, data):
+    """기존 바이트 단위 체크섬 직렬화 (비교 기준)"""
+    checksum = type_ ^ len(data)
+    for i in data:
+        checksum ^= i
+    return bytes((0x55, 0x55, type_, len(data), *data, checksum, 0xAA, 0xAA))
+
+
+@pytest.mark.parametrize("length", [0, 1, 2, 3, 7, 8, 46, 255])
+def test_xor_checksum(length):
+    rng = random.Random(length)
+    data = bytes(rng.randrange(256) for _ in range(length))
+    expected = 0x5A
+    for b in data:
+        expected ^= b
+    assert xor_checksum(data, 0x5A) == expected
+
+
+def test_to_bytes_matches_legacy():
+    rng = random.Random(1)
+    for _ in range(200):
+        data = bytes(rng.randrange(256) for _ in range(rng.randrange(60)))
+        type_ = rng.randrange(256)
+        assert NiimbotPacket(type_, data).to_bytes() == _legacy_to_bytes(type_, data)
+
+
+def test_from_bytes_round_trip():
+    packet = NiimbotPacket(0xDD, b"\x01\x02\x03")
+    decoded = NiimbotPacket.from_bytes(packet.to_bytes())
+    assert (decoded.type, decoded.data) == (0xDD, b"\x01\x02\x03")
+
+
+def test_packet_slots():
+    with pytest.raises(AttributeError):
+        NiimbotPacket(1, b"").extra = 1
+
+
+def test_frame_buffer_append():
+    frame = FrameBuffer(64)
+    frame.append(NiimbotPacket(1, b"\x01"))
+    frame.append(NiimbotPacket(2, b""))
+    assert bytes(frame.view()) == NiimbotPacket(1, b"\x01").to_bytes() + NiimbotPacket(2, b"").to_bytes()
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_encode_frame_matches_packets(compress):
+    """프레임 버퍼는 행 패킷을 이어 붙인 것과 동일"""
+    packed = pack_image(ImageLayout.create_qr_image("test_laundry_123.1", "테스트 1"))
+    expected = b"".join(pkt.to_bytes() for pkt in encode_rows(packed, compress))
+    assert bytes(encode_frame(packed, compress)) == expected
+
+
+@pytest.mark.benchmark
+def test_encode_frame_benchmark():
+    """행별 패킷 직렬화와 프레임 버퍼 비교"""
+    packed = pack_image(Image.open(os.path.join(IMG_DIR, "test_print.png")))
+    rounds = 20
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        writes = [_legacy_to_bytes(pkt.type, pkt.data) for pkt in encode_rows(packed)]
+    legacy = (time.perf_counter() - start) / rounds
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        frame = encode_frame(packed)
+    framed = (time.perf_counter() - start) / rounds
+
+    assert bytes(frame) == b"".join(writes)
+    logging.info(f"serialize 320x240 frame: per-packet {legacy * 1000:.2f} ms ({len(writes)} writes), "
+                 f"frame buffer {framed * 1000:.2f} ms (1 write, {legacy / framed:.1f}x)")
+    assert framed < legacy
@@ -0,0 +1,149 @@
+import logging
+
+import pytest
+from PIL import Image
+
+from src.niimbot.async_niimbot_printer import AsyncNiimbotPrint
+from src.niimbot.enum import RequestCodeEnum
+from src.niimbot import printer_session
+from src.niimbot.niimbot_printer import NiimbotPrint, PrintJobError
+from tests.niimbot.emulator import FakeAsyncPrinterTransport, FakePrinterTransport
+
+
+def _images(count):
+    return [Image.new("RGB", (320, 240), "white") for _ in range(count)]
+
+
+@pytest.fixture
+def transport():
+    return FakePrinterTransport(print_time=0.01)
+
+
+@pytest.fixture
+def printer(transport):
+    printer = NiimbotPrint(transport=transport)
+    yield printer
+    printer.close()
+
+
+def test_print_pages_single_session(printer, transport):
+    """여러 장을 하나의 START_PRINT/END_PRINT 세션으로 출력"""
+    done = []
+    assert printer.print_pages(_images(3), on_page=done.append) == [0, 1, 2]
+
+    assert done == [0, 1, 2]
+    assert transport.pages_printed == 3
+    assert transport.commands.count(RequestCodeEnum.START_PRINT) == 1
+    assert transport.commands.count(RequestCodeEnum.END_PRINT) == 1
+    assert transport.commands.count(RequestCodeEnum.START_PAGE_PRINT) == 3
+
+
+def test_print_pages_reports_completed_on_failure(printer, transport):
+    """중간에 실패하면 출력된 페이지 목록을 알려줌"""
+    def on_page(index):
+        if index == 1:
+            transport.enabled = False
+
+    with pytest.raises(PrintJobError) as exc_info:
+        printer.print_pages(_images(4), on_page=on_page)
+
+    assert exc_info.value.completed_pages == [0, 1]
+    assert transport.commands[-1] == RequestCodeEnum.END_PRINT
+
+
+def test_print_pages_round_trips(transport):
+    """장당 세션 대비 명령 왕복 횟수 비교"""
+    printer = NiimbotPrint(transport=transport)
+    try:
+        start = len(transport.commands)
+        for image in _images(5):
+            printer.print_image(image)
+        per_label = len(transport.commands) - start
+
+        start = len(transport.commands)
+        printer.print_pages(_images(5))
+        session = len(transport.commands) - start
+    finally:
+        printer.close()
+
+    logging.info(f"commands for 5 labels: per-label sessions {per_label}, single session {session}")
+    assert session < per_label
+
+
+def test_copies_use_printer_quantity(printer, transport):
+    """같은 라벨 여러 장은 이미지를 한 번만 보내고 프린터가 반복 출력"""
+    progress = []
+    printer.print_pages(_images(1), copies=3, on_copy=lambda index, done: progress.append((index, done)))
+
+    assert transport.rows == 240
+    assert transport.pages_printed == 3
+    assert progress[-1] == (0, 3)
+    assert RequestCodeEnum.SET_QUANTITY in transport.commands
+
+
+def test_copies_fallback_when_quantity_ignored(printer, transport, monkeypatch):
+    """수량 명령을 무시하는 모델은 남은 매수를 다시 전송"""
+    monkeypatch.setattr(printer_session, "QUANTITY_STALL_TIMEOUT", 0.05)
+    transport.supports_quantity = False
+
+    printer.print_pages(_images(2), copies=3)
+
+    assert transport.pages_printed == 6
+    assert transport.rows == 240 * 6
+    # 한 번 감지한 뒤에는 수량 명령을 다시 보내지 않음
+    assert transport.commands.count(RequestCodeEnum.SET_QUANTITY) == 1
+
+
+def test_copies_fallback_when_quantity_rejected(printer, transport):
+    transport.silent.add(RequestCodeEnum.SET_QUANTITY)
+
+    printer.print_image(_images(1)[0], copies=2)
+
+    assert transport.pages_printed == 2
+    assert transport.rows == 480
+
+
+def test_many_copies_outlast_page_timeout(printer, transport, monkeypatch):
+    """전체 매수 출력 시간이 제한 시간보다 길어도 진행 중이면 실패하지 않음"""
+    monkeypatch.setattr(printer_session, "PAGE_TIMEOUT", 0.3)
+    transport.print_time = 0.02
+    progress = []
+
+    assert printer.print_pages(_images(1), copies=40, on_copy=lambda index, done: progress.append(done)) == [0]
+
+    assert transport.pages_printed == 40
+    assert progress[-1] == 40
+    assert transport.rows == 240
+
+
+def test_stalled_printer_times_out(printer, transport, monkeypatch):
+    monkeypatch.setattr(printer_session, "PAGE_TIMEOUT", 0.3)
+    transport.print_time = 10
+
+    with pytest.raises(PrintJobError, match="timeout") as exc_info:
+        printer.print_pages(_images(2))
+    assert exc_info.value.completed_pages == []
+
+
+@pytest.mark.asyncio
+async def test_async_print_pages():
+    transport = FakeAsyncPrinterTransport(FakePrinterTransport(print_time=0.01, read_timeout=0.05))
+    printer = await AsyncNiimbotPrint(transport=transport).connect()
+    try:
+        assert await printer.print_pages(iter(_images(3)), copies=2) == [0, 1, 2]
+        assert transport.printer.pages_printed == 6
+        assert transport.printer.rows == 240 * 3
+    finally:
+        printer.close()
+
+
+@pytest.mark.asyncio
+async def test_async_many_copies_outlast_page_timeout(monkeypatch):
+    monkeypatch.setattr(printer_session, "PAGE_TIMEOUT", 0.3)
+    transport = FakeAsyncPrinterTransport(FakePrinterTransport(print_time=0.02, read_timeout=0.05))
+    printer = await AsyncNiimbotPrint(transport=transport).connect()
+    try:
+        assert await printer.print_pages(_images(1), copies=40) == [0]
+        assert transport.printer.pages_printed == 40
+    finally:
+        printer.close()
@@ -0,0 +1,89 @@
+import time
+
+import pytest
+from PIL import Image
+
+from src.niimbot.enum import RequestCodeEnum
+from src.niimbot.niimbot_printer import NiimbotPrint
+from src.niimbot.printer_state import PrinterState, PrinterStateCache
+from tests.niimbot.emulator import FakePrinterTransport
+
+
+def _status_commands(transport, start=0):
+    commands = transport.commands[start:]
+    return commands.count(RequestCodeEnum.HEARTBEAT) + commands.count(RequestCodeEnum.GET_PRINT_STATUS)
+
+
+@pytest.fixture
+def transport():
+    return FakePrinterTransport(print_time=0.01)
+
+
+def test_state_updates_from_passing_responses(transport):
+    """응답이 지나가기만 해도 상태가 갱신됨"""
+    printer = NiimbotPrint(transport=transport)
+    try:
+        assert printer.state.heartbeat_at is None
+        printer.heartbeat()
+        printer.get_print_status()
+
+        state = printer.state
+        assert state.powerlevel == 4
+        assert state.closingstate == 0
+        assert state.is_enabled is True
+        assert state.age() < 1
+    finally:
+        printer.close()
+
+
+def test_fresh_state_skips_status_queries(transport):
+    """유효 시간 안에서는 라벨마다 상태를 다시 묻지 않음"""
+    image = Image.new("RGB", (320, 240), "white")
+    uncached = NiimbotPrint(transport=transport, state_max_age=0)
+    try:
+        start = len(transport.commands)
+        for _ in range(3):
+            uncached.print_image(image)
+        without_cache = _status_commands(transport, start)
+    finally:
+        uncached.close()
+
+    cached = NiimbotPrint(transport=transport, state_max_age=5)
+    try:
+        start = len(transport.commands)
+        for _ in range(3):
+            cached.print_image(image)
+        with_cache = _status_commands(transport, start)
+    finally:
+        cached.close()
+
+    assert with_cache < without_cache
+
+
+def test_stale_state_is_probed_again(transport):
+    printer = NiimbotPrint(transport=transport, state_max_age=0.05)
+    try:
+        assert printer.check_printer_status() is True
+        transport.closingstate = 1
+        # 아직 유효한 상태는 그대로 사용
+        assert printer.check_printer_status() is True
+
+        time.sleep(0.1)
+        with pytest.raises(Exception, match="cover is open"):
+            printer.check_printer_status()
+    finally:
+        printer.close()
+
+
+def test_invalidate_clears_snapshot():
+    cache = PrinterStateCache()
+    cache._state.heartbeat_at = cache._state.status_at = time.monotonic()
+    assert cache.is_fresh()
+
+    cache.invalidate()
+    assert not cache.is_fresh()
+    assert not cache.heartbeat_fresh()
+
+
+def test_state_has_no_instance_dict():
+    assert not hasattr(PrinterState(), "__dict__")
@@ -0,0 +1,95 @@
+import logging
+import math
+import os
+import random
+import struct
+import time
+
+import pytest
+from PIL import Image, ImageOps
+
+from src.niimbot.niimbot_printer import _encode_image
+from src.niimbot.packet import NiimbotPacket
+from src.niimbot.raster import PackedImage, pack_image, pack_bitmap
+
+IMG_DIR = os.path.join(os.path.dirname(__file__), "img")
+
+
+def _legacy_encode_image(image: Image.Image):
+    """기존 getpixel 기반 인코더 (비교 기준)"""
+    img = ImageOps.invert(image.convert("L")).convert("1")
+    for y in range(img.height):
+        line_data = [img.getpixel((x, y)) for x in range(img.width)]
+        line_data = "".join("0" if pix == 0 else "1" for pix in line_data)
+        line_data = int(line_data, 2).to_bytes(math.ceil(img.width / 8), "big")
+        header = struct.pack(">H3BB", y, 0, 0, 0, 1)
+        yield NiimbotPacket(0x85, header + line_data)
+
+
+def _random_image(width, height, seed=0):
+    rng = random.Random(seed)
+    image = Image.new("L", (width, height), 255)
+    image.putdata([rng.choice((0, 255, rng.randrange(256))) for _ in range(width * height)])
+    return image
+
+
+def _packets(encoder, image):
+    return [(pkt.type, bytes(pkt.data)) for pkt in encoder(image)]
+
+
+@pytest.mark.parametrize("name", ["test_print.png"])
+def test_encode_image_parity_with_legacy(name):
+    """실제 라벨 이미지에서 기존 인코더와 동일한 패킷 생성"""
+    image = Image.open(os.path.join(IMG_DIR, name))
+    assert _packets(_encode_image, image) == _packets(_legacy_encode_image, image)
+
+
+@pytest.mark.parametrize("size", [(320, 240), (96, 10), (13, 7), (1, 3), (201, 5)])
+def test_encode_image_parity_random(size):
+    """폭이 8의 배수가 아닌 경우를 포함한 무작위 이미지 비교"""
+    image = _random_image(*size, seed=size[0])
+    assert _packets(_encode_image, image) == _packets(_legacy_encode_image, image)
+
+
+def test_pack_image_layout():
+    image = Image.new("L", (10, 2), 255)
+    image.putpixel((0, 0), 0)
+    image.putpixel((9, 1), 0)
+    packed = pack_image(image)
+
+    assert packed.row_bytes == 2
+    # 10px 행은 오른쪽 정렬: 앞 6비트는 패딩
+    assert packed.row(0) == b"\x02\x00"
+    assert packed.row(1) == b"\x00\x01"
+    assert list(packed.rows()) == [packed.row(0), packed.row(1)]
+
+
+def test_pack_bitmap_rejects_non_bitmap():
+    with pytest.raises(ValueError):
+        pack_bitmap(Image.new("L", (8, 8)))
+
+
+def test_packed_image_size_check():
+    with pytest.raises(ValueError):
+        PackedImage(16, 2, b"\x00" * 3)
+
+
+@pytest.mark.benchmark
+def test_encode_image_benchmark():
+    """320x240 라벨 인코딩 속도 비교"""
+    image = Image.open(os.path.join(IMG_DIR, "test_print.png")).convert("RGB")
+    rounds = 5
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        list(_legacy_encode_image(image))
+    legacy = (time.perf_counter() - start) / rounds
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        list(_encode_image(image))
+    packed = (time.perf_counter() - start) / rounds
+
+    logging.info(f"encode 320x240: legacy {legacy * 1000:.2f} ms, packed {packed * 1000:.2f} ms "
+                 f"({legacy / packed:.1f}x)")
+    assert packed < legacy
@@ -0,0 +1,119 @@
+import logging
+import os
+import time
+
+import pytest
+from PIL import Image, ImageChops, ImageOps
+
+from src.niimbot.niimbot_printer import NiimbotPrint
+from src.niimbot.raster import (BAYER, FLOYD_STEINBERG, OTSU, RASTER_MODES, THRESHOLD, binarize,
+                                otsu_threshold, pack_bitmap, pack_image)
+from src.qr_generator.layout import ImageLayout
+from tests.niimbot.emulator import FakePrinterTransport
+
+IMG_DIR = os.path.join(os.path.dirname(__file__), "img")
+GOLDEN_DIR = os.path.join(IMG_DIR, "golden")
+
+
+def _inputs():
+    return {
+        "test_print": Image.open(os.path.join(IMG_DIR, "test_print.png")).convert("L"),
+        "gradient": Image.linear_gradient("L"),  # 위에서 아래로 0 -> 255
+    }
+
+
+def _burned(bitmap):
+    return sum(1 for value in bitmap.getdata() if value)
+
+
+@pytest.mark.parametrize("mode", RASTER_MODES)
+@pytest.mark.parametrize("name", ["test_print", "gradient"])
+def test_matches_golden_image(name, mode):
+    """모드별 변환 결과가 저장된 기준 이미지와 픽셀 단위로 일치"""
+    bitmap = binarize(_inputs()[name], mode)
+    golden = Image.open(os.path.join(GOLDEN_DIR, f"{name}_{mode}.png")).convert("1")
+
+    assert bitmap.mode == "1"
+    assert ImageChops.logical_xor(bitmap, golden).getbbox() is None
+
+
+def test_threshold_is_exact():
+    gray = Image.frombytes("L", (256, 1), bytes(range(256)))
+    assert list(binarize(gray, THRESHOLD).getdata()) == [255] * 128 + [0] * 128
+    assert list(binarize(gray, THRESHOLD, threshold=10).getdata()) == [255] * 10 + [0] * 246
+
+
+def test_otsu_splits_bimodal_histogram():
+    """두 밝기 사이의 임계값을 골라 노이즈가 있어도 두 영역으로 나눔"""
+    gray = Image.new("L", (100, 10), 200)
+    gray.paste(40, (0, 0, 50, 10))
+    gray.paste(70, (0, 0, 10, 1))
+    gray.paste(170, (90, 9, 100, 10))
+
+    assert 70 < otsu_threshold(gray) <= 170
+    bitmap = binarize(gray, OTSU)
+    assert bitmap.crop((0, 0, 50, 10)).getextrema() == (255, 255)
+    assert bitmap.crop((50, 0, 100, 10)).getextrema() == (0, 0)
+
+
+@pytest.mark.parametrize("level", [0, 32, 64, 128, 192, 255])
+def test_bayer_density_tracks_gray_level(level):
+    """8x8 블록의 출력 비율이 밝기에 비례"""
+    bitmap = binarize(Image.new("L", (64, 64), level), BAYER)
+    expected = 1 - level / 255
+    assert abs(_burned(bitmap) / (64 * 64) - expected) <= 1 / 64 + 1e-9
+
+
+def test_floyd_steinberg_matches_legacy_conversion():
+    image = _inputs()["test_print"]
+    legacy = ImageOps.invert(image).convert("1")
+    assert ImageChops.logical_xor(binarize(image, FLOYD_STEINBERG), legacy).getbbox() is None
+
+
+def test_unknown_mode():
+    with pytest.raises(ValueError):
+        binarize(Image.new("L", (8, 8)), "halftone")
+
+
+def test_label_text_mode_per_job():
+    """라벨마다 글자 가장자리 처리 방식을 고를 수 있음 (QR 영역은 동일)"""
+    default = ImageLayout.create_label_bitmap("1.1", "가나다")
+    threshold = ImageLayout.create_label_bitmap("1.1", "가나다", THRESHOLD)
+    dithered = ImageLayout.create_label_bitmap("1.1", "가나다", FLOYD_STEINBERG)
+
+    assert ImageChops.logical_xor(default, threshold).getbbox() is None
+    difference = ImageChops.logical_xor(threshold, dithered).getbbox()
+    assert difference is not None and difference[1] >= 160
+
+
+def test_printer_raster_mode():
+    image = _inputs()["test_print"].convert("RGB")
+    transport = FakePrinterTransport(print_time=0.01)
+    printer = NiimbotPrint(transport=transport, rows_per_second=24000, raster_mode=THRESHOLD)
+    try:
+        printer.print_image(image)
+        printer.print_image(image, raster_mode=BAYER)
+    finally:
+        printer.close()
+    assert transport.pages_printed == 2
+    assert pack_image(image, THRESHOLD).data == pack_bitmap(binarize(image.convert("L"), THRESHOLD)).data
+
+
+@pytest.mark.benchmark
+def test_raster_mode_benchmark():
+    """320x240 프레임 한 장 변환 시간 (Floyd–Steinberg 대비)"""
+    image = _inputs()["test_print"]
+    repeat = 200
+    timings = {}
+    for mode in RASTER_MODES:
+        binarize(image, mode)  # Bayer 타일 등 준비 작업 제외
+        start = time.perf_counter()
+        for _ in range(repeat):
+            binarize(image, mode)
+        timings[mode] = (time.perf_counter() - start) / repeat
+
+    base = timings[FLOYD_STEINBERG]
+    logging.info("320x240 binarize: " + ", ".join(
+        f"{mode} {seconds * 1e6:.0f}us ({base / seconds:.1f}x)" for mode, seconds in timings.items()))
+    assert timings[THRESHOLD] < base
+    assert timings[BAYER] < base
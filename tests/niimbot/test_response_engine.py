@@ -0,0 +1,143 @@
+import logging
+import time
+
+import pytest
+from PIL import Image
+
+from src.niimbot.enum import InfoEnum, RequestCodeEnum
+from src.niimbot.frame_decoder import FrameDecoder
+from src.niimbot.niimbot_printer import NiimbotPrint
+from src.niimbot.packet import NiimbotPacket
+from src.niimbot.response_engine import ResponseEngine, RttEstimator
+from tests.niimbot.emulator import FakePrinterTransport
+
+
+@pytest.fixture
+def transport():
+    return FakePrinterTransport()
+
+
+@pytest.fixture
+def engine(transport):
+    engine = ResponseEngine(transport)
+    engine.start()
+    yield engine
+    engine.stop()
+
+
+@pytest.fixture
+def printer(transport):
+    printer = NiimbotPrint(transport=transport)
+    yield printer
+    printer.close()
+
+
+def test_request_response(engine):
+    packet = engine.request(RequestCodeEnum.HEARTBEAT, b"\x01", RequestCodeEnum.HEARTBEAT + 1)
+    assert packet.type == RequestCodeEnum.HEARTBEAT + 1
+
+
+def test_pipelined_requests_single_write(engine, transport):
+    """여러 요청을 한 번에 쓰고 응답을 순서대로 받음"""
+    heartbeat, status = engine.request_many([
+        (RequestCodeEnum.HEARTBEAT, b"\x01", RequestCodeEnum.HEARTBEAT + 1),
+        (RequestCodeEnum.GET_PRINT_STATUS, b"\x01", RequestCodeEnum.GET_PRINT_STATUS + 16),
+    ])
+    assert heartbeat.type == RequestCodeEnum.HEARTBEAT + 1
+    assert status.type == RequestCodeEnum.GET_PRINT_STATUS + 16
+    assert transport.writes == 1
+
+
+def test_missing_response_times_out(engine, transport):
+    transport.silent.add(RequestCodeEnum.HEARTBEAT)
+    start = time.monotonic()
+    assert engine.request(RequestCodeEnum.HEARTBEAT, b"\x01", RequestCodeEnum.HEARTBEAT + 1, timeout=0.05) is None
+    assert time.monotonic() - start < 0.5
+
+
+def test_error_response_raises(engine, transport):
+    # 프린터가 명령 대신 0xDB 로 응답하는 상황
+    transport.silent.add(RequestCodeEnum.START_PRINT)
+    transport._reply(219, b"\x00")
+    with pytest.raises(ValueError):
+        engine.request(RequestCodeEnum.START_PRINT, b"\x01", RequestCodeEnum.START_PRINT + 1, timeout=0.5)
+
+
+def test_adaptive_timeout():
+    rtt = RttEstimator(initial=1.0, min_timeout=0.01)
+    assert rtt.timeout == 1.0
+    for _ in range(20):
+        rtt.observe(0.005)
+    assert rtt.timeout < 0.05
+    rtt.observe(0.2)
+    assert rtt.timeout > 0.05
+    # 기본 하한은 1초 (RFC 6298)
+    fast = RttEstimator()
+    for _ in range(20):
+        fast.observe(0.005)
+    assert fast.timeout == 1.0
+
+
+def test_printer_commands(printer):
+    assert printer.heartbeat()["closingstate"] == 0
+    assert printer.get_print_status()["isEnabled"] is True
+    assert printer.get_info(InfoEnum.SOFTVERSION) == 1.05
+    assert printer.check_printer_status() is True
+
+
+def test_printer_print_image(printer, transport):
+    printer.print_image(Image.new("RGB", (320, 240), "white"))
+    assert transport.rows == 240
+    assert transport.pages_printed == 1
+
+
+def _legacy_transceiver(transport, reqcode, data, respcode):
+    """기존 고정 대기 폴링 방식 (비교 기준)"""
+    decoder = FrameDecoder()
+    transport.write(NiimbotPacket(reqcode, data).to_bytes())
+    for _ in range(6):
+        for packet in decoder.feed(transport.read(1024)):
+            if packet.type == respcode:
+                return packet
+        time.sleep(0.1)
+    return None
+
+
+@pytest.mark.benchmark
+def test_command_latency_benchmark():
+    """고정 대기 폴링 대비 명령 지연 시간"""
+    transport = FakePrinterTransport(latency=0.005, read_timeout=0.5)
+    rounds = 5
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        assert _legacy_transceiver(transport, RequestCodeEnum.HEARTBEAT, b"\x01", RequestCodeEnum.HEARTBEAT + 1)
+    legacy = (time.perf_counter() - start) / rounds
+
+    engine = ResponseEngine(transport)
+    engine.start()
+    try:
+        start = time.perf_counter()
+        for _ in range(rounds * 10):
+            assert engine.request(RequestCodeEnum.HEARTBEAT, b"\x01", RequestCodeEnum.HEARTBEAT + 1)
+        event = (time.perf_counter() - start) / (rounds * 10)
+    finally:
+        engine.stop()
+
+    logging.info(f"heartbeat latency (wire RTT 5 ms): polling {legacy * 1000:.1f} ms, "
+                 f"event-driven {event * 1000:.1f} ms")
+    assert event < legacy / 10
+
+
+def test_missing_command_response_raises_timeout(printer, transport):
+    transport.silent.add(RequestCodeEnum.START_PRINT)
+    with pytest.raises(TimeoutError, match="No response"):
+        printer.start_print()
+
+
+def test_unresponsive_printer_fails_to_initialize():
+    """초기화 중 응답이 없으면 AttributeError 대신 TimeoutError"""
+    transport = FakePrinterTransport()
+    transport.silent.add(RequestCodeEnum.SET_LABEL_DENSITY)
+    with pytest.raises(TimeoutError, match="No response"):
+        NiimbotPrint(transport=transport)
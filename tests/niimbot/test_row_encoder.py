@@ -0,0 +1,91 @@
+import logging
+import struct
+
+import pytest
+from PIL import Image
+
+from src.niimbot.enum import RequestCodeEnum
+from src.niimbot.raster import PackedImage, pack_image
+from src.niimbot.row_encoder import count_pixels, encode_row, encode_rows
+from src.qr_generator.layout import ImageLayout
+
+
+def _decode_rows(packets, height, row_bytes):
+    """패킷을 프린터처럼 해석해 행 목록으로 복원"""
+    rows = [None] * height
+    for pkt in packets:
+        data = bytes(pkt.data)
+        if pkt.type == RequestCodeEnum.PRINT_EMPTY_ROW:
+            y, repeat = struct.unpack(">HB", data)
+            row = bytes(row_bytes)
+        else:
+            y, _, _, _, repeat = struct.unpack(">H3BB", data[:6])
+            if pkt.type == RequestCodeEnum.PRINT_BITMAP_ROW:
+                row = data[6:]
+            else:
+                assert pkt.type == RequestCodeEnum.PRINT_BITMAP_ROW_INDEXED
+                bits = 0
+                for x in struct.unpack(f">{(len(data) - 6) // 2}H", data[6:]):
+                    bits |= 1 << (row_bytes * 8 - 1 - x)
+                row = bits.to_bytes(row_bytes, "big")
+        for i in range(repeat):
+            assert rows[y + i] is None
+            rows[y + i] = row
+    return rows
+
+
+def _wire_size(packets):
+    return sum(len(pkt.to_bytes()) for pkt in packets)
+
+
+@pytest.fixture
+def qr_label():
+    return pack_image(ImageLayout.create_qr_image("test_laundry_123.1", "테스트 1"))
+
+
+def test_compressed_round_trip(qr_label):
+    """압축 패킷을 복원하면 원래 행과 동일"""
+    packets = list(encode_rows(qr_label, compress=True))
+    assert _decode_rows(packets, qr_label.height, qr_label.row_bytes) == list(qr_label.rows())
+
+
+def test_compressed_uses_all_packet_types(qr_label):
+    types = {pkt.type for pkt in encode_rows(qr_label, compress=True)}
+    assert RequestCodeEnum.PRINT_EMPTY_ROW in types
+    assert RequestCodeEnum.PRINT_BITMAP_ROW in types
+
+
+def test_compressed_reduces_wire_bytes(qr_label):
+    plain = _wire_size(encode_rows(qr_label))
+    compressed = _wire_size(encode_rows(qr_label, compress=True))
+    logging.info(f"QR label wire size: plain {plain} B, compressed {compressed} B ({plain / compressed:.1f}x)")
+    assert compressed * 2 < plain
+
+
+def test_plain_mode_unchanged(qr_label):
+    packets = list(encode_rows(qr_label))
+    assert len(packets) == qr_label.height
+    assert all(pkt.type == RequestCodeEnum.PRINT_BITMAP_ROW for pkt in packets)
+    assert bytes(packets[0].data[2:6]) == b"\x00\x00\x00\x01"
+
+
+def test_repeat_capped():
+    packed = PackedImage(8, 600, b"\xff" * 600)
+    packets = list(encode_rows(packed, compress=True))
+    assert [pkt.data[5] for pkt in packets] == [255, 255, 90]
+    assert _decode_rows(packets, 600, 1) == [b"\xff"] * 600
+
+
+def test_indexed_row():
+    row = bytes(40)
+    row = row[:5] + b"\x80" + row[6:]  # x = 40
+    pkt = encode_row(7, row)
+    assert pkt.type == RequestCodeEnum.PRINT_BITMAP_ROW_INDEXED
+    assert bytes(pkt.data) == struct.pack(">H3BBH", 7, 1, 0, 0, 1, 40)
+
+
+def test_count_pixels():
+    row = b"\xff" * 10 + b"\x01" * 10 + b"\x00" * 10
+    assert count_pixels(row) == (80, 10, 0)
+    # 구간 합이 255를 넘으면 전체 개수를 2바이트로 보냄
+    assert count_pixels(b"\xff" * 120) == (0, 960 >> 8, 960 & 0xFF)
@@ -1,7 +1,10 @@
+from types import SimpleNamespace
+
 import pytest
 import serial
 
-from src.niimbot.serial_transport import SerialTransport
+from src.niimbot import serial_transport
+from src.niimbot.serial_transport import SerialTransport, detect_ports
 
 
 @pytest.mark.serial
@@ -18,3 +21,15 @@ def test_serial_transport():
     # Test invalid port
     with pytest.raises(serial.SerialException):
         SerialTransport(port="INVALID_PORT")
+
+
+def test_detect_ports_skips_onboard_uarts(monkeypatch):
+    """라즈베리파이의 ttyAMA0, ttyS0 처럼 USB 가 아닌 포트는 제외"""
+    ports = [SimpleNamespace(device="/dev/ttyAMA0", vid=None), SimpleNamespace(device="/dev/ttyS0", vid=None),
+             SimpleNamespace(device="/dev/ttyACM0", vid=0x3513), SimpleNamespace(device="/dev/ttyACM1", vid=0x3513)]
+    monkeypatch.setattr(serial_transport, "comports", lambda: ports)
+    assert detect_ports() == ["/dev/ttyACM0", "/dev/ttyACM1"]
+
+    monkeypatch.setattr(serial_transport, "comports", lambda: ports[:2])
+    with pytest.raises(RuntimeError, match="No USB serial ports"):
+        detect_ports()
@@ -0,0 +1,114 @@
+import json
+import logging
+import os
+import subprocess
+import sys
+
+import pytest
+from PIL import ImageChops
+
+from src.niimbot.niimbot_printer import NiimbotPrint
+from src.niimbot.raster import as_packed, pack_bitmap, pack_image
+from src.qr_generator.config import ImageConfig
+from src.qr_generator.layout import ImageLayout
+from tests.niimbot.emulator import FakePrinterTransport
+
+
+def test_bitmap_matches_rgb_layout_qr():
+    """1비트 경로의 QR 영역은 기존 RGB 경로와 같은 점을 찍음"""
+    bitmap = ImageLayout.create_label_bitmap("123.1", "홍길동 1")
+    legacy = ImageLayout.create_qr_image("123.1", "홍길동 1")
+
+    assert bitmap.mode == "1"
+    assert bitmap.size == (ImageConfig.WIDTH, ImageConfig.HEIGHT)
+
+    size = ImageConfig.get_qr_height()
+    left = (ImageConfig.WIDTH - size) // 2
+    # 글자와 겹치지 않는 QR 영역 비교
+    box = (left, 0, left + size, 160)
+    legacy_burn = ImageChops.invert(legacy.convert("L")).convert("1").crop(box)
+    assert ImageChops.difference(bitmap.crop(box).convert("L"), legacy_burn.convert("L")).getbbox() is None
+
+    text_area = bitmap.crop((0, 180, ImageConfig.WIDTH, ImageConfig.HEIGHT))
+    assert text_area.getbbox() is not None
+
+
+def test_text_edges_are_not_dithered():
+    """글자 가장자리는 디더링 없이 임계값으로 처리"""
+    bitmap = ImageLayout.create_label_bitmap("1.1", "가나다")
+    legacy = pack_image(ImageLayout.create_qr_image("1.1", "가나다"))
+    packed = pack_bitmap(bitmap)
+    assert packed.data != legacy.data
+
+
+def test_print_bitmap_skips_conversion():
+    transport = FakePrinterTransport(print_time=0.01)
+    printer = NiimbotPrint(transport=transport, rows_per_second=24000)
+    try:
+        packed = pack_bitmap(ImageLayout.create_label_bitmap("123.1", "홍길동 1"))
+        assert as_packed(packed) is packed
+        printer.print_bitmap(packed, copies=2)
+        printer.print_bitmap(ImageLayout.create_label_bitmap("123.2", "홍길동 2"))
+    finally:
+        printer.close()
+
+    assert transport.pages_printed == 3
+    assert transport.rows == ImageConfig.HEIGHT * 2
+
+
+_MEASURE = r"""
+import json, sys, time
+from src.niimbot.raster import pack_bitmap, pack_image
+from src.qr_generator.layout import ImageLayout
+
+path, count = sys.argv[1], int(sys.argv[2])
+
+# 이름은 고정해 텍스트 캐시가 커지는 만큼은 측정에서 제외
+def render(number):
+    if path == "rgb":
+        return pack_image(ImageLayout.create_qr_image(f"123.{number}", "홍길동"))
+    return pack_bitmap(ImageLayout.create_label_bitmap(f"123.{number}", "홍길동"))
+
+def status():
+    fields = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            fields[key] = value.split()[0] if value.split() else None
+    return int(fields["VmHWM"]), int(fields["VmRSS"])
+
+render(0)  # 폰트 로딩 등 초기화 제외
+with open("/proc/self/clear_refs", "w") as f:
+    f.write("5")  # 최대 RSS 초기화
+_, baseline = status()
+start = time.process_time()
+for number in range(1, count + 1):
+    render(number)
+cpu = (time.process_time() - start) / count
+peak, _ = status()
+print(json.dumps({"cpu_ms": cpu * 1000, "peak_kb": peak - baseline}))
+"""
+
+
+def _measure(path, count=200):
+    # 큰 버퍼를 mmap 으로 할당해 프레임 크기가 RSS 에 드러나도록 함
+    env = dict(os.environ, MALLOC_MMAP_THRESHOLD_="16384")
+    result = subprocess.run([sys.executable, "-c", _MEASURE, path, str(count)], env=env,
+                            capture_output=True, text=True, cwd=os.getcwd())
+    if result.returncode != 0:
+        pytest.skip(f"Measurement not available: {result.stderr.strip().splitlines()[-1]}")
+    return json.loads(result.stdout)
+
+
+@pytest.mark.benchmark
+def test_bitmap_path_cpu_and_memory():
+    """라벨당 CPU 시간과 최대 메모리 (RGB 경로 vs 1비트 경로)"""
+    # 전체 테스트 중에는 CPU 시간이 흔들리므로 세 번 재서 가장 작은 값을 사용
+    runs = {path: [_measure(path) for _ in range(3)] for path in ("rgb", "bitmap")}
+    rgb, bitmap = ({key: min(run[key] for run in runs[path]) for key in ("cpu_ms", "peak_kb")}
+                   for path in ("rgb", "bitmap"))
+
+    logging.info(f"per label: RGB path {rgb['cpu_ms']:.2f}ms CPU, +{rgb['peak_kb']}KB peak RSS; "
+                 f"1-bit path {bitmap['cpu_ms']:.2f}ms CPU, +{bitmap['peak_kb']}KB peak RSS")
+    # CPU 차이는 측정 오차 안에 있어 기록만 하고, 메모리만 비교
+    assert bitmap["peak_kb"] <= rgb["peak_kb"]
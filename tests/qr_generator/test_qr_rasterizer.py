@@ -0,0 +1,145 @@
+import logging
+import time
+
+import pytest
+import qrcode
+from PIL import Image
+
+from src.niimbot.raster import pack_image
+from src.qr_generator.config import ImageConfig
+from src.qr_generator.layout import ImageLayout
+from src.qr_generator.qr_drawer import QRDrawer, qr_matrix, rasterize_matrix
+
+DATA = ["123.1", "98765.12", "https://example.com/laundry/123", "x" * 40]
+
+
+def _reference_matrix(data, mask_pattern=None):
+    qr = qrcode.QRCode(version=1, error_correction=qrcode.constants.ERROR_CORRECT_L, border=4,
+                       mask_pattern=mask_pattern)
+    qr.add_data(data)
+    qr.make(fit=True)
+    return qr.get_matrix()
+
+
+def _read_modules(pixel, size, modules):
+    """모듈 중심 픽셀을 읽어 행렬로 복원 (pixel(x, y) 가 True 면 검은 모듈)"""
+    box = size // modules
+    offset = (size - modules * box) // 2
+    return [[pixel(offset + col * box + box // 2, offset + row * box + box // 2) for col in range(modules)]
+            for row in range(modules)]
+
+
+@pytest.mark.parametrize("data", DATA)
+def test_decoded_modules_match_matrix(data):
+    """모듈 중심을 다시 읽으면 원래 QR 행렬과 일치"""
+    size = ImageConfig.get_qr_height()
+    matrix = _reference_matrix(data)
+    image = QRDrawer(data).draw()
+
+    assert image.mode == "1"
+    assert image.size == (size, size)
+    assert _read_modules(lambda x, y: image.getpixel((x, y)) == 0, size, len(matrix)) == matrix
+
+
+@pytest.mark.parametrize("data", DATA)
+def test_modules_are_sharp(data):
+    """각 모듈 영역은 한 가지 색으로만 채워짐 (번짐 없음)"""
+    size = ImageConfig.get_qr_height()
+    matrix = qr_matrix(data)
+    image = rasterize_matrix(matrix, size)
+    modules = len(matrix)
+    box = size // modules
+    offset = (size - modules * box) // 2
+
+    for row in range(modules):
+        for col in range(modules):
+            x, y = offset + col * box, offset + row * box
+            assert image.crop((x, y, x + box, y + box)).getextrema() in ((0, 0), (255, 255))
+
+
+def test_printed_frame_carries_the_code():
+    """라벨을 프린터 프레임으로 변환해도 QR 모듈이 그대로 남음"""
+    data = "123.4"
+    packed = pack_image(ImageLayout.create_qr_image(data, "홍길동 4"))
+    size = ImageConfig.get_qr_height()
+    left = (ImageConfig.WIDTH - size) // 2
+
+    def burned(x, y):
+        x += left
+        return bool(packed.row(y)[x // 8] >> (7 - x % 8) & 1)
+
+    matrix = _reference_matrix(data)
+    read = _read_modules(burned, size, len(matrix))
+    # 아래쪽 여백(quiet zone)은 글자와 겹칠 수 있으므로 코드 영역만 비교
+    border = 4
+    assert [row[border:-border] for row in read[border:-border]] == \
+           [row[border:-border] for row in matrix[border:-border]]
+
+
+def test_reused_qr_starts_from_smallest_version():
+    long_matrix = qr_matrix("x" * 40)
+    short_matrix = qr_matrix("1.1")
+    assert len(short_matrix) < len(long_matrix)
+    assert short_matrix == _reference_matrix("1.1")
+
+
+def test_fixed_mask_pattern():
+    assert qr_matrix("123.1", mask_pattern=3) == _reference_matrix("123.1", mask_pattern=3)
+
+
+def test_code_too_large_for_target():
+    with pytest.raises(ValueError):
+        rasterize_matrix(qr_matrix("123.1"), 20)
+
+
+def _legacy_qr(data):
+    qr = qrcode.QRCode(version=1, error_correction=qrcode.constants.ERROR_CORRECT_L, box_size=10, border=4)
+    qr.add_data(data)
+    qr.make(fit=True)
+    return qr
+
+
+def _legacy_draw(data, qr=None):
+    qr = qr or _legacy_qr(data)
+    qr_image = qr.make_image(fill_color="black", back_color="white")
+    qr_height = ImageConfig.get_qr_height()
+    return qr_image.resize((qr_height, qr_height), Image.Resampling.LANCZOS)
+
+
+@pytest.mark.benchmark
+def test_qr_rasterizer_benchmark():
+    data = [f"{10000 + i}.{n}" for i in range(20) for n in range(1, 6)]
+
+    start = time.perf_counter()
+    for item in data:
+        _legacy_draw(item)
+    legacy = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for item in data:
+        QRDrawer(item).draw()
+    direct = time.perf_counter() - start
+
+    # 행렬 계산을 제외한 이미지 생성 단계만 비교
+    legacy_qrs = [_legacy_qr(item) for item in data]
+    matrices = [qr_matrix(item) for item in data]
+    start = time.perf_counter()
+    for item, qr in zip(data, legacy_qrs):
+        _legacy_draw(item, qr)
+    legacy_raster = time.perf_counter() - start
+    start = time.perf_counter()
+    for matrix in matrices:
+        rasterize_matrix(matrix, ImageConfig.get_qr_height())
+    direct_raster = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for item in data:
+        rasterize_matrix(qr_matrix(item, mask_pattern=0), ImageConfig.get_qr_height())
+    fixed_mask = time.perf_counter() - start
+
+    logging.info(f"QR x{len(data)}: box_size=10 + LANCZOS {legacy * 1000:.1f}ms, direct 1-bit {direct * 1000:.1f}ms "
+                 f"({legacy / direct:.1f}x); raster only {legacy_raster * 1000:.1f}ms -> "
+                 f"{direct_raster * 1000:.1f}ms ({legacy_raster / direct_raster:.1f}x); "
+                 f"fixed mask {fixed_mask * 1000:.1f}ms ({legacy / fixed_mask:.1f}x)")
+    assert direct < legacy
+    assert direct_raster * 3 < legacy_raster
@@ -0,0 +1,102 @@
+import logging
+import os
+import time
+
+import pytest
+from PIL import Image, ImageChops, ImageDraw, ImageFont
+
+from src.qr_generator.config import ImageConfig
+from src.qr_generator.layout import ImageLayout
+from src.qr_generator.render_cache import DEFAULT_FONT_PATH, FontCache, TextStripCache
+from src.qr_generator.text_drawer import TextDrawer
+
+
+def _legacy_text_layer(text):
+    """캐시 도입 전 TextDrawer.draw 구현"""
+    text_layer = Image.new('RGBA', (ImageConfig.WIDTH, ImageConfig.HEIGHT), (255, 255, 255, 0))
+    font = ImageFont.truetype(DEFAULT_FONT_PATH, ImageConfig.FONT_SIZE) if os.path.exists(
+        DEFAULT_FONT_PATH) else ImageFont.load_default()
+
+    draw = ImageDraw.Draw(text_layer)
+    text_bbox = draw.textbbox((0, 0), text, font=font)
+    text_width = text_bbox[2] - text_bbox[0]
+    text_x = (ImageConfig.WIDTH - text_width) // 2
+    text_y = ImageConfig.get_qr_height() + (
+            (ImageConfig.HEIGHT - ImageConfig.get_qr_height() - (text_bbox[3] - text_bbox[1])) // 2
+    )
+
+    draw.text((text_x, text_y), text, font=font, fill='black')
+    return text_layer
+
+
+def _legacy_compose(text):
+    background = Image.new('RGB', (ImageConfig.WIDTH, ImageConfig.HEIGHT), 'white')
+    text_layer = _legacy_text_layer(text)
+    background.paste(text_layer, (0, -20), text_layer)
+    return background
+
+
+def _compose(text, cache):
+    background = Image.new('RGB', (ImageConfig.WIDTH, ImageConfig.HEIGHT), 'white')
+    image, (x, y) = TextDrawer(text, cache).draw_strip()
+    background.paste(image, (x, y - 20), image)
+    return background
+
+
+@pytest.mark.parametrize("text", ["홍길동 1", "Unknown 12", "가나다라마바사 100", "j"])
+def test_cropped_strip_matches_full_layer(text):
+    """잘라낸 글자 영역만 합성해도 전체 레이어 합성과 같은 결과"""
+    cache = TextStripCache(FontCache())
+    assert ImageChops.difference(_legacy_text_layer(text), TextDrawer(text, cache).draw()).getbbox() is None
+    assert ImageChops.difference(_legacy_compose(text), _compose(text, cache)).getbbox() is None
+
+
+def test_font_cache_loads_once():
+    fonts = FontCache()
+    assert fonts.get(DEFAULT_FONT_PATH, 36) is fonts.get(DEFAULT_FONT_PATH, 36)
+    assert fonts.get(DEFAULT_FONT_PATH, 20) is not fonts.get(DEFAULT_FONT_PATH, 36)
+    # 폰트 파일이 없으면 기본 폰트
+    assert fonts.get("missing.ttf", 36) is not None
+
+
+def test_strip_cache_counters():
+    cache = TextStripCache(FontCache(), maxsize=2)
+    cache.get("a", DEFAULT_FONT_PATH, 36)
+    cache.get("a", DEFAULT_FONT_PATH, 36)
+    cache.get("b", DEFAULT_FONT_PATH, 36)
+    cache.get("c", DEFAULT_FONT_PATH, 36)  # "a" 제거
+    cache.get("a", DEFAULT_FONT_PATH, 36)
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"], stats["size"]) == (1, 4, 2, 2)
+    assert stats["hit_rate"] == pytest.approx(0.2)
+
+
+def test_layout_uses_shared_cache():
+    from src.qr_generator.render_cache import text_strips
+    before = text_strips.stats()["hits"]
+    ImageLayout.create_qr_image("1.1", "캐시 테스트")
+    ImageLayout.create_qr_image("1.2", "캐시 테스트")
+    assert text_strips.stats()["hits"] > before
+
+
+@pytest.mark.benchmark
+def test_text_compose_benchmark():
+    names = [f"사용자{i} {n}" for i in range(20) for n in range(1, 6)]
+    cache = TextStripCache(FontCache())
+
+    start = time.perf_counter()
+    for text in names:
+        _legacy_compose(text)
+    legacy = time.perf_counter() - start
+
+    for text in names:
+        _compose(text, cache)
+    start = time.perf_counter()
+    for text in names:
+        _compose(text, cache)
+    cached = time.perf_counter() - start
+
+    logging.info(f"text compose x{len(names)}: legacy {legacy * 1000:.1f}ms, cached {cached * 1000:.1f}ms "
+                 f"({legacy / cached:.1f}x), {cache.stats()}")
+    assert cached < legacy
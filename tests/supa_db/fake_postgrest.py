@@ -0,0 +1,145 @@
+import asyncio
+import json
+import re
+
+import httpx
+
+
+def _parse_list(value):
+    # in.("a","b") / in.(1,2)
+    items = re.findall(r'"((?:[^"\\]|\\.)*)"|([^,()]+)', value.strip()[1:-1])
+    return [quoted.replace('\\"', '"').replace('\\\\', '\\') if quoted else bare.strip() for quoted, bare in items]
+
+
+def _matches(row, column, op, value):
+    actual = row.get(column)
+    if op == "in":
+        return str(actual) in _parse_list(value)
+    if actual is None:
+        return op == "is" and value == "null"
+    if op == "eq":
+        return str(actual) == value
+    if op in ("gt", "gte", "lt", "lte"):
+        # 숫자 열은 숫자로, 나머지(ISO 시각 등)는 문자열로 비교
+        if isinstance(actual, (int, float)):
+            value = type(actual)(value)
+        else:
+            actual = str(actual)
+        return {"gt": actual > value, "gte": actual >= value, "lt": actual < value, "lte": actual <= value}[op]
+    raise ValueError(f"Unsupported operator {op}")
+
+
+def _split_top_level(text):
+    parts, depth, quoted, current = [], 0, False, ""
+    for index, char in enumerate(text):
+        if char == '"' and (index == 0 or text[index - 1] != "\\"):
+            quoted = not quoted
+        elif not quoted and char == "(":
+            depth += 1
+        elif not quoted and char == ")":
+            depth -= 1
+        elif not quoted and depth == 0 and char == ",":
+            parts.append(current)
+            current = ""
+            continue
+        current += char
+    return parts + [current]
+
+
+def _logic_matches(row, combinator, text):
+    # or=(a.gt.1,and(b.eq.2,c.gt.3))
+    results = []
+    for part in _split_top_level(text.strip()[1:-1]):
+        if part.startswith(("and(", "or(")):
+            name, _, inner = part.partition("(")
+            results.append(_logic_matches(row, name, "(" + inner))
+        else:
+            column, op, value = part.split(".", 2)
+            if value.startswith('"'):
+                value = value[1:-1].replace('\\"', '"')
+            results.append(_matches(row, column, op, value))
+    return any(results) if combinator == "or" else all(results)
+
+
+class FakePostgrest:
+    """In-memory PostgREST stand-in served through ``httpx.MockTransport``.
+
+    Supports ``select``, ``eq``/``in``/``gt``/``gte``/``lt``/``lte`` filters, ``or``/``and``
+    groups, ``order``, ``limit`` and upserting POSTs. ``functions`` maps ``/rpc/<name>``
+    calls to callables (or coroutines) taking the JSON arguments. ``latency`` delays
+    every response and ``offline`` makes requests fail with a connection error.
+    """
+
+    def __init__(self, tables=None, latency=0.0, functions=None):
+        self.tables = {name: list(rows) for name, rows in (tables or {}).items()}
+        self.functions = dict(functions or {})
+        self.latency = latency
+        self.offline = False
+        self.fail_status = None  # 설정하면 해당 상태 코드로 응답
+        self.requests = []
+
+    def transport(self):
+        return httpx.MockTransport(self._handle)
+
+    async def _handle(self, request: httpx.Request):
+        self.requests.append(request)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.offline:
+            raise httpx.ConnectError("offline", request=request)
+        if self.fail_status:
+            return httpx.Response(self.fail_status, json={"message": "failure"})
+
+        parent, _, table = request.url.path.rpartition("/")
+        if parent.endswith("/rpc"):
+            return await self._rpc(table, request)
+        rows = self.tables.setdefault(table, [])
+        if request.method == "GET":
+            return httpx.Response(200, json=self._select(rows, request.url.params))
+        if request.method == "POST":
+            return self._upsert(rows, request)
+        return httpx.Response(405)
+
+    async def _rpc(self, name, request):
+        if name not in self.functions:
+            return httpx.Response(404, json={"message": f"function {name} not found"})
+        result = self.functions[name](**json.loads(request.content))
+        if asyncio.iscoroutine(result):
+            result = await result
+        return httpx.Response(200, json=result) if result is not None else httpx.Response(204)
+
+    def _select(self, rows, params):
+        result = list(rows)
+        for column, expression in params.multi_items():
+            if column in ("select", "order", "limit"):
+                continue
+            if column in ("or", "and"):
+                result = [row for row in result if _logic_matches(row, column, expression)]
+                continue
+            op, _, value = expression.partition(".")
+            result = [row for row in result if _matches(row, column, op, value)]
+        for term in reversed(params.get("order", "").split(",") if params.get("order") else []):
+            column, _, direction = term.partition(".")
+            result.sort(key=lambda row: row.get(column), reverse=direction.startswith("desc"))
+        if "limit" in params:
+            result = result[:int(params["limit"])]
+        select = params.get("select", "*")
+        if select != "*":
+            columns = select.split(",")
+            result = [{column: row.get(column) for column in columns} for row in result]
+        return result
+
+    def _upsert(self, rows, request):
+        payload = json.loads(request.content)
+        payload = payload if isinstance(payload, list) else [payload]
+        keys = request.url.params.get("on_conflict", "id").split(",")
+        merge = "merge-duplicates" in request.headers.get("prefer", "")
+        for item in payload:
+            existing = next((row for row in rows if all(row.get(k) == item.get(k) for k in keys)), None)
+            if existing is None:
+                rows.append(dict(item))
+            elif merge:
+                existing.update(item)
+            else:
+                return httpx.Response(409, json={"message": "duplicate key"})
+        return httpx.Response(201)
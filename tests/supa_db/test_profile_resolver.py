@@ -0,0 +1,169 @@
+import asyncio
+import logging
+import time
+
+import pytest
+
+from src.supa_db.profile_resolver import UNKNOWN_USER, ProfileResolver
+from tests.supa_db.fake_postgrest import FakePostgrest
+
+PROFILES = [{"id": f"user-{i}", "name": f"사용자{i}"} for i in range(50)]
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _resolver(server, **kwargs):
+    return ProfileResolver("http://localhost:54321", "jwt", transport=server.transport(), **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_cached_lookup():
+    server = FakePostgrest({"profiles": PROFILES})
+    resolver = _resolver(server)
+    try:
+        assert await resolver.get_user_name("user-1") == "사용자1"
+        assert await resolver.get_user_name("user-1") == "사용자1"
+    finally:
+        await resolver.close()
+
+    assert len(server.requests) == 1
+    request = server.requests[0]
+    assert request.url.path == "/rest/v1/profiles"
+    assert request.headers["apikey"] == "jwt"
+    assert request.headers["authorization"] == "Bearer jwt"
+    stats = resolver.stats()
+    assert (stats["hits"], stats["misses"], stats["requests"]) == (1, 1, 1)
+    assert stats["hit_rate"] == pytest.approx(0.5)
+
+
+@pytest.mark.asyncio
+async def test_ttl_and_negative_cache():
+    """없는 사용자는 Unknown 으로 짧게 캐시, 이름은 TTL 이 지나면 다시 조회"""
+    server = FakePostgrest({"profiles": PROFILES})
+    clock = Clock()
+    resolver = _resolver(server, ttl=60, negative_ttl=5, clock=clock)
+    try:
+        assert await resolver.get_user_name("nobody") == UNKNOWN_USER
+        assert await resolver.get_user_name("nobody") == UNKNOWN_USER
+        assert resolver.stats()["negative_hits"] == 1
+
+        server.tables["profiles"].append({"id": "nobody", "name": "새 사용자"})
+        clock.now = 6
+        assert await resolver.get_user_name("nobody") == "새 사용자"
+
+        await resolver.get_user_name("user-2")
+        clock.now = 70
+        await resolver.get_user_name("user-2")
+    finally:
+        await resolver.close()
+    assert len(server.requests) == 4
+
+
+@pytest.mark.asyncio
+async def test_lru_eviction():
+    server = FakePostgrest({"profiles": PROFILES})
+    resolver = _resolver(server, maxsize=2)
+    try:
+        for user_id in ("user-1", "user-2", "user-1", "user-3", "user-1", "user-2"):
+            await resolver.get_user_name(user_id)
+    finally:
+        await resolver.close()
+    # user-2 는 user-3 추가 시 제거되어 다시 조회
+    assert [r.url.params["id"] for r in server.requests] == ["eq.user-1", "eq.user-2", "eq.user-3", "eq.user-2"]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_lookups_share_one_request():
+    server = FakePostgrest({"profiles": PROFILES}, latency=0.02)
+    resolver = _resolver(server)
+    try:
+        names = await asyncio.gather(*(resolver.get_user_name("user-7") for _ in range(10)))
+    finally:
+        await resolver.close()
+    assert names == ["사용자7"] * 10
+    assert len(server.requests) == 1
+    assert resolver.stats()["coalesced"] == 9
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_cancel_lookup():
+    server = FakePostgrest({"profiles": PROFILES}, latency=0.02)
+    resolver = _resolver(server)
+    try:
+        first = asyncio.create_task(resolver.get_user_name("user-3"))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(resolver.get_user_name("user-3"))
+        await asyncio.sleep(0)
+        first.cancel()
+        assert await second == "사용자3"
+    finally:
+        await resolver.close()
+
+
+@pytest.mark.asyncio
+async def test_failed_lookup_is_not_cached():
+    server = FakePostgrest({"profiles": PROFILES})
+    server.offline = True
+    resolver = _resolver(server)
+    try:
+        assert await resolver.get_user_name("user-1") == UNKNOWN_USER
+        server.offline = False
+        assert await resolver.get_user_name("user-1") == "사용자1"
+    finally:
+        await resolver.close()
+    assert resolver.stats()["errors"] == 1
+
+
+@pytest.mark.asyncio
+async def test_prefetch_uses_bulk_query():
+    server = FakePostgrest({"profiles": PROFILES})
+    resolver = _resolver(server)
+    try:
+        ids = [f"user-{i}" for i in range(30)] + ["nobody", "user-1"]
+        assert await resolver.prefetch(ids, chunk=20) == 31
+        assert len(server.requests) == 2
+        assert server.requests[0].url.params["id"].startswith('in.("user-0","user-1"')
+
+        assert await resolver.get_user_name("user-29") == "사용자29"
+        assert await resolver.get_user_name("nobody") == UNKNOWN_USER
+        # 이미 캐시된 사용자는 다시 요청하지 않음
+        assert await resolver.prefetch(ids) == 0
+    finally:
+        await resolver.close()
+    assert len(server.requests) == 2
+
+
+@pytest.mark.benchmark
+@pytest.mark.asyncio
+async def test_resolver_benchmark():
+    """주문 200건 (사용자 20명): 매번 조회 vs 캐시 + 동시 조회 합치기, 네트워크 왕복 10ms"""
+    orders = [f"user-{i % 20}" for i in range(200)]
+
+    server = FakePostgrest({"profiles": PROFILES}, latency=0.01)
+    uncached = _resolver(server, ttl=0, negative_ttl=0)
+    start = time.perf_counter()
+    for user_id in orders:
+        await uncached.get_user_name(user_id)
+    uncached_time = time.perf_counter() - start
+    await uncached.close()
+
+    server = FakePostgrest({"profiles": PROFILES}, latency=0.01)
+    resolver = _resolver(server)
+    start = time.perf_counter()
+    for offset in range(0, len(orders), 10):
+        # 거의 동시에 들어온 주문 10건씩
+        await asyncio.gather(*(resolver.get_user_name(user_id) for user_id in orders[offset:offset + 10]))
+    cached_time = time.perf_counter() - start
+    await resolver.close()
+
+    stats = resolver.stats()
+    logging.info(f"200 lookups: uncached {uncached_time * 1000:.0f}ms ({len(orders)} requests), "
+                 f"cached {cached_time * 1000:.0f}ms ({stats['requests']} requests), {stats}")
+    assert stats["requests"] == 20
+    assert cached_time * 5 < uncached_time
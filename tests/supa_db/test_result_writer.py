@@ -0,0 +1,209 @@
+import asyncio
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.supa_db.result_writer import FAILED, PRINTED, ResultWriter
+from src.supa_realtime.label_pipeline import LabelPipeline
+from src.supa_realtime.realtime_service import RealtimeService
+from tests.supa_db.fake_postgrest import FakePostgrest
+from tests.supa_realtime.fakes import StubPrinter, StubSupaDB
+
+
+def _render(data, text, raster_mode):
+    return data, 0.0, 0.0, (0, {"size": 0, "hits": 0, "misses": 0, "evictions": 0})
+
+
+def _writer(server, **kwargs):
+    return ResultWriter("http://localhost:54321", "jwt", transport=server.transport(), **kwargs)
+
+
+def _rows(server):
+    return {row["label_id"]: row for row in server.tables.get("print_results", [])}
+
+
+def _record_labels(writer, laundry_id, count, status=PRINTED):
+    for number in range(1, count + 1):
+        writer.record(f"{laundry_id}.{number}", laundry_id, number, status)
+
+
+@pytest.mark.asyncio
+async def test_flush_on_size():
+    server = FakePostgrest()
+    writer = _writer(server, flush_size=10, flush_interval=60)
+    writer.start()
+    try:
+        _record_labels(writer, 1, 25)
+        await asyncio.sleep(0.05)
+        # 시간 조건을 기다리지 않고 10개 단위로 나눠서 전송
+        assert writer.stats()["batches"] == 3
+        assert writer.pending == 0
+    finally:
+        await writer.stop()
+
+    assert len(_rows(server)) == 25
+    request = server.requests[0]
+    assert request.method == "POST"
+    assert request.url.path == "/rest/v1/print_results"
+    assert request.url.params["on_conflict"] == "label_id"
+    assert "merge-duplicates" in request.headers["prefer"]
+    assert len(json.loads(request.content)) == 10
+
+
+@pytest.mark.asyncio
+async def test_flush_on_interval():
+    server = FakePostgrest()
+    writer = _writer(server, flush_size=100, flush_interval=0.05)
+    writer.start()
+    try:
+        _record_labels(writer, 2, 3)
+        await asyncio.sleep(0.15)
+        assert len(_rows(server)) == 3
+    finally:
+        await writer.stop()
+    assert len(server.requests) == 1
+
+
+@pytest.mark.asyncio
+async def test_results_for_one_label_are_coalesced():
+    """같은 라벨의 결과는 마지막 것만 전송"""
+    server = FakePostgrest()
+    writer = _writer(server, flush_interval=60)
+    writer.record("3.1", 3, 1, FAILED, "프린터 커버가 열려있어 인쇄할 수 없습니다")
+    writer.record("3.1", 3, 1, PRINTED)
+    await writer.stop()
+
+    rows = _rows(server)
+    assert rows["3.1"]["status"] == PRINTED and rows["3.1"]["error"] is None
+    assert writer.stats()["coalesced"] == 1
+
+
+@pytest.mark.asyncio
+async def test_upsert_overwrites_previous_result():
+    server = FakePostgrest({"print_results": [{"label_id": "4.1", "laundry_id": 4, "number": 1, "status": FAILED}]})
+    writer = _writer(server)
+    writer.record("4.1", 4, 1, PRINTED)
+    await writer.stop()
+    assert len(server.tables["print_results"]) == 1
+    assert _rows(server)["4.1"]["status"] == PRINTED
+
+
+@pytest.mark.asyncio
+async def test_keeps_results_while_offline():
+    """DB 에 연결할 수 없는 동안 결과를 보관하고 재시도 간격을 늘림"""
+    server = FakePostgrest()
+    server.offline = True
+    writer = _writer(server, flush_size=5, flush_interval=0.02, max_backoff=0.08)
+    writer.start()
+    try:
+        _record_labels(writer, 5, 12)
+        await asyncio.sleep(0.25)
+        attempts = len(server.requests)
+        assert writer.stats()["failures"] >= 2
+        assert attempts < 12  # 재시도 간격이 늘어남
+        assert writer.pending == 12
+
+        # 오프라인 중에도 기록은 계속
+        writer.record("5.1", 5, 1, FAILED, "retry")
+        server.offline = False
+        await asyncio.sleep(0.2)
+        assert writer.pending == 0
+    finally:
+        await writer.stop()
+
+    rows = _rows(server)
+    assert len(rows) == 12
+    assert rows["5.1"]["status"] == FAILED
+
+
+@pytest.mark.asyncio
+async def test_server_error_is_retried():
+    server = FakePostgrest()
+    server.fail_status = 503
+    writer = _writer(server, flush_interval=0.02, max_backoff=0.02)
+    writer.start()
+    try:
+        _record_labels(writer, 6, 2)
+        await asyncio.sleep(0.08)
+        assert writer.pending == 2
+        server.fail_status = None
+        await asyncio.sleep(0.1)
+    finally:
+        await writer.stop()
+    assert len(_rows(server)) == 2
+
+
+@pytest.mark.asyncio
+async def test_oldest_results_dropped_beyond_limit():
+    server = FakePostgrest()
+    server.offline = True
+    writer = _writer(server, max_pending=10, flush_interval=60)
+    _record_labels(writer, 7, 15)
+    assert writer.pending == 10
+    assert writer.stats()["dropped"] == 5
+    server.offline = False
+    await writer.stop()
+    assert sorted(_rows(server)) == sorted(f"7.{number}" for number in range(6, 16))
+
+
+@pytest.mark.asyncio
+async def test_service_reports_printed_and_failed_labels():
+    server = FakePostgrest()
+    writer = _writer(server, flush_interval=0.02)
+    printer = StubPrinter(print_time=0, fail_on=None)
+    service = RealtimeService("url", "jwt", printer, StubSupaDB(), results=writer,
+                              pipeline=LabelPipeline(executor=ThreadPoolExecutor(2), render=_render))
+    service.print_queue.start()
+    writer.start()
+    try:
+        record = {'id': 8, 'amount': 2, 'requested_by': 'user-1'}
+        assert await service._handle_print_request({'data': {'record': record}}) == [0, 1]
+
+        printer.fail_on = "9.2"
+        record = {'id': 9, 'amount': 3, 'requested_by': 'user-1'}
+        with pytest.raises(Exception, match="cover is open"):
+            await service._handle_print_request({'data': {'record': record}})
+    finally:
+        await service.print_queue.stop()
+        await writer.stop()
+
+    rows = _rows(server)
+    assert {label: row["status"] for label, row in rows.items()} == {
+        "8.1": PRINTED, "8.2": PRINTED, "9.1": PRINTED, "9.2": FAILED, "9.3": FAILED}
+    assert "cover is open" in rows["9.2"]["error"]
+
+
+@pytest.mark.benchmark
+@pytest.mark.asyncio
+async def test_write_back_benchmark():
+    """라벨 500개 결과: 라벨마다 요청 vs 묶어서 upsert (왕복 5ms)"""
+    count = 500
+
+    server = FakePostgrest(latency=0.005)
+    writer = _writer(server, flush_size=1)
+    start = time.perf_counter()
+    for number in range(1, count + 1):
+        writer.record(f"1.{number}", 1, number, PRINTED)
+        await writer.flush()
+    per_label = time.perf_counter() - start
+    await writer.stop()
+
+    server = FakePostgrest(latency=0.005)
+    writer = _writer(server, flush_size=100, flush_interval=0.05)
+    writer.start()
+    start = time.perf_counter()
+    for number in range(1, count + 1):
+        writer.record(f"1.{number}", 1, number, PRINTED)
+    record_time = time.perf_counter() - start
+    while writer.flushed < count:
+        await asyncio.sleep(0.005)
+    batched = time.perf_counter() - start
+    await writer.stop()
+
+    logging.info(f"{count} results: per-label {per_label * 1000:.0f}ms ({count} requests), batched {batched * 1000:.0f}ms "
+                 f"({len(server.requests)} requests), record() {record_time / count * 1e6:.1f}us/label, {writer.stats()}")
+    assert len(server.requests) == 5
+    assert batched * 5 < per_label
@@ -0,0 +1,91 @@
+import asyncio
+
+from src.niimbot.completion_waiter import CompletionWaiter
+from src.niimbot.niimbot_printer import PrintJobError, PrinterFault
+from src.supa_realtime.print_queue import _aiter
+
+
+class StubPrinter:
+    """Records how many print sessions overlap."""
+
+    def __init__(self, print_time=0.01, fail_on=None):
+        self.print_time = print_time
+        self.fail_on = fail_on
+        self.active = 0
+        self.max_active = 0
+        self.jobs = []
+        self.completion = CompletionWaiter()
+
+    async def print_pages(self, images, copies=1, on_page=None):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            if hasattr(images, "__aiter__"):
+                images = [image async for image in images]
+            images = list(images)
+            for index, image in enumerate(images):
+                if image == self.fail_on:
+                    raise PrintJobError("Print job failed: Printer cover is open", range(index)) \
+                        from PrinterFault("Printer cover is open")
+                await asyncio.sleep(self.print_time)
+                if on_page:
+                    on_page(index)
+            self.jobs.append(images)
+            return list(range(len(images)))
+        finally:
+            self.active -= 1
+
+
+class PagePrinter(StubPrinter):
+    """Calls ``on_page`` as each page is printed instead of after collecting the whole stream."""
+
+    async def print_pages(self, images, copies=1, on_page=None):
+        printed = []
+        async for image in images if hasattr(images, "__aiter__") else _aiter(images):
+            await asyncio.sleep(self.print_time)
+            printed.append(image)
+            on_page(len(printed) - 1)
+        self.jobs.append(printed)
+        return list(range(len(printed)))
+
+
+class FaultyPrinter(StubPrinter):
+    """Fails with ``fault`` after printing ``fail_after`` pages of its next job."""
+
+    def __init__(self, print_time=0.01, fault=None, fail_after=0):
+        super().__init__(print_time)
+        self.fault = fault
+        self.fail_after = fail_after
+        self.status_error = None
+
+    async def print_pages(self, images, copies=1, on_page=None):
+        if self.fault is None:
+            return await super().print_pages(images, copies, on_page)
+        images = [image async for image in images] if hasattr(images, "__aiter__") else list(images)
+        for index in range(self.fail_after):
+            await asyncio.sleep(self.print_time)
+            on_page(index)
+        raise PrintJobError(f"Print job failed: Printer status error: {self.fault}", range(self.fail_after)) \
+            from PrinterFault(self.fault)
+
+    async def check_printer_status(self):
+        if self.status_error:
+            raise PrinterFault(self.status_error)
+        return True
+
+
+class StubProfiles:
+    def __init__(self):
+        self.prefetched = []
+
+    async def get_user_name(self, user_id):
+        return "홍길동"
+
+    async def prefetch(self, user_ids):
+        self.prefetched.append(list(user_ids))
+        return len(user_ids)
+
+
+class StubSupaDB:
+    def __init__(self):
+        self.profiles = StubProfiles()
@@ -0,0 +1,273 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.supa_db.laundry_feed import LaundryFeed
+from src.supa_realtime.catch_up import CatchUpSync
+from src.supa_realtime.job_journal import JobJournal
+from src.supa_realtime.label_pipeline import LabelPipeline
+from src.supa_realtime.print_queue import PrintQueueFull
+from src.supa_realtime.realtime_service import RealtimeService
+from tests.supa_db.fake_postgrest import FakePostgrest
+from tests.supa_realtime.fakes import StubPrinter, StubSupaDB
+
+
+_BASE = datetime(2026, 10, 17, 9, tzinfo=timezone.utc)
+
+
+def _row(row_id, second=None):
+    # 같은 시각에 여러 행이 들어오는 경우도 포함 (id 로 순서 구분)
+    second = row_id // 2 if second is None else second
+    return {"id": row_id, "amount": 1, "requested_by": "user-1",
+            "created_at": (_BASE + timedelta(seconds=second)).isoformat(timespec="microseconds")}
+
+
+def _feed(server):
+    return LaundryFeed("http://localhost:54321", "jwt", transport=server.transport())
+
+
+@pytest.mark.asyncio
+async def test_first_run_starts_from_latest_row():
+    """처음 실행하면 테이블 전체가 아니라 최신 행부터 시작"""
+    server = FakePostgrest({"laundry": [_row(i) for i in range(1, 51)]})
+    feed = _feed(server)
+    sync = CatchUpSync(feed)
+    submitted = []
+    try:
+        assert await sync.run(submitted.append) == 0
+    finally:
+        await feed.close()
+    assert submitted == []
+    assert sync.mark == (_row(50)["created_at"], 50)
+
+
+@pytest.mark.asyncio
+async def test_replays_gap_with_keyset_pages(tmp_path):
+    rows = [_row(i) for i in range(1, 1001)]
+    server = FakePostgrest({"laundry": rows})
+    journal = JobJournal(tmp_path / "journal.db")
+    journal.set_high_water_mark((_row(975)["created_at"], 975))
+    feed = _feed(server)
+    sync = CatchUpSync(feed, journal, page_size=10)
+    submitted = []
+    try:
+        assert await sync.run(lambda record: submitted.append(record["id"])) == 25
+    finally:
+        await feed.close()
+
+    assert submitted == list(range(976, 1001))
+    # 비용은 놓친 행 수에 비례 (페이지 3개)
+    assert len(server.requests) == 3
+    assert journal.high_water_mark() == (_row(1000)["created_at"], 1000)
+    journal.close()
+
+
+@pytest.mark.asyncio
+async def test_rows_with_same_timestamp_are_not_skipped():
+    rows = [_row(i, second=0) for i in range(1, 8)]
+    server = FakePostgrest({"laundry": rows})
+    feed = _feed(server)
+    sync = CatchUpSync(feed, page_size=2)
+    sync.processed(rows[1])
+    submitted = []
+    try:
+        await sync.run(lambda record: submitted.append(record["id"]))
+    finally:
+        await feed.close()
+    assert submitted == [3, 4, 5, 6, 7]
+
+
+@pytest.mark.asyncio
+async def test_live_and_replayed_rows_are_deduplicated():
+    rows = [_row(i) for i in range(1, 11)]
+    server = FakePostgrest({"laundry": rows})
+    feed = _feed(server)
+    sync = CatchUpSync(feed)
+    sync.processed(rows[4])
+    sync.begin()
+    # 재구독 직후 실시간으로 먼저 받은 행
+    assert sync.is_new(rows[7])
+    sync.processed(rows[7])
+    submitted = []
+    try:
+        await sync.run(lambda record: submitted.append(record["id"]))
+    finally:
+        await feed.close()
+
+    assert submitted == [6, 7, 9, 10]
+    # 따라잡은 행이 나중에 실시간으로 도착해도 무시
+    assert not sync.is_new(rows[9])
+    assert sync.stats()["duplicates"] == 2
+
+
+@pytest.mark.asyncio
+async def test_mark_is_not_persisted_past_gap_during_catch_up(tmp_path):
+    """따라잡는 중에 받은 실시간 행 때문에 표시가 앞서 저장되지 않음"""
+    rows = [_row(i) for i in range(1, 21)]
+    server = FakePostgrest({"laundry": rows[:15]})
+    journal = JobJournal(tmp_path / "journal.db")
+    journal.set_high_water_mark((rows[9]["created_at"], 10))
+    feed = _feed(server)
+    sync = CatchUpSync(feed, journal)
+    persisted = []
+
+    def submit(record):
+        if record["id"] == 11:
+            sync.processed(rows[19])  # 실시간으로 받은 최신 행
+        persisted.append(journal.high_water_mark()[1])
+
+    try:
+        await sync.run(submit)
+    finally:
+        await feed.close()
+    assert persisted == [10] * 5
+    assert journal.high_water_mark()[1] == 20
+    journal.close()
+
+
+@pytest.mark.asyncio
+async def test_failed_submit_resumes_from_failed_row(tmp_path):
+    rows = [_row(i) for i in range(1, 11)]
+    server = FakePostgrest({"laundry": rows})
+    journal = JobJournal(tmp_path / "journal.db")
+    journal.set_high_water_mark((rows[1]["created_at"], 2))
+    feed = _feed(server)
+    sync = CatchUpSync(feed, journal)
+    submitted = []
+
+    def full_at_6(record):
+        if record["id"] == 6:
+            raise PrintQueueFull("Print queue is full")
+        submitted.append(record["id"])
+
+    try:
+        with pytest.raises(PrintQueueFull):
+            await sync.run(full_at_6)
+        assert journal.high_water_mark()[1] == 5
+        await sync.run(lambda record: submitted.append(record["id"]))
+    finally:
+        await feed.close()
+    assert submitted == [3, 4, 5, 6, 7, 8, 9, 10]
+    journal.close()
+
+
+@pytest.mark.asyncio
+async def test_failed_query_keeps_mark_before_gap(tmp_path):
+    rows = [_row(i) for i in range(1, 11)]
+    server = FakePostgrest({"laundry": rows})
+    server.offline = True
+    journal = JobJournal(tmp_path / "journal.db")
+    journal.set_high_water_mark((rows[1]["created_at"], 2))
+    feed = _feed(server)
+    sync = CatchUpSync(feed, journal)
+    sync.begin()
+    sync.processed(rows[9])  # 실시간으로 받은 최신 행
+    try:
+        with pytest.raises(Exception):
+            await sync.run(lambda record: None)
+    finally:
+        await feed.close()
+    assert journal.high_water_mark()[1] == 2
+    journal.close()
+
+
+def _render(data, text, raster_mode):
+    return data, 0.0, 0.0, (0, {"size": 0, "hits": 0, "misses": 0, "evictions": 0})
+
+
+@pytest.mark.asyncio
+async def test_service_prints_missed_orders_once(tmp_path):
+    rows = [_row(i) for i in range(1, 8)]
+    server = FakePostgrest({"laundry": rows})
+    journal = JobJournal(tmp_path / "journal.db")
+    journal.set_high_water_mark((rows[2]["created_at"], 3))
+    feed = _feed(server)
+    printer = StubPrinter(print_time=0)
+    service = RealtimeService("url", "jwt", printer, StubSupaDB(), journal=journal,
+                              pipeline=LabelPipeline(executor=ThreadPoolExecutor(2), render=_render),
+                              catch_up=CatchUpSync(feed, journal))
+    service.print_queue.start()
+    try:
+        # 재구독 직후 실시간 이벤트가 먼저 도착
+        service.catch_up.begin()
+        service._callback_wrapper({'data': {'record': rows[5]}})
+        assert journal.high_water_mark()[1] == 3
+        await service._run_catch_up()
+        # 같은 주문이 실시간으로 다시 전달되어도 한 번만 출력
+        service._callback_wrapper({'data': {'record': rows[4]}})
+        while service.print_queue.depth or service.print_queue.current:
+            await asyncio.sleep(0.01)
+    finally:
+        await service.print_queue.stop()
+        await feed.close()
+
+    assert sorted(job[0] for job in printer.jobs) == ["4.1", "5.1", "6.1", "7.1"]
+    assert journal.high_water_mark()[1] == 7
+    journal.close()
+
+
+@pytest.mark.asyncio
+async def test_rows_rejected_by_full_queue_are_caught_up(tmp_path):
+    """큐가 가득 차 받지 못한 실시간 행을 이후 행 때문에 건너뛰지 않음"""
+    rows = [_row(i) for i in range(1, 8)]
+    server = FakePostgrest({"laundry": rows})
+    journal = JobJournal(tmp_path / "journal.db")
+    journal.set_high_water_mark((rows[2]["created_at"], 3))
+    feed = _feed(server)
+    printer = StubPrinter(print_time=0)
+    service = RealtimeService("url", "jwt", printer, StubSupaDB(), queue_size=1, journal=journal,
+                              pipeline=LabelPipeline(executor=ThreadPoolExecutor(2), render=_render),
+                              catch_up=CatchUpSync(feed, journal))
+    try:
+        # 작업자가 멈춘 동안 4 는 큐에 들어가고 5, 6 은 큐가 가득 차 거절됨
+        for row in rows[3:6]:
+            service._callback_wrapper({'data': {'record': row}})
+        assert service.catch_up.stats()["held"] == 2
+        assert journal.high_water_mark()[1] == 4
+        # 재시작해도 거절된 행부터 다시 받음
+        assert CatchUpSync(feed, journal).mark[1] == 4
+
+        service.print_queue.start()
+        for _ in range(3):
+            while service.print_queue.depth or service.print_queue.current:
+                await asyncio.sleep(0.01)
+            await service._run_catch_up()
+        while service.print_queue.depth or service.print_queue.current:
+            await asyncio.sleep(0.01)
+    finally:
+        await service.print_queue.stop()
+        await feed.close()
+
+    assert sorted(job[0] for job in printer.jobs) == ["4.1", "5.1", "6.1", "7.1"]
+    assert service.catch_up.stats()["held"] == 0
+    assert journal.high_water_mark()[1] == 7
+    journal.close()
+
+
+@pytest.mark.benchmark
+@pytest.mark.asyncio
+async def test_catch_up_cost_follows_gap_size():
+    """테이블 크기가 10배가 되어도 같은 간격을 따라잡는 비용은 같음"""
+    results = {}
+    for table_size in (2000, 20000):
+        rows = [_row(i, second=i) for i in range(1, table_size + 1)]
+        for gap in (10, 100):
+            server = FakePostgrest({"laundry": rows})
+            feed = _feed(server)
+            sync = CatchUpSync(feed, page_size=50)
+            sync.processed(rows[-gap - 1])
+            transferred = []
+
+            try:
+                await sync.run(transferred.append)
+            finally:
+                await feed.close()
+            results[(table_size, gap)] = (len(server.requests), len(transferred))
+
+    logging.info("catch-up (requests, rows) by (table size, gap): "
+                 + ", ".join(f"{key}: {value}" for key, value in results.items()))
+    assert results[(2000, 10)] == results[(20000, 10)] == (1, 10)
+    assert results[(2000, 100)] == results[(20000, 100)] == (3, 100)
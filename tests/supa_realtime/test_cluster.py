@@ -0,0 +1,418 @@
+import asyncio
+import json
+import logging
+import random
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import pytest_asyncio
+
+from src.supa_realtime.cluster import ClusterNode
+from src.supa_realtime.label_pipeline import LabelPipeline
+from src.supa_realtime.lease_store import MemoryLeaseStore, PostgrestLeaseStore, SqliteLeaseStore
+from src.supa_realtime.print_queue import PrintQueueFull
+from src.supa_realtime.realtime_service import RealtimeService
+from tests.supa_db.fake_postgrest import FakePostgrest
+from tests.supa_realtime.fakes import StubPrinter, StubSupaDB
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def _lease_functions(leases: MemoryLeaseStore):
+    """The print_leases SQL functions of the README, served from an in-memory table."""
+    async def claim_print_lease(lease_key, lease_owner, ttl):
+        return [(await leases.acquire(lease_key, lease_owner, ttl))._asdict()]
+
+    async def renew_print_leases(lease_keys, lease_owner, ttl):
+        return await leases.renew(lease_keys, lease_owner, ttl)
+
+    async def complete_print_lease(lease_key, lease_owner):
+        return await leases.complete(lease_key, lease_owner)
+
+    async def release_print_lease(lease_key, lease_owner):
+        return await leases.release(lease_key, lease_owner)
+
+    async def prune_print_leases(max_age):
+        await leases.prune(max_age)
+
+    return {function.__name__: function for function in (claim_print_lease, renew_print_leases,
+                                                         complete_print_lease, release_print_lease,
+                                                         prune_print_leases)}
+
+
+@pytest_asyncio.fixture(params=["memory", "sqlite", "postgrest"])
+async def make_store(request, tmp_path):
+    stores = []
+    servers = []
+
+    def make(clock=time.time):
+        if request.param == "memory":
+            # 메모리 저장소는 한 프로세스 안의 노드들이 같은 객체를 공유
+            if not stores:
+                stores.append(MemoryLeaseStore(clock))
+            return stores[0]
+        if request.param == "sqlite":
+            store = SqliteLeaseStore(tmp_path / "leases.db", clock)
+        else:
+            # 호스트마다 따로 연결하고 데이터베이스의 시계로 만료를 판단
+            if not servers:
+                servers.append(FakePostgrest(functions=_lease_functions(MemoryLeaseStore(clock))))
+            store = PostgrestLeaseStore("http://db", "jwt", transport=servers[0].transport())
+        stores.append(store)
+        return store
+
+    yield make
+    for store in stores:
+        await store.close()
+
+
+@pytest.mark.asyncio
+async def test_lease_is_granted_to_one_owner(make_store):
+    clock = FakeClock()
+    a, b = make_store(clock), make_store(clock)
+    assert (await a.acquire(1, "node-a", 30)).held_by("node-a")
+    lease = await b.acquire(1, "node-b", 30)
+    assert not lease.held_by("node-b")
+    assert (lease.owner, lease.expires_at) == ("node-a", 1030.0)
+    # 가진 노드가 다시 요청하면 그대로 연장
+    clock.now += 10
+    assert (await a.acquire(1, "node-a", 30)).expires_at == 1040.0
+
+
+@pytest.mark.asyncio
+async def test_expired_lease_is_reclaimed(make_store):
+    clock = FakeClock()
+    a, b = make_store(clock), make_store(clock)
+    await a.acquire(1, "node-a", 30)
+    clock.now += 20
+    assert await a.renew(["1", "2"], "node-a", 30) == ["1"]
+    clock.now += 29
+    assert not (await b.acquire(1, "node-b", 30)).held_by("node-b")
+    clock.now += 2
+    assert (await b.acquire(1, "node-b", 30)).held_by("node-b")
+    # 만료 후 빼앗긴 임대는 갱신되지 않음
+    assert await a.renew(["1"], "node-a", 30) == []
+
+
+@pytest.mark.asyncio
+async def test_completed_lease_is_never_claimed_again(make_store):
+    clock = FakeClock()
+    a, b = make_store(clock), make_store(clock)
+    await a.acquire(1, "node-a", 30)
+    assert not await b.complete(1, "node-b")
+    assert await a.complete(1, "node-a")
+    clock.now += 3600
+    lease = await b.acquire(1, "node-b", 30)
+    assert lease.done and lease.owner == "node-a"
+    assert not await a.release(1, "node-a")
+
+
+@pytest.mark.asyncio
+async def test_released_lease_is_free(make_store):
+    clock = FakeClock()
+    a, b = make_store(clock), make_store(clock)
+    await a.acquire(1, "node-a", 30)
+    assert not await b.release(1, "node-b")
+    assert await a.release(1, "node-a")
+    assert (await b.acquire(1, "node-b", 30)).held_by("node-b")
+
+
+@pytest.mark.asyncio
+async def test_prune_forgets_old_leases(make_store):
+    clock = FakeClock()
+    store = make_store(clock)
+    await store.acquire(1, "node-a", 30)
+    await store.complete(1, "node-a")
+    await store.acquire(2, "node-a", 30)
+    clock.now += 100
+    await store.prune(60)
+    assert (await store.acquire(1, "node-b", 30)).held_by("node-b")
+
+
+@pytest.mark.asyncio
+async def test_sqlite_claims_are_atomic_across_connections(tmp_path):
+    """여러 연결이 동시에 같은 주문을 요청해도 한 노드만 획득"""
+    stores = [SqliteLeaseStore(tmp_path / "leases.db") for _ in range(4)]
+
+    async def node(index):
+        won = []
+        for key in range(200):
+            if (await stores[index].acquire(key, f"node-{index}", 30)).held_by(f"node-{index}"):
+                won.append(key)
+        return won
+
+    won = await asyncio.gather(*(node(index) for index in range(4)))
+    for store in stores:
+        await store.close()
+    assert sorted(key for keys in won for key in keys) == list(range(200))
+
+
+@pytest.mark.asyncio
+async def test_sqlite_leases_stay_on_one_host(tmp_path):
+    """WAL 파일은 호스트 사이에 공유할 수 없으므로 다른 호스트는 거부"""
+    path = tmp_path / "leases.db"
+    await SqliteLeaseStore(path, host="pi-1").close()
+    await SqliteLeaseStore(path, host="pi-1").close()
+    with pytest.raises(RuntimeError, match="belongs to host 'pi-1'"):
+        SqliteLeaseStore(path, host="pi-2")
+
+
+@pytest.mark.asyncio
+async def test_postgrest_claim_is_one_call():
+    server = FakePostgrest(functions=_lease_functions(MemoryLeaseStore()))
+    store = PostgrestLeaseStore("http://db", "jwt", transport=server.transport())
+    try:
+        assert (await store.acquire(7, "node-a", 30)).held_by("node-a")
+        assert await store.renew([], "node-a", 30) == []
+    finally:
+        await store.close()
+    request, = server.requests
+    assert request.url.path == "/rest/v1/rpc/claim_print_lease"
+    assert json.loads(request.content) == {"lease_key": "7", "lease_owner": "node-a", "ttl": 30}
+
+
+def _record(laundry_id, amount=1):
+    return {'id': laundry_id, 'amount': amount, 'requested_by': 'user-1'}
+
+
+@pytest.mark.asyncio
+async def test_claims_are_taken_in_the_background():
+    """claim 은 저장소를 기다리지 않고, 얻은 주문은 sweep 이 submit 으로 넘김"""
+    store = MemoryLeaseStore()
+    a = ClusterNode(store, "node-a")
+    b = ClusterNode(store, "node-b")
+    assert not a.claim(_record(1)) and not b.claim(_record(1))
+    assert a.stats()["claims"] == 0
+
+    submitted = []
+    assert await a.sweep(submitted.append) == 1
+    assert await b.sweep(pytest.fail) == 0
+    assert submitted == [_record(1)] and a.held == ["1"]
+    # 제출된 주문이 다시 claim 을 거치면 바로 출력
+    assert a.claim(_record(1))
+    a.finished(1)
+    assert not a.claim(_record(1))  # 완료를 알리기 전에 다시 받아도 출력하지 않음
+    await a.flush()
+    assert await a.sweep(pytest.fail) == 0
+    assert a.stats()["watched"] == 0 and a.stats()["ending"] == 0
+
+
+@pytest.mark.asyncio
+async def test_crashed_node_orders_are_taken_over():
+    clock = FakeClock()
+    store = MemoryLeaseStore(clock)
+    a = ClusterNode(store, "node-a", ttl=30, clock=clock)
+    b = ClusterNode(store, "node-b", ttl=30, clock=clock)
+    for record in (_record(1), _record(2)):
+        a.claim(record)
+        b.claim(record)
+    assert await a.sweep(lambda record: None) == 2
+    assert await b.sweep(pytest.fail) == 0
+    a.finished(1)
+    await a.flush()
+
+    submitted = []
+    assert await b.sweep(submitted.append) == 0
+    # node-a 가 멈춰 임대를 갱신하지 못함
+    clock.now += 31
+    assert await b.sweep(submitted.append) == 1
+    assert [record['id'] for record in submitted] == [2]
+    assert b.held == ["2"]
+    assert b.stats()["reclaimed"] == 1
+
+    # 되살아난 node-a 는 빼앗긴 임대를 잃고, 다시 요청해도 얻지 못함
+    await a.renew()
+    assert a.held == [] and a.stats()["lost"] == 1
+    assert not a.claim(_record(2))
+    assert await a.sweep(pytest.fail) == 0
+
+
+@pytest.mark.asyncio
+async def test_busy_node_defers_to_idle_node():
+    store = MemoryLeaseStore()
+    busy = ClusterNode(store, "busy", max_backlog=2)
+    idle = ClusterNode(store, "idle", max_backlog=2)
+    assert not busy.claim(_record(1), load=2)
+    assert not idle.claim(_record(1), load=0)
+    assert await busy.sweep(pytest.fail, load=lambda: 2) == 0
+    assert await idle.sweep(lambda record: None) == 1
+    idle.finished(1)
+    await idle.flush()
+    # 미뤘던 주문은 이미 출력되어 다시 가져가지 않음
+    assert await busy.sweep(lambda record: pytest.fail("printed twice")) == 0
+    assert busy.stats()["watched"] == 0 and busy.stats()["deferred"] == 1
+
+
+@pytest.mark.asyncio
+async def test_unqueued_order_is_released_for_others():
+    store = MemoryLeaseStore()
+    a = ClusterNode(store, "node-a")
+    b = ClusterNode(store, "node-b")
+    a.claim(_record(1))
+
+    def full(record):
+        raise PrintQueueFull("Print queue is full")
+
+    assert await a.sweep(full) == 0
+    await a.flush()
+    b.claim(_record(1))
+    assert await b.sweep(lambda record: None) == 1
+
+
+@pytest.mark.asyncio
+async def test_locked_lease_file_does_not_block_the_loop(tmp_path):
+    """다른 프로세스가 임대 파일을 잠가도 주문 수신과 이벤트 루프는 멈추지 않음"""
+    path = tmp_path / "leases.db"
+    store = SqliteLeaseStore(path, busy_timeout=2.0)
+    blocker = sqlite3.connect(path, isolation_level=None)
+    blocker.execute("BEGIN IMMEDIATE")
+    node = ClusterNode(store, "node-a")
+    submitted = []
+    node.start(submitted.append)
+    try:
+        start = time.perf_counter()
+        assert not node.claim(_record(1))
+        ticks = 0
+        while time.perf_counter() - start < 0.3:
+            await asyncio.sleep(0.01)
+            ticks += 1
+        assert ticks >= 10 and not submitted
+        blocker.execute("COMMIT")
+        while not submitted:
+            await asyncio.sleep(0.01)
+    finally:
+        await node.stop()
+        blocker.close()
+        await store.close()
+    assert node.held == ["1"]
+
+
+def _render(data, text, raster_mode):
+    return data, 0.0, 0.0, (0, {"size": 0, "hits": 0, "misses": 0, "evictions": 0})
+
+
+@pytest.mark.asyncio
+async def test_services_print_each_order_once():
+    """다른 호스트에서 같은 이벤트를 받는 두 노드가 주문을 나눠서 한 번씩만 출력"""
+    server = FakePostgrest(functions=_lease_functions(MemoryLeaseStore()), latency=0.002)
+    stores = [PostgrestLeaseStore("http://db", "jwt", transport=server.transport()) for _ in range(2)]
+    printers = [StubPrinter(print_time=0.01), StubPrinter(print_time=0.01)]
+    services = [
+        RealtimeService("url", "jwt", printer, StubSupaDB(),
+                        pipeline=LabelPipeline(executor=ThreadPoolExecutor(2), render=_render),
+                        cluster=ClusterNode(store, f"node-{index}", ttl=5, max_backlog=1))
+        for index, (printer, store) in enumerate(zip(printers, stores))
+    ]
+    for service in services:
+        service.print_queue.start()
+        service.cluster.start(service._submit_record, lambda service=service: service.print_queue.depth)
+    try:
+        for laundry_id in range(1, 21):
+            for service in services:
+                service._callback_wrapper({'data': {'record': _record(laundry_id, amount=2)}})
+            await asyncio.sleep(0)
+        while (sum(len(printer.jobs) for printer in printers) < 20
+               or any(service.cluster.held or service.print_queue.depth for service in services)):
+            await asyncio.sleep(0.01)
+    finally:
+        for service in services:
+            await service.cluster.stop()
+            await service.print_queue.stop()
+            await service.cluster.flush()
+        for store in stores:
+            await store.close()
+
+    printed = sorted(job[0] for printer in printers for job in printer.jobs)
+    assert printed == sorted(f"{laundry_id}.1" for laundry_id in range(1, 21))
+    assert all(len(printer.jobs) >= 5 for printer in printers)
+
+
+async def _simulate(nodes, orders, interval, print_time, jitter):
+    """Broadcast every order to all nodes (each with its own delay) and print what they claim."""
+    loop = asyncio.get_running_loop()
+    rng = random.Random(len(nodes))
+    printed = []
+    backlogs = {node.node_id: asyncio.Queue() for node in nodes}
+
+    async def printer(node):
+        backlog = backlogs[node.node_id]
+        while True:
+            record = await backlog.get()
+            await asyncio.sleep(print_time)
+            printed.append(record['id'])
+            node.finished(record['id'])
+
+    def deliver(node, record):
+        backlog = backlogs[node.node_id]
+        if node.claim(record, load=backlog.qsize()):
+            backlog.put_nowait(record)
+
+    workers = [asyncio.create_task(printer(node)) for node in nodes]
+    for node in nodes:
+        node.start(backlogs[node.node_id].put_nowait, backlogs[node.node_id].qsize)
+    try:
+        for laundry_id in range(orders):
+            record = _record(laundry_id)
+            for node in nodes:
+                loop.call_later(rng.uniform(0, jitter), deliver, node, record)
+            await asyncio.sleep(interval)
+        while len(printed) < orders:
+            await asyncio.sleep(0.01)
+    finally:
+        for node in nodes:
+            await node.stop()
+        for worker in workers:
+            worker.cancel()
+    return printed
+
+
+@pytest.mark.benchmark
+@pytest.mark.asyncio
+async def test_lease_contention(tmp_path):
+    """노드 수에 따른 임대 경합률과 획득 시간 (모든 노드가 같은 주문을 받음)"""
+    results = {}
+    for kind in ("memory", "sqlite", "postgrest"):
+        for count in (2, 4, 8):
+            shared = MemoryLeaseStore()
+            path = tmp_path / f"leases-{count}.db"
+            # 데이터베이스 왕복 1ms 를 가정한 여러 호스트
+            server = FakePostgrest(functions=_lease_functions(shared), latency=0.001)
+            stores = [shared if kind == "memory" else SqliteLeaseStore(path) if kind == "sqlite"
+                      else PostgrestLeaseStore("http://db", "jwt", transport=server.transport())
+                      for _ in range(count)]
+            nodes = [ClusterNode(store, f"node-{index}", ttl=5, renew_interval=0.05, max_backlog=1)
+                     for index, store in enumerate(stores)]
+            # 주문 간격 2ms, 노드마다 처리 용량의 약 90% 를 사용하도록 출력 시간 설정
+            start = time.perf_counter()
+            printed = await _simulate(nodes, orders=300, interval=0.002, print_time=0.0018 * count,
+                                      jitter=0.001)
+            elapsed = time.perf_counter() - start
+            for store in stores:
+                await store.close()
+
+            assert sorted(printed) == list(range(300))
+            stats = [node.stats() for node in nodes]
+            claims = sum(stat["claims"] for stat in stats)
+            shares = [stat["acquired"] for stat in stats]
+            # 바쁜 노드는 주문을 미루므로 작업이 노드들에 고르게 나뉨
+            assert min(shares) > 300 / count / 3
+            results[(kind, count)] = (
+                claims / 300,
+                sum(stat["contended"] + stat["skipped"] for stat in stats) / claims,
+                sum(stat["claim_ms"] * stat["claims"] for stat in stats) / claims,
+                shares,
+                elapsed,
+            )
+
+    logging.info("lease contention over 300 orders: " + "; ".join(
+        f"{kind} x{count}: {per_order:.1f} claims/order, lost {contention:.0%}, claim {claim_ms:.3f}ms, "
+        f"per node {share}, {elapsed:.2f}s"
+        for (kind, count), (per_order, contention, claim_ms, share, elapsed) in results.items()))
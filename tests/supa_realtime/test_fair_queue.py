@@ -0,0 +1,260 @@
+import asyncio
+import logging
+import random
+import statistics
+
+import pytest
+
+from src.supa_realtime.fair_queue import FairPrintQueue, FairScheduler
+from src.supa_realtime.print_queue import PrintJob, PrintQueue
+from src.supa_realtime.realtime_service import RealtimeService
+from tests.supa_realtime.fakes import FaultyPrinter, PagePrinter, StubSupaDB
+
+
+class FakeClock:
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def _job(job_id, user, amount=1, copies=1, priority=None):
+    record = {'id': job_id, 'amount': amount, 'requested_by': user}
+    if priority is not None:
+        record['priority'] = priority
+    return PrintJob(job_id, record, copies=copies, numbers=list(range(1, amount + 1)))
+
+
+def _drain(scheduler):
+    """Hand out every label, printing each slice right away."""
+    order = []
+    while True:
+        grant = scheduler.next(lambda job: job.remaining())
+        if grant is None:
+            return order
+        job, indexes = grant
+        order.append((job.job_id, len(indexes)))
+        job.completed_pages += indexes
+        if not job.remaining():
+            scheduler.discard(job)
+
+
+def test_round_robin_between_requesters():
+    scheduler = FairScheduler(quantum=1)
+    scheduler.push(_job("big", "user-a", amount=5))
+    scheduler.push(_job("small", "user-b", amount=2))
+    scheduler.push(_job("next", "user-b", amount=1))
+    assert _drain(scheduler) == [("big", 1), ("small", 1), ("big", 1), ("small", 1), ("big", 1), ("next", 1),
+                                 ("big", 1), ("big", 1)]
+    assert scheduler.stats()["labels"] == {"user-a": 5, "user-b": 3}
+    assert len(scheduler) == 0
+
+
+def test_quantum_sets_slice_size():
+    scheduler = FairScheduler(quantum=3)
+    scheduler.push(_job(1, "user-a", amount=7))
+    scheduler.push(_job(2, "user-b", amount=2))
+    assert _drain(scheduler) == [(1, 3), (2, 2), (1, 3), (1, 1)]
+
+
+def test_priority_class_goes_first():
+    scheduler = FairScheduler()
+    scheduler.push(_job(1, "user-a", amount=2, priority=1))
+    scheduler.push(_job(2, "user-b", amount=2, priority=0))
+    assert _drain(scheduler) == [(2, 1), (2, 1), (1, 1), (1, 1)]
+
+
+def test_requester_over_quota_yields():
+    clock = FakeClock()
+    scheduler = FairScheduler(quota=3, quota_window=60, clock=clock)
+    scheduler.push(_job(1, "user-a", amount=6))
+    # 혼자일 때는 할당량을 넘어도 계속 출력
+    assert _drain_labels(scheduler, 4) == [1, 1, 1, 1]
+    assert scheduler.stats()["over_quota"] == 1
+
+    scheduler.push(_job(2, "user-b", amount=2))
+    assert _drain_labels(scheduler, 2) == [2, 2]
+    clock.now += 61
+    scheduler.push(_job(3, "user-b", amount=2))
+    assert _drain_labels(scheduler, 2) == [1, 3]
+
+
+def test_idle_requesters_are_forgotten_after_quota_window():
+    clock = FakeClock()
+    scheduler = FairScheduler(quota=5, quota_window=60, clock=clock)
+    for index in range(100):
+        scheduler.push(_job(index, f"user-{index}"))
+    _drain(scheduler)
+    assert scheduler.stats()["tracked"] == 100  # 할당량 창 안에서는 기록을 유지
+
+    clock.now += 61
+    scheduler.push(_job("next", "user-0"))
+    assert scheduler.stats()["tracked"] == 1
+
+
+def _drain_labels(scheduler, count):
+    order = []
+    for _ in range(count):
+        job, indexes = scheduler.next(lambda job: job.remaining())
+        order.append(job.job_id)
+        job.completed_pages += indexes
+        if not job.remaining():
+            scheduler.discard(job)
+    return order
+
+
+async def _render(job):
+    return [f"{job.job_id}.{number}" for number in job.pending_numbers()]
+
+
+@pytest.mark.asyncio
+async def test_small_order_does_not_wait_for_large_one():
+    printer = PagePrinter(print_time=0.005)
+    queue = FairPrintQueue(printer, _render)
+    queue.start()
+    try:
+        large = queue.submit_nowait(_job("large", "user-a", amount=40))
+        await asyncio.sleep(0.05)
+        small = queue.submit_nowait(_job("small", "user-b"))
+        await small.result()
+        assert not large.done
+        await large.result()
+    finally:
+        await queue.stop()
+
+    labels = printer.jobs[0]
+    assert len(printer.jobs) == 1  # 주문이 바뀌어도 출력 세션은 하나
+    assert labels.index("small.1") - labels.index("large.1") <= 12
+    assert sorted(labels) == sorted([f"large.{n}" for n in range(1, 41)] + ["small.1"])
+    assert queue.stats()["completed"] == 2
+
+
+@pytest.mark.asyncio
+async def test_copies_change_starts_new_session():
+    printer = PagePrinter(print_time=0)
+    queue = FairPrintQueue(printer, _render)
+    jobs = [queue.submit_nowait(_job(1, "user-a", amount=2)),
+            queue.submit_nowait(_job(2, "user-b", amount=2, copies=3))]
+    queue.start()
+    try:
+        await asyncio.gather(*(job.result() for job in jobs))
+    finally:
+        await queue.stop()
+    # 차례는 그대로 지키고, 매수가 바뀔 때마다 세션을 나눔
+    assert printer.jobs == [["1.1"], ["2.1"], ["1.2"], ["2.2"]]
+
+
+@pytest.mark.asyncio
+async def test_fault_fails_orders_on_the_printer_only():
+    printer = FaultyPrinter(fault="Printer cover is open", fail_after=1)
+
+    def recovered(job):
+        printer.fault = None
+
+    queue = FairPrintQueue(printer, _render, on_finished=recovered)
+    first = queue.submit_nowait(_job(1, "user-a", amount=2))
+    second = queue.submit_nowait(_job(2, "user-b", amount=2, copies=2))
+    queue.start()
+    try:
+        with pytest.raises(Exception, match="cover is open"):
+            await first.result()
+        assert first.completed_pages == [0]
+        assert await second.result() == [0, 1]
+    finally:
+        await queue.stop()
+
+
+@pytest.mark.asyncio
+async def test_order_without_labels_completes_at_once():
+    """출력할 라벨이 없는 주문이 스케줄러에 남아 작업자를 붙잡지 않음"""
+    printer = PagePrinter(print_time=0)
+    queue = FairPrintQueue(printer, _render)
+    queue.start()
+    try:
+        empty = queue.submit_nowait(_job("empty", "user-a", amount=0))
+        assert await asyncio.wait_for(empty.result(), 1) == []
+        assert len(queue.scheduler) == 0
+        job = queue.submit_nowait(_job("next", "user-b", amount=2))
+        assert await asyncio.wait_for(job.result(), 1) == [0, 1]
+    finally:
+        await queue.stop()
+    assert printer.jobs == [["next.1", "next.2"]]
+    assert queue.stats()["completed"] == 2
+
+
+@pytest.mark.asyncio
+async def test_each_order_is_rendered_once_across_slices():
+    """조각마다 다시 렌더링하지 않고 주문마다 하나의 스트림에서 이어서 꺼냄"""
+    rendered = []
+
+    async def render(job):
+        rendered.append(job.job_id)
+        for number in job.pending_numbers():
+            await asyncio.sleep(0)
+            yield f"{job.job_id}.{number}"
+
+    async def render_stream(job):
+        return render(job)
+
+    printer = PagePrinter(print_time=0)
+    queue = FairPrintQueue(printer, render_stream)
+    jobs = [queue.submit_nowait(_job("a", "user-a", amount=3)), queue.submit_nowait(_job("b", "user-b", amount=3))]
+    queue.start()
+    try:
+        await asyncio.gather(*(job.result() for job in jobs))
+    finally:
+        await queue.stop()
+    assert printer.jobs == [["a.1", "b.1", "a.2", "b.2", "a.3", "b.3"]]
+    assert rendered == ["a", "b"]
+    assert not queue._streams
+
+
+def test_service_uses_fair_queue(caplog):
+    scheduler = FairScheduler(quantum=2)
+    service = RealtimeService("url", "jwt", PagePrinter(print_time=0), StubSupaDB(), fair=scheduler,
+                              max_batch=20)
+    assert isinstance(service.print_queue, FairPrintQueue)
+    assert service.print_queue.scheduler is scheduler
+    assert "max_batch and batch_window are ignored" in caplog.text
+
+
+def _percentile(values, percent):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percent / 100))]
+
+
+@pytest.mark.benchmark
+@pytest.mark.asyncio
+async def test_per_user_latency():
+    """200장 주문 뒤에 들어온 작은 주문들의 사용자별 대기 시간 (FIFO 대비)"""
+    label_time = 0.002
+    results = {}
+    for name in ("fifo", "fair"):
+        printer = PagePrinter(print_time=label_time)
+        queue = PrintQueue(printer, _render) if name == "fifo" else FairPrintQueue(printer, _render)
+        rng = random.Random(7)
+        latencies = {}
+        queue.start()
+        try:
+            jobs = [queue.submit_nowait(_job("bulk", "bulk-user", amount=200))]
+            for index in range(40):
+                await asyncio.sleep(rng.uniform(0, 0.02))
+                user = f"user-{index % 4}"
+                jobs.append(queue.submit_nowait(_job(f"{user}.{index}", user, amount=rng.randint(1, 3))))
+            await asyncio.gather(*(job.result() for job in jobs))
+        finally:
+            await queue.stop()
+        for job in jobs:
+            latencies.setdefault(job.record['requested_by'], []).append(job.finished_at - job.submitted_at)
+        results[name] = {user: (statistics.median(values), _percentile(values, 95))
+                         for user, values in sorted(latencies.items())}
+
+    logging.info("latency p50/p95 in labels (label = 2ms): " + "; ".join(
+        f"{name} " + ", ".join(f"{user} {p50 / label_time:.0f}/{p95 / label_time:.0f}"
+                               for user, (p50, p95) in users.items())
+        for name, users in results.items()))
+    small_users = [f"user-{index}" for index in range(4)]
+    # 작은 주문은 큰 주문 전체가 아니라 몇 장만 기다림
+    assert max(results["fair"][user][1] for user in small_users) < 50 * label_time
+    assert min(results["fifo"][user][0] for user in small_users) > 100 * label_time
@@ -0,0 +1,202 @@
+import logging
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.supa_realtime.job_journal import JobJournal, LabelState, label_id
+from src.supa_realtime.label_pipeline import LabelPipeline
+from src.supa_realtime.realtime_service import RealtimeService
+from tests.supa_realtime.fakes import StubPrinter, StubSupaDB
+
+
+def _record(laundry_id, amount=3):
+    return {'id': laundry_id, 'amount': amount, 'requested_by': 'user-1'}
+
+
+def test_accept_and_resume_after_restart(tmp_path):
+    """재시작하면 확인되지 않은 라벨만 다시 출력"""
+    path = tmp_path / "journal.db"
+    journal = JobJournal(path)
+    assert journal.accept(7, _record(7), 1, [1, 2, 3]) == [1, 2, 3]
+    journal.mark_sent("7.1")
+    journal.mark_confirmed("7.1")
+    journal.mark_sent("7.2")
+    journal.close()
+
+    journal = JobJournal(path)
+    try:
+        assert journal.label_state("7.1") is LabelState.CONFIRMED
+        assert journal.label_state("7.2") is LabelState.SENT
+        assert journal.unfinished() == [(_record(7), 1, [2, 3])]
+
+        # 재전송된 이벤트는 남은 라벨만 돌려줌
+        assert journal.accept(7, _record(7), 1, [1, 2, 3]) == [2, 3]
+        journal.mark_confirmed("7.2")
+        journal.mark_confirmed("7.3")
+        assert journal.accept(7, _record(7), 1, [1, 2, 3]) == []
+        assert journal.unfinished() == []
+    finally:
+        journal.close()
+
+
+def test_transitions_are_group_committed(tmp_path):
+    journal = JobJournal(tmp_path / "journal.db", flush_interval=10)
+    try:
+        journal.accept(1, _record(1, 100), 1, range(1, 101))
+        for number in range(1, 101):
+            journal.mark_sent(label_id(1, number))
+            journal.mark_confirmed(label_id(1, number))
+        commits = journal.commits
+        journal.flush()
+
+        assert journal.commits == commits + 1
+        assert journal.stats()["updates"] == 200
+    finally:
+        journal.close()
+
+
+def test_prune_keeps_unfinished_jobs(tmp_path):
+    journal = JobJournal(tmp_path / "journal.db")
+    try:
+        journal.accept(1, _record(1, 1), 1, [1])
+        journal.accept(2, _record(2, 1), 1, [1])
+        journal.mark_confirmed("1.1")
+        journal.prune(max_age=0)
+
+        assert journal.label_state("1.1") is None
+        assert journal.label_state("2.1") is LabelState.ACCEPTED
+    finally:
+        journal.close()
+
+
+def test_failed_jobs_are_given_up(tmp_path):
+    """여러 번 실패한 작업은 재시작할 때마다 다시 출력하지 않고 정리됨"""
+    journal = JobJournal(tmp_path / "journal.db", max_failures=2)
+    try:
+        journal.accept(1, _record(1, 2), 1, [1, 2])
+        journal.accept(2, _record(2, 1), 1, [1])
+        journal.mark_confirmed("1.1")
+        assert journal.mark_failed(1) == 1
+        assert journal.unfinished() == [(_record(1, 2), 1, [2]), (_record(2, 1), 1, [1])]
+        assert journal.mark_failed(1) == 2
+        assert journal.unfinished() == [(_record(2, 1), 1, [1])]
+
+        journal.prune(max_age=0)
+        assert journal.label_state("1.2") is None
+        assert journal.label_state("2.1") is LabelState.ACCEPTED
+    finally:
+        journal.close()
+
+
+def test_journal_without_failures_column_is_upgraded(tmp_path):
+    path = tmp_path / "journal.db"
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE jobs (job_id TEXT PRIMARY KEY, record TEXT NOT NULL, copies INTEGER NOT NULL, "
+                 "created_at REAL NOT NULL)")
+    conn.close()
+    journal = JobJournal(path)
+    try:
+        journal.accept(1, _record(1, 1), 1, [1])
+        assert journal.mark_failed(1) == 1
+    finally:
+        journal.close()
+
+
+def _payload(laundry_id, amount=3):
+    return {'data': {'record': _record(laundry_id, amount)}}
+
+
+@pytest.mark.asyncio
+async def test_service_skips_redelivered_and_resumes(tmp_path):
+    path = tmp_path / "journal.db"
+    journal = JobJournal(path)
+    journal.accept(5, _record(5, 4), 1, [1, 2, 3, 4])
+    journal.mark_confirmed("5.1")
+    journal.mark_confirmed("5.2")
+    journal.close()
+
+    journal = JobJournal(path)
+    printer = StubPrinter(print_time=0)
+    service = RealtimeService("url", "jwt", printer, StubSupaDB(), journal=journal,
+                              pipeline=LabelPipeline(executor=ThreadPoolExecutor(2)))
+    service.print_queue.start()
+    try:
+        # 이전 실행에서 남은 라벨 재개
+        service._resume_unfinished()
+        # 진행 중인 주문의 재전송은 무시
+        service._callback_wrapper(_payload(5, 4))
+        assert service.print_queue.depth == 1
+
+        assert await service._handle_print_request(_payload(6, 2)) == [0, 1]
+        # 이미 출력된 주문의 재전송도 무시
+        assert await service._handle_print_request(_payload(6, 2)) == []
+    finally:
+        await service.print_queue.stop()
+        journal.close()
+
+    assert [len(images) for images in printer.jobs] == [2, 2]
+    journal = JobJournal(path)
+    assert journal.unfinished() == []
+    journal.close()
+
+
+@pytest.mark.asyncio
+async def test_service_counts_failed_jobs(tmp_path):
+    journal = JobJournal(tmp_path / "journal.db", max_failures=1)
+    printer = StubPrinter(print_time=0)
+    service = RealtimeService("url", "jwt", printer, StubSupaDB(), journal=journal,
+                              pipeline=LabelPipeline(executor=ThreadPoolExecutor(2)))
+
+    async def render(job):
+        raise KeyError("requested_by")
+
+    service.print_queue.render = render
+    service.print_queue.start()
+    try:
+        with pytest.raises(Exception):
+            await service._handle_print_request(_payload(8, 2))
+        # 종료로 멈춘 작업은 실패로 세지 않음
+        service._callback_wrapper(_payload(9, 1))
+    finally:
+        await service.print_queue.stop()
+    try:
+        assert journal.unfinished() == [(_record(9, 1), 1, [1])]
+    finally:
+        journal.close()
+
+
+@pytest.mark.benchmark
+def test_journal_overhead(tmp_path):
+    """라벨 수천 장 기준 저널 기록 비용 (그룹 커밋 vs 라벨별 커밋)"""
+    orders, amount = 1000, 5
+    journal = JobJournal(tmp_path / "journal.db")
+    try:
+        start = time.perf_counter()
+        for order in range(orders):
+            numbers = journal.accept(order, _record(order, amount), 1, range(1, amount + 1))
+            for number in numbers:
+                journal.mark_sent(label_id(order, number))
+                journal.mark_confirmed(label_id(order, number))
+        journal.flush()
+        grouped = time.perf_counter() - start
+    finally:
+        journal.close()
+
+    conn = sqlite3.connect(tmp_path / "naive.db", isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("CREATE TABLE labels (label_id TEXT PRIMARY KEY, state INTEGER)")
+    start = time.perf_counter()
+    for order in range(orders):
+        for number in range(1, amount + 1):
+            for state in range(3):
+                conn.execute("INSERT OR REPLACE INTO labels VALUES (?, ?)", (label_id(order, number), state))
+    naive = time.perf_counter() - start
+    conn.close()
+
+    labels = orders * amount
+    logging.info(f"journal overhead for {labels} labels: group commit {grouped * 1e6 / labels:.1f}us/label, "
+                 f"commit per update {naive * 1e6 / labels:.1f}us/label")
+    # 시간당 수천 장이면 라벨당 1ms 도 무시할 수 있는 수준
+    assert grouped / labels < 0.001
@@ -0,0 +1,84 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.niimbot.async_niimbot_printer import AsyncNiimbotPrint
+from src.niimbot.raster import pack_bitmap
+from src.qr_generator.layout import ImageLayout
+from src.supa_realtime.label_pipeline import LabelPipeline, render_label
+from tests.niimbot.emulator import FakeAsyncPrinterTransport, FakePrinterTransport
+
+
+def _labels(count):
+    return [(f"123.{number}", f"홍길동 {number}") for number in range(1, count + 1)]
+
+
+@pytest.mark.asyncio
+async def test_process_pool_renders_in_order():
+    pipeline = LabelPipeline(lookahead=2)
+    try:
+        pages = [page async for page in pipeline.pages(_labels(3))]
+        # 스레드가 돌고 있는 프로세스를 fork 하지 않음
+        assert pipeline._pool()._mp_context.get_start_method() != "fork"
+    finally:
+        pipeline.close()
+
+    for page, (data, text) in zip(pages, _labels(3)):
+        assert page.data == pack_bitmap(ImageLayout.create_label_bitmap(data, text)).data
+    assert pipeline.stats()["labels"] == 3
+
+
+@pytest.mark.asyncio
+async def test_lookahead_bounds_labels_in_flight():
+    """미리 렌더링하는 라벨 수는 lookahead 를 넘지 않음"""
+    lock = threading.Lock()
+    started = []
+
+    def render(data, text):
+        with lock:
+            started.append(data)
+        return data, 0.0, 0.0, (0, {})
+
+    pipeline = LabelPipeline(lookahead=3, executor=ThreadPoolExecutor(4), render=render)
+    consumed = 0
+    async for page in pipeline.pages(_labels(10)):
+        consumed += 1
+        assert len(started) <= consumed + 3
+        assert page == f"123.{consumed}"
+
+
+@pytest.mark.benchmark
+@pytest.mark.asyncio
+async def test_pipeline_overlaps_render_and_print():
+    """렌더링과 출력을 겹쳐서 프린터만 병목이 되도록"""
+    count = 8
+    transport = FakeAsyncPrinterTransport(FakePrinterTransport(print_time=0.05, read_timeout=0.05))
+    printer = await AsyncNiimbotPrint(transport=transport, rows_per_second=24000).connect()
+    pipeline = LabelPipeline(lookahead=3)
+    try:
+        # 파이프라인 없이: 렌더링이 끝나야 출력, 출력이 끝나야 다음 렌더링
+        start = time.perf_counter()
+        await printer.print_pages(render_label(data, text)[0] for data, text in _labels(count))
+        sequential = time.perf_counter() - start
+
+        # 풀 기동 시간은 제외
+        [page async for page in pipeline.pages(_labels(1))]
+        pipeline.labels = 0
+        pipeline.render_time = pipeline.encode_time = pipeline.print_time = pipeline.stall_time = 0.0
+
+        start = time.perf_counter()
+        await printer.print_pages(pipeline.pages(_labels(count)))
+        pipelined = time.perf_counter() - start
+    finally:
+        pipeline.close()
+        printer.close()
+
+    stats = pipeline.stats()
+    logging.info(f"{count} labels: sequential {sequential:.2f}s, pipelined {pipelined:.2f}s, stages {stats}")
+    assert transport.printer.pages_printed == count * 2
+    # 첫 장을 제외하면 프린터가 렌더링을 기다리지 않음
+    assert stats["stall"] * count < stats["render"] + stats["encode"] + 0.05
+    assert stats["print"] > stats["render"]
@@ -0,0 +1,200 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.niimbot.async_niimbot_printer import AsyncNiimbotPrint
+from src.niimbot.raster import PackedImage
+from src.supa_realtime.label_pipeline import LabelPipeline
+from src.supa_realtime.print_queue import PrintJob, PrintQueue
+from src.supa_realtime.printer_pool import PrinterPool
+from src.supa_realtime.realtime_service import RealtimeService
+from tests.niimbot.emulator import FakeAsyncPrinterTransport, FakePrinterTransport
+from tests.supa_realtime.fakes import FaultyPrinter, PagePrinter, StubPrinter, StubSupaDB
+
+
+async def _render(job):
+    return [f"{job.job_id}.{number}" for number in job.pending_numbers()]
+
+
+def _job(job_id, amount=2, copies=1):
+    return PrintJob(job_id, {'id': job_id, 'amount': amount}, copies=copies, numbers=list(range(1, amount + 1)))
+
+
+@pytest.mark.asyncio
+async def test_queued_orders_print_in_one_session():
+    printer = StubPrinter(print_time=0)
+    finished = []
+    queue = PrintQueue(printer, _render, on_finished=lambda job: finished.append(job.job_id), max_batch=10)
+    jobs = [queue.submit_nowait(_job(i)) for i in range(5)]
+    queue.start()
+    try:
+        assert [await job.result() for job in jobs] == [[0, 1]] * 5
+    finally:
+        await queue.stop()
+
+    assert printer.jobs == [[f"{i}.{n}" for i in range(5) for n in (1, 2)]]
+    assert finished == [0, 1, 2, 3, 4]
+    stats = queue.stats()
+    assert (stats["batches"], stats["largest_batch"], stats["sessions_saved"]) == (1, 5, 4)
+
+
+@pytest.mark.asyncio
+async def test_each_order_completes_with_its_last_label():
+    printer = PagePrinter(print_time=0.01)
+    queue = PrintQueue(printer, _render, max_batch=10)
+    jobs = [queue.submit_nowait(_job(i, amount=3)) for i in range(3)]
+    queue.start()
+    try:
+        await jobs[0].result()
+        # 첫 주문이 끝났을 때 나머지 주문은 아직 출력 중
+        assert not jobs[1].done and not jobs[2].done
+        await asyncio.gather(*(job.result() for job in jobs))
+    finally:
+        await queue.stop()
+    assert jobs[0].finished_at < jobs[1].finished_at < jobs[2].finished_at
+    assert len(printer.jobs) == 1
+
+
+@pytest.mark.asyncio
+async def test_window_collects_orders_arriving_together():
+    for window, sessions in ((0.1, 1), (0.0, 2)):
+        printer = StubPrinter(print_time=0)
+        queue = PrintQueue(printer, _render, max_batch=10, batch_window=window)
+        queue.start()
+        try:
+            first = queue.submit_nowait(_job(1))
+            await asyncio.sleep(0.02)
+            second = queue.submit_nowait(_job(2))
+            await asyncio.gather(first.result(), second.result())
+        finally:
+            await queue.stop()
+        assert len(printer.jobs) == sessions
+
+
+@pytest.mark.asyncio
+async def test_orders_with_other_copies_keep_their_turn():
+    printer = StubPrinter(print_time=0)
+    queue = PrintQueue(printer, _render, max_batch=10)
+    jobs = [queue.submit_nowait(_job(i, amount=1, copies=2 if i == 2 else 1)) for i in range(5)]
+    queue.start()
+    try:
+        await asyncio.gather(*(job.result() for job in jobs))
+    finally:
+        await queue.stop()
+    assert printer.jobs == [["0.1", "1.1"], ["2.1"], ["3.1", "4.1"]]
+
+
+@pytest.mark.asyncio
+async def test_bad_order_fails_alone():
+    async def render(job):
+        if job.job_id == 1:
+            raise KeyError("requested_by")
+        return await _render(job)
+
+    printer = StubPrinter(print_time=0)
+    queue = PrintQueue(printer, render, max_batch=10)
+    jobs = [queue.submit_nowait(_job(i)) for i in range(3)]
+    queue.start()
+    try:
+        with pytest.raises(KeyError):
+            await jobs[1].result()
+        await jobs[0].result()
+        await jobs[2].result()
+    finally:
+        await queue.stop()
+    assert printer.jobs == [["0.1", "0.2", "2.1", "2.2"]]
+
+
+@pytest.mark.asyncio
+async def test_printer_fault_fails_unprinted_orders():
+    printer = FaultyPrinter(fault="Printer cover is open", fail_after=3)
+    finished = []
+    queue = PrintQueue(printer, _render, on_finished=finished.append, max_batch=10)
+    jobs = [queue.submit_nowait(_job(i)) for i in range(3)]
+    queue.start()
+    try:
+        assert await jobs[0].result() == [0, 1]
+        for job in jobs[1:]:
+            with pytest.raises(Exception, match="cover is open"):
+                await job.result()
+    finally:
+        await queue.stop()
+    assert jobs[1].completed_pages == [0] and jobs[2].completed_pages == []
+    assert len(finished) == 3
+
+
+@pytest.mark.asyncio
+async def test_pool_moves_rest_of_batch_in_order():
+    broken = FaultyPrinter(fault="Printer cover is open", fail_after=3)
+    spare = FaultyPrinter(print_time=0.001)
+    pool = PrinterPool([broken, spare], _render, recovery_interval=60, max_batch=10)
+    jobs = [pool.submit_nowait(_job(i)) for i in range(4)]
+    pool.start()
+    try:
+        await asyncio.gather(*(job.result() for job in jobs))
+    finally:
+        await pool.stop()
+    assert spare.jobs == [["1.2", "2.1", "2.2", "3.1", "3.2"]]
+    assert pool.stats()["printers"]["printer-0"]["faults"] == 1
+
+
+def _render_label(data, text, raster_mode):
+    return data, 0.0, 0.0, (0, {"size": 0, "hits": 0, "misses": 0, "evictions": 0})
+
+
+@pytest.mark.asyncio
+async def test_service_looks_up_batch_users_once():
+    printer = StubPrinter(print_time=0)
+    supa_api = StubSupaDB()
+    service = RealtimeService("url", "jwt", printer, supa_api, max_batch=10,
+                              pipeline=LabelPipeline(executor=ThreadPoolExecutor(2), render=_render_label))
+    for laundry_id in range(1, 5):
+        service._callback_wrapper({'data': {'record': {'id': laundry_id, 'amount': 1,
+                                                       'requested_by': f"user-{laundry_id % 2}"}}})
+    service.print_queue.start()
+    try:
+        while service.print_queue.depth or service._active_jobs:
+            await asyncio.sleep(0.01)
+    finally:
+        await service.print_queue.stop()
+    assert supa_api.profiles.prefetched == [["user-1", "user-0", "user-1", "user-0"]]
+    assert printer.jobs == [["1.1", "2.1", "3.1", "4.1"]]
+
+
+@pytest.mark.benchmark
+@pytest.mark.asyncio
+async def test_batching_saves_session_setup():
+    """개점 시간처럼 한꺼번에 들어온 1장짜리 주문 20개"""
+    page = PackedImage(320, 240, bytes(40 * 240))
+
+    async def render(job):
+        return [page] * len(job.pending_numbers())
+
+    results = {}
+    for max_batch in (1, 5, 20):
+        transport = FakeAsyncPrinterTransport(FakePrinterTransport(print_time=0.02, read_timeout=0.05))
+        printer = await AsyncNiimbotPrint(transport=transport, rows_per_second=24000).connect()
+        queue = PrintQueue(printer, render, max_batch=max_batch, batch_window=0.05)
+        queue.start()
+        try:
+            start = time.perf_counter()
+            jobs = [queue.submit_nowait(_job(i, amount=1)) for i in range(20)]
+            await asyncio.gather(*(job.result() for job in jobs))
+            results[max_batch] = (time.perf_counter() - start, queue.stats())
+        finally:
+            await queue.stop()
+            printer.close()
+        assert transport.printer.pages_printed == 20
+
+    sessions = {max_batch: 20 - stats["sessions_saved"] for max_batch, (_, stats) in results.items()}
+    base = results[1][0]
+    logging.info("20 one-label orders: " + ", ".join(
+        f"max_batch {max_batch}: {elapsed:.2f}s, {sessions[max_batch]} session(s), "
+        f"average batch {stats['average_batch'] or 1:.1f}, "
+        f"setup saved {(base - elapsed) / max(stats['sessions_saved'], 1) * 1000:.0f}ms/session"
+        for max_batch, (elapsed, stats) in results.items()))
+    assert sessions == {1: 20, 5: 4, 20: 1}
+    assert results[20][0] < base
@@ -0,0 +1,162 @@
+import asyncio
+import logging
+import time
+
+import pytest
+from PIL import Image
+
+from src.niimbot.async_niimbot_printer import AsyncNiimbotPrint
+from src.niimbot.enum import RequestCodeEnum
+from src.niimbot.niimbot_printer import PrintJobError
+from src.supa_realtime.print_queue import JobState, PrintJob, PrintQueue, PrintQueueFull
+from tests.niimbot.emulator import FakeAsyncPrinterTransport, FakePrinterTransport
+from tests.supa_realtime.fakes import StubPrinter
+
+
+async def _render(job):
+    return [f"{job.job_id}.{number}" for number in range(1, job.record['amount'] + 1)]
+
+
+def _job(job_id, amount=2):
+    return PrintJob(job_id, {'id': job_id, 'amount': amount})
+
+
+@pytest.mark.asyncio
+async def test_jobs_print_one_at_a_time():
+    """동시에 들어온 주문도 프린터는 한 번에 하나만 사용"""
+    printer = StubPrinter()
+    queue = PrintQueue(printer, _render)
+    queue.start()
+    try:
+        jobs = [queue.submit_nowait(_job(i)) for i in range(5)]
+        results = await asyncio.gather(*(job.result() for job in jobs))
+    finally:
+        await queue.stop()
+
+    assert results == [[0, 1]] * 5
+    assert printer.max_active == 1
+    assert [images[0] for images in printer.jobs] == [f"{i}.1" for i in range(5)]
+    assert all(job.state is JobState.DONE for job in jobs)
+    assert queue.stats()["completed"] == 5
+
+
+@pytest.mark.asyncio
+async def test_job_states_and_failure():
+    printer = StubPrinter(fail_on="bad.2")
+    states = []
+
+    async def render(job):
+        states.append(job.state)
+        return await _render(job)
+
+    queue = PrintQueue(printer, render, on_finished=lambda job: states.append(job.state))
+    queue.start()
+    try:
+        job = queue.submit_nowait(_job("bad", amount=3))
+        assert job.state is JobState.QUEUED
+        with pytest.raises(PrintJobError):
+            await job.result()
+    finally:
+        await queue.stop()
+
+    assert states == [JobState.RENDERING, JobState.FAILED]
+    assert job.completed_pages == [0]
+    assert queue.stats()["failed"] == 1
+
+
+@pytest.mark.asyncio
+async def test_overflow_is_rejected_and_counted():
+    queue = PrintQueue(StubPrinter(), _render, maxsize=2)
+    queue.submit_nowait(_job(1))
+    queue.submit_nowait(_job(2))
+
+    with pytest.raises(PrintQueueFull):
+        queue.submit_nowait(_job(3))
+    with pytest.raises(PrintQueueFull):
+        await queue.submit(_job(4), timeout=0.01)
+
+    stats = queue.stats()
+    assert stats["rejected"] == 2
+    assert stats["max_depth"] == 2
+
+    await queue.stop()
+
+
+@pytest.mark.asyncio
+async def test_submit_waits_for_room():
+    """큐가 가득 차면 자리가 날 때까지 기다림 (backpressure)"""
+    queue = PrintQueue(StubPrinter(print_time=0.02), _render, maxsize=1)
+    queue.start()
+    try:
+        first = await queue.submit(_job(1))
+        second = await queue.submit(_job(2))
+        third = await queue.submit(_job(3))
+        await asyncio.gather(first.result(), second.result(), third.result())
+    finally:
+        await queue.stop()
+
+    assert queue.stats()["rejected"] == 0
+
+
+@pytest.mark.asyncio
+async def test_stop_fails_queued_jobs():
+    queue = PrintQueue(StubPrinter(), _render)
+    job = queue.submit_nowait(_job(1))
+    await queue.stop()
+
+    assert job.state is JobState.FAILED
+    with pytest.raises(Exception, match="stopped"):
+        await job.result()
+
+
+@pytest.mark.asyncio
+async def test_connection_check_waits_for_idle_printer():
+    """출력 세션 도중에는 연결 확인(재연결)을 하지 않음"""
+    printer = StubPrinter(print_time=0.02)
+    checks = []
+
+    async def check_printer_connection():
+        checks.append(printer.active)
+        return True
+
+    printer.check_printer_connection = check_printer_connection
+    queue = PrintQueue(printer, _render)
+    queue.start()
+    try:
+        job = queue.submit_nowait(_job(1, amount=3))
+        await asyncio.sleep(0.01)
+        assert await queue.check_printer() is False
+        await job.result()
+        assert await queue.check_printer() is True
+    finally:
+        await queue.stop()
+    assert checks == [0]
+
+
+@pytest.mark.benchmark
+@pytest.mark.asyncio
+async def test_burst_on_emulated_printer():
+    """에뮬레이터로 주문 폭주 처리"""
+    transport = FakeAsyncPrinterTransport(FakePrinterTransport(print_time=0.01, read_timeout=0.05))
+    printer = await AsyncNiimbotPrint(transport=transport, rows_per_second=24000).connect()
+
+    async def render(job):
+        return [Image.new("RGB", (320, 240), "white") for _ in range(job.record['amount'])]
+
+    queue = PrintQueue(printer, render)
+    queue.start()
+    try:
+        start = time.perf_counter()
+        jobs = [queue.submit_nowait(_job(i, amount=2)) for i in range(10)]
+        await asyncio.gather(*(job.result() for job in jobs))
+        elapsed = time.perf_counter() - start
+    finally:
+        await queue.stop()
+        printer.close()
+
+    logging.info(f"10 orders x 2 labels in {elapsed:.2f}s, stats {queue.stats()}")
+    assert transport.printer.pages_printed == 20
+    # 세션이 겹치지 않고 START_PRINT/END_PRINT 가 번갈아 나옴
+    sessions = [code for code in transport.printer.commands
+                if code in (RequestCodeEnum.START_PRINT, RequestCodeEnum.END_PRINT)]
+    assert sessions == [RequestCodeEnum.START_PRINT, RequestCodeEnum.END_PRINT] * 10
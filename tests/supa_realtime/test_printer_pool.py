@@ -0,0 +1,214 @@
+import asyncio
+import logging
+import time
+
+import pytest
+
+from src.niimbot.async_niimbot_printer import AsyncNiimbotPrint
+from src.niimbot.niimbot_printer import PrintJobError, PrinterFault, PrinterTimeout
+from src.niimbot.raster import PackedImage
+from src.supa_realtime.print_queue import PrintJob
+from src.supa_realtime.printer_pool import PrinterPool, printer_fault
+from tests.niimbot.emulator import FakeAsyncPrinterTransport, FakePrinterTransport
+from tests.supa_realtime.fakes import FaultyPrinter, StubPrinter
+
+
+async def _render(job):
+    return [f"{job.job_id}.{number}" for number in job.pending_numbers()]
+
+
+def _job(job_id, amount=2):
+    return PrintJob(job_id, {'id': job_id, 'amount': amount}, numbers=list(range(1, amount + 1)))
+
+
+@pytest.mark.asyncio
+async def test_orders_spread_over_printers():
+    """주문은 쉬고 있는 프린터가 가져가고, 프린터마다 한 번에 한 주문만 출력"""
+    printers = [StubPrinter(print_time=0.02) for _ in range(3)]
+    pool = PrinterPool(printers, _render)
+    pool.start()
+    try:
+        jobs = [pool.submit_nowait(_job(i)) for i in range(9)]
+        await asyncio.gather(*(job.result() for job in jobs))
+    finally:
+        await pool.stop()
+
+    assert [len(printer.jobs) for printer in printers] == [3, 3, 3]
+    assert all(printer.max_active == 1 for printer in printers)
+    assert sorted(label for printer in printers for job in printer.jobs for label in job) == \
+           sorted(f"{i}.{n}" for i in range(9) for n in (1, 2))
+
+
+@pytest.mark.asyncio
+async def test_failover_moves_remaining_labels():
+    """커버가 열린 프린터의 남은 라벨만 다른 프린터가 출력"""
+    broken = FaultyPrinter(fault="Printer cover is open", fail_after=2)
+    spare = FaultyPrinter()
+    pages = []
+    pool = PrinterPool([broken, spare], _render, on_page=lambda job, index: pages.append(index),
+                       recovery_interval=60, names=["ttyACM0", "ttyACM1"])
+    pool.start()
+    try:
+        job = pool.submit_nowait(_job(1, amount=5))
+        assert await job.result() == [0, 1, 2, 3, 4]
+    finally:
+        await pool.stop()
+
+    assert spare.jobs == [["1.3", "1.4", "1.5"]]
+    assert pages == [0, 1, 2, 3, 4]
+    assert job.attempts == 2
+    stats = pool.stats()
+    assert stats["failovers"] == 1
+    assert stats["printers"]["ttyACM0"]["healthy"] is False
+    assert stats["printers"]["ttyACM0"]["fault"] == "Printer cover is open"
+    assert stats["printers"]["ttyACM1"]["labels"] == 3
+
+
+@pytest.mark.asyncio
+async def test_job_errors_do_not_fail_over():
+    printers = [StubPrinter(print_time=0), StubPrinter(print_time=0)]
+
+    async def render(job):
+        if job.job_id == 2:
+            raise ValueError("bad record")
+        return await _render(job)
+
+    pool = PrinterPool(printers, render)
+    pool.start()
+    try:
+        with pytest.raises(ValueError):
+            await pool.submit_nowait(_job(2)).result()
+        assert pool.stats()["failovers"] == 0
+        assert all(member.healthy for member in pool.members)
+    finally:
+        await pool.stop()
+
+
+@pytest.mark.asyncio
+async def test_last_healthy_printer_fails_job():
+    """다른 프린터가 모두 고장이면 단일 프린터처럼 작업 실패"""
+    printers = [FaultyPrinter(fault="Printer battery is too low"),
+                FaultyPrinter(fault="Printer is in an unusable state (paper jam or other error)")]
+    pool = PrinterPool(printers, _render, recovery_interval=60)
+    pool.start()
+    try:
+        with pytest.raises(PrintJobError, match="unusable state|battery"):
+            await pool.submit_nowait(_job(3)).result()
+    finally:
+        await pool.stop()
+    assert not pool.healthy
+
+
+@pytest.mark.asyncio
+async def test_faulted_printer_rejoins_after_recovery():
+    broken = FaultyPrinter(fault="Printer cover is open")
+    broken.status_error = "Printer cover is open"
+    spare = FaultyPrinter(print_time=0.005)
+    pool = PrinterPool([broken, spare], _render, recovery_interval=0.02)
+    pool.start()
+    try:
+        await pool.submit_nowait(_job(4)).result()
+        await asyncio.sleep(0.05)
+        assert not pool.members[0].healthy
+
+        broken.fault = broken.status_error = None
+        await asyncio.sleep(0.05)
+        assert pool.members[0].healthy
+        jobs = [pool.submit_nowait(_job(i)) for i in range(5, 9)]
+        await asyncio.gather(*(job.result() for job in jobs))
+    finally:
+        await pool.stop()
+    assert broken.jobs
+
+
+@pytest.mark.asyncio
+async def test_submit_waits_for_room():
+    pool = PrinterPool([StubPrinter(print_time=0.02)], _render, maxsize=1)
+    pool.start()
+    try:
+        jobs = [await pool.submit(_job(i), timeout=1) for i in range(3)]
+        await asyncio.gather(*(job.result() for job in jobs))
+    finally:
+        await pool.stop()
+
+
+def test_printer_fault_classification():
+    status_error = Exception("Printer status error: Printer cover is open")
+    status_error.__cause__ = PrinterFault("Printer cover is open")
+    job_error = PrintJobError("Print job failed: Printer status error: Printer cover is open")
+    job_error.__cause__ = status_error
+    assert printer_fault(job_error) == "Printer cover is open"
+    assert printer_fault(PrinterTimeout("Printer did not respond", "No response from printer for command 1")) == \
+           "Printer did not respond"
+    # 메시지가 비슷해도 장치 오류 타입이 아니면 작업 오류
+    assert printer_fault(Exception("Print job timeout")) is None
+    assert printer_fault(ValueError("bad record")) is None
+
+
+@pytest.mark.asyncio
+async def test_failover_when_emulated_printer_is_disabled_mid_job():
+    """출력 중 용지 걸림(isEnabled=False)이 생긴 프린터의 남은 라벨을 다른 프린터가 출력"""
+    transports = [FakeAsyncPrinterTransport(FakePrinterTransport(print_time=0.01, read_timeout=0.05))
+                  for _ in range(2)]
+    printers = [await AsyncNiimbotPrint(transport=transport, rows_per_second=24000).connect()
+                for transport in transports]
+    page = PackedImage(320, 240, bytes(40 * 240))
+
+    async def render(job):
+        return [page] * len(job.pending_numbers())
+
+    def on_page(job, index):
+        if index == 0:
+            member = next(member for member in pool.members if member.current is job)
+            transports[pool.members.index(member)].printer.enabled = False
+
+    pool = PrinterPool(printers, render, on_page=on_page, recovery_interval=60)
+    pool.start()
+    try:
+        job = pool.submit_nowait(_job(1, amount=4))
+        assert await job.result() == [0, 1, 2, 3]
+    finally:
+        await pool.stop()
+        for printer in printers:
+            printer.close()
+
+    broken = next(member for member in pool.members if not member.healthy)
+    assert broken.fault == "Printer entered unusable state during printing"
+    assert pool.stats()["failovers"] == 1
+    assert len(pool.healthy) == 1
+    assert transports[1 - pool.members.index(broken)].printer.pages_printed >= 3
+
+
+@pytest.mark.benchmark
+@pytest.mark.asyncio
+async def test_pool_throughput_scales_with_printers():
+    """에뮬레이터 1/2/4대로 같은 주문을 출력할 때 처리량"""
+    page = PackedImage(320, 240, bytes(40 * 240))
+
+    async def render(job):
+        return [page] * len(job.pending_numbers())
+
+    results = {}
+    for count in (1, 2, 4):
+        transports = [FakeAsyncPrinterTransport(FakePrinterTransport(print_time=0.05, read_timeout=0.05))
+                      for _ in range(count)]
+        printers = [await AsyncNiimbotPrint(transport=transport, rows_per_second=24000).connect()
+                    for transport in transports]
+        pool = PrinterPool(printers, render)
+        pool.start()
+        try:
+            start = time.perf_counter()
+            jobs = [pool.submit_nowait(_job(i, amount=2)) for i in range(16)]
+            await asyncio.gather(*(job.result() for job in jobs))
+            results[count] = time.perf_counter() - start
+        finally:
+            await pool.stop()
+            for printer in printers:
+                printer.close()
+        assert sum(transport.printer.pages_printed for transport in transports) == 32
+
+    logging.info("16 orders x 2 labels: " + ", ".join(
+        f"{count} printer(s) {elapsed:.2f}s ({32 / elapsed:.1f} labels/s, {results[1] / elapsed:.2f}x)"
+        for count, elapsed in results.items()))
+    assert results[1] / results[2] > 1.6
+    assert results[1] / results[4] > 2.8
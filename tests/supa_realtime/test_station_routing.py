@@ -0,0 +1,185 @@
+import asyncio
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from src.supa_db.laundry_feed import LaundryFeed
+from src.supa_realtime.catch_up import CatchUpSync
+from src.supa_realtime.print_queue import PrintJob
+from src.supa_realtime.printer_pool import PrinterPool
+from src.supa_realtime.realtime_service import RealtimeService
+from src.supa_realtime.station_routing import RoutingTable, StationFilter
+from tests.supa_db.fake_postgrest import FakePostgrest
+from tests.supa_realtime.fakes import FaultyPrinter, StubPrinter, StubSupaDB
+
+_BASE = datetime(2026, 10, 17, 9, tzinfo=timezone.utc)
+_STATIONS = ["gangnam", "seocho", "mapo", "jongno"]
+
+
+def _row(row_id, station, size="small"):
+    return {"id": row_id, "amount": 1, "requested_by": "user-1", "station": station, "size": size,
+            "created_at": (_BASE + timedelta(seconds=row_id)).isoformat(timespec="microseconds")}
+
+
+def test_station_filter():
+    one = StationFilter.parse("station=gangnam")
+    assert one.realtime() == "station=eq.gangnam"
+    several = StationFilter.parse("station=gangnam, seocho")
+    assert several.realtime() == "station=in.(gangnam,seocho)"
+    assert several.matches(_row(1, "seocho"))
+    assert not several.matches(_row(2, "mapo"))
+    assert not several.matches({"id": 3})
+    with pytest.raises(ValueError):
+        StationFilter.parse("gangnam")
+
+
+def test_routing_table_first_match_wins(tmp_path):
+    path = tmp_path / "routes.json"
+    path.write_text(json.dumps({
+        "groups": {"large": ["ttyACM1"], "express": ["ttyACM2"], "front": ["ttyACM0", "ttyACM1"]},
+        "routes": [
+            {"match": {"service": "express"}, "group": "express"},
+            {"match": {"size": ["large", "xlarge"], "station": "gangnam"}, "group": "large"},
+        ],
+        "default": "front",
+    }))
+    routes = RoutingTable.load(path)
+    assert routes.route({"service": "express", "size": "large", "station": "gangnam"}) == "express"
+    assert routes.route({"size": "xlarge", "station": "gangnam"}) == "large"
+    assert routes.route({"size": "xlarge", "station": "mapo"}) == "front"
+    assert routes.stats() == {"express": 1, "large": 1, "front": 1}
+
+    with pytest.raises(ValueError, match="unknown printer group"):
+        RoutingTable([({"size": "large"}, "missing")], {"front": ["ttyACM0"]})
+
+
+async def _render(job):
+    return [f"{job.job_id}.{number}" for number in job.pending_numbers()]
+
+
+def _job(job_id, group=None):
+    return PrintJob(job_id, {'id': job_id, 'amount': 1}, numbers=[1], group=group)
+
+
+@pytest.mark.asyncio
+async def test_pool_prints_groups_on_their_printers():
+    printers = [StubPrinter(print_time=0.005) for _ in range(3)]
+    pool = PrinterPool(printers, _render, names=["a", "b", "c"], groups={"large": ["c"], "small": ["a", "b"]})
+    pool.start()
+    try:
+        jobs = [pool.submit_nowait(_job(i, "large" if i % 3 == 0 else "small")) for i in range(12)]
+        jobs += [pool.submit_nowait(_job(i)) for i in range(12, 15)]
+        await asyncio.gather(*(job.result() for job in jobs))
+    finally:
+        await pool.stop()
+
+    large = {f"{i}.1" for i in range(0, 12, 3)}
+    assert large <= {label for job in printers[2].jobs for label in job}
+    assert not large & {label for printer in printers[:2] for job in printer.jobs for label in job}
+    assert pool.serves("small") and not pool.serves("missing")
+
+
+@pytest.mark.asyncio
+async def test_failover_stays_in_group():
+    """다른 그룹의 프린터로는 넘기지 않음"""
+    broken = FaultyPrinter(fault="Printer cover is open")
+    other = FaultyPrinter()
+    pool = PrinterPool([broken, other], _render, recovery_interval=60, names=["a", "b"],
+                       groups={"large": ["a"], "small": ["b"]})
+    pool.start()
+    try:
+        with pytest.raises(Exception, match="cover is open"):
+            await pool.submit_nowait(_job(1, "large")).result()
+    finally:
+        await pool.stop()
+    assert other.jobs == []
+    assert pool.stats()["failovers"] == 0
+
+
+class FakeChannel:
+    def __init__(self):
+        self.listeners = []
+
+    def on_postgres_changes(self, **kwargs):
+        self.listeners.append(kwargs)
+        return self
+
+    async def subscribe(self):
+        return self
+
+
+class FakeSocket:
+    def __init__(self):
+        self.channels = []
+
+    def channel(self, topic):
+        self.channels.append(FakeChannel())
+        return self.channels[-1]
+
+
+@pytest.mark.asyncio
+async def test_service_subscribes_with_station_filter():
+    printers = [StubPrinter(print_time=0), StubPrinter(print_time=0)]
+    routes = RoutingTable([({"size": "large"}, "large")], {"large": ["b"], "any": ["a", "b"]}, default="any")
+    service = RealtimeService("url", "jwt", printers, StubSupaDB(), printer_names=["a", "b"],
+                              station=StationFilter("station", ["gangnam"]), routes=routes)
+    service._socket = FakeSocket()
+    assert await service._setup_channel()
+    assert service._socket.channels[0].listeners[0]["filter"] == "station=eq.gangnam"
+
+    service._callback_wrapper({'data': {'record': _row(1, "mapo")}})
+    assert service.filtered == 1 and service.print_queue.depth == 0
+
+    assert service._accept_job(_row(2, "gangnam", size="large")).group == "large"
+    assert service._accept_job(_row(3, "gangnam")).group == "any"
+    service.routes = RoutingTable([], {"gone": ["z"]}, default="gone")
+    with pytest.raises(ValueError, match="No printer in group 'gone'"):
+        service._accept_job(_row(4, "gangnam"))
+
+
+@pytest.mark.asyncio
+async def test_catch_up_reads_only_own_station():
+    rows = [_row(i, _STATIONS[i % 4]) for i in range(1, 101)]
+    server = FakePostgrest({"laundry": rows})
+    feed = LaundryFeed("http://localhost:54321", "jwt", transport=server.transport(),
+                       filters={"station": ["gangnam", "seocho"]})
+    sync = CatchUpSync(feed, page_size=10)
+    sync.processed(rows[49])
+    submitted = []
+    try:
+        await sync.run(lambda record: submitted.append(record["id"]))
+    finally:
+        await feed.close()
+    assert submitted == [row["id"] for row in rows[50:] if row["station"] in ("gangnam", "seocho")]
+
+
+@pytest.mark.benchmark
+@pytest.mark.asyncio
+async def test_ingress_follows_station_share():
+    """지점이 늘어도 노드가 받는 행은 자기 지점 몫만큼"""
+    results = {}
+    for stations in (2, 4):
+        rows = [_row(i, _STATIONS[i % stations]) for i in range(1, 4001)]
+        for filtered in (False, True):
+            server = FakePostgrest({"laundry": rows})
+            feed = LaundryFeed("http://localhost:54321", "jwt", transport=server.transport(),
+                               filters={"station": "gangnam"} if filtered else None)
+            station = StationFilter("station", "gangnam")
+            sync = CatchUpSync(feed, page_size=200)
+            sync.processed(rows[0])
+            received = []
+            try:
+                await sync.run(received.append)
+            finally:
+                await feed.close()
+            own = [record for record in received if station.matches(record)]
+            results[(stations, filtered)] = (len(received), len(own), len(server.requests))
+
+    logging.info("catch-up ingress per node over 4000 rows (received, own, requests): " + ", ".join(
+        f"{stations} stations {'filtered' if filtered else 'unfiltered'}: {value}"
+        for (stations, filtered), value in results.items()))
+    assert results[(2, True)][0] == results[(2, True)][1] == 2000
+    assert results[(4, True)][0] == results[(4, True)][1] == 1000
+    assert results[(4, False)][0] == 3999